@@ -0,0 +1,342 @@
+# analytics.py
+import os
+import re
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import UpdateOne, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from database import db_manager, logger
+
+# Rollup documents in ANALYTICS_COLLECTION are $inc'd as match results and interviews are saved, so the
+# dashboard reads a handful of small documents instead of scanning match_results / scheduled_interviews.
+#   {_id: "global", kind: "global", ...}   totals, score buckets, red-flag categories, monthly CQI, interviews
+#   {_id: "jd:<jd_id>", kind: "jd", ...}   per-JD candidate counts and score buckets
+# The global rollup also keeps increments_since, the earliest timestamp of any document counted incrementally:
+# the one-time backfill counts only what is older, however many workers or restarts came in between.
+ANALYTICS_COLLECTION = "analytics_rollups"
+ANALYTICS_BACKFILL_ON_STARTUP = os.getenv("ANALYTICS_BACKFILL_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+ANALYTICS_TOP_JDS = int(os.getenv("ANALYTICS_TOP_JDS", "20"))
+ANALYTICS_TREND_MONTHS = int(os.getenv("ANALYTICS_TREND_MONTHS", "6"))
+ANALYTICS_UPCOMING_DETAILS = int(os.getenv("ANALYTICS_UPCOMING_DETAILS", "5"))
+
+GLOBAL_ROLLUP_ID = "global"
+STRONG_FIT_THRESHOLD = 70
+GOOD_FIT_THRESHOLD = 55
+
+# Red flags embed scores and skill names; they are counted by category (rollup key, dashboard label)
+RED_FLAG_CATEGORIES: List[Tuple[str, str, "re.Pattern"]] = [
+    ("critically_low_fit", "Critically Low JD Fit", re.compile(r"^Critically Low JD Fit")),
+    ("low_fit", "Low JD Fit", re.compile(r"^Low JD Fit")),
+    ("brief_resume", "Brief Resume", re.compile(r"^Brief Resume")),
+    ("missing_all_essentials", "Missing All Essential Skills", re.compile(r"^Critical: Missing all")),
+    ("many_essentials_missing", "Many Essential Skills Missing", re.compile(r"^High concern")),
+    ("essential_gaps", "Essential Skill Gaps", re.compile(r"^Potential gaps")),
+    ("vague_jd", "JD Lacks Essential Skills", re.compile(r"^JD has few")),
+    ("unreadable", "Unreadable Resume", re.compile(r"^Resume content too short")),
+    ("timed_out", "Processing Timed Out", re.compile(r"^Resume processing timed out")),
+    ("semantic_disabled", "Keyword-only Scoring", re.compile(r"^CRITICAL: Semantic analysis disabled")),
+]
+_INFORMATIONAL_FLAGS = re.compile(r"^(Strong automated alignment|Good alignment|Review profile details)")
+_SKIPPED_CATEGORIES = {"unreadable", "timed_out"} # Candidates that could not be scored
+_RED_FLAG_LABELS = {key: label for key, label, _ in RED_FLAG_CATEGORIES}
+_RED_FLAG_LABELS["other"] = "Other"
+
+
+def red_flag_category(flag: str) -> Optional[str]:
+    if _INFORMATIONAL_FLAGS.match(flag or ""):
+        return None
+    for key, _, pattern in RED_FLAG_CATEGORIES:
+        if pattern.match(flag or ""):
+            return key
+    return "other"
+
+def _score_bucket(score: int) -> str:
+    bucket = min(9, max(0, int(score) // 10))
+    return f"{bucket * 10}-{bucket * 10 + 9}" if bucket < 9 else "90-100"
+
+SCORE_BUCKETS = [_score_bucket(score) for score in range(0, 100, 10)]
+
+
+def _rollups_collection():
+    return db_manager.get_collection(ANALYTICS_COLLECTION)
+
+
+# --- Incremental updates ---
+def _match_increments(match_docs: List[Dict[str, Any]]) -> Dict[str, Counter]:
+    increments: Dict[str, Counter] = defaultdict(Counter)
+    for doc in match_docs:
+        score = int(doc.get("jd_fit_score", 0))
+        categories = {red_flag_category(flag) for flag in doc.get("red_flags", [])} - {None}
+        bucket = _score_bucket(score)
+        month = (doc.get("matched_at") or datetime.utcnow()).strftime("%Y-%m")
+        skipped = bool(categories & _SKIPPED_CATEGORIES)
+
+        global_inc = increments[GLOBAL_ROLLUP_ID]
+        global_inc["candidates"] += 1
+        global_inc["skipped_candidates" if skipped else "scored_candidates"] += 1
+        global_inc[f"score_buckets.{bucket}"] += 1
+        if not skipped:
+            global_inc["score_sum"] += score
+            global_inc[f"monthly.{month}.candidates"] += 1
+            global_inc[f"monthly.{month}.score_sum"] += score
+            global_inc["good_fits"] += score >= GOOD_FIT_THRESHOLD
+            global_inc["strong_fits"] += score >= STRONG_FIT_THRESHOLD
+        for category in categories:
+            global_inc[f"red_flags.{category}"] += 1
+
+        if doc.get("jd_id") is not None:
+            jd_inc = increments[f"jd:{doc['jd_id']}"]
+            jd_inc["candidates"] += 1
+            jd_inc[f"score_buckets.{bucket}"] += 1
+            if not skipped:
+                jd_inc["scored_candidates"] += 1
+                jd_inc["score_sum"] += score
+                jd_inc["strong_fits"] += score >= STRONG_FIT_THRESHOLD
+    return increments
+
+def _interview_increments(interview_docs: List[Dict[str, Any]]) -> Dict[str, Counter]:
+    global_inc = Counter()
+    for doc in interview_docs:
+        global_inc["interviews_scheduled"] += 1
+        if doc.get("start_time"):
+            global_inc[f"interviews_monthly.{doc['start_time'].strftime('%Y-%m')}"] += 1
+    return {GLOBAL_ROLLUP_ID: global_inc}
+
+async def _apply_increments(increments: Dict[str, Counter], counted_since: Optional[datetime] = None):
+    # counted_since: earliest timestamp among the documents being counted (None for the backfill itself)
+    collection = _rollups_collection()
+    if collection is None:
+        return
+    operations = []
+    for rollup_id, counter in increments.items():
+        inc = {field: value for field, value in counter.items() if value}
+        if not inc:
+            continue
+        on_insert: Dict[str, Any] = {"kind": "global" if rollup_id == GLOBAL_ROLLUP_ID else "jd"}
+        if rollup_id.startswith("jd:"):
+            jd_id = rollup_id[3:]
+            on_insert["jd_id"] = ObjectId(jd_id) if ObjectId.is_valid(jd_id) else jd_id
+        operations.append(UpdateOne(
+            {"_id": rollup_id},
+            {"$inc": inc, "$setOnInsert": on_insert, "$currentDate": {"updated_at": True}},
+            upsert=True
+        ))
+    if counted_since is not None:
+        operations.append(UpdateOne({"_id": GLOBAL_ROLLUP_ID}, {"$min": {"increments_since": counted_since}, "$setOnInsert": {"kind": "global"}}, upsert=True))
+    if operations:
+        await collection.bulk_write(operations, ordered=False)
+
+def _earliest(docs: List[Dict[str, Any]], field: str) -> datetime:
+    # The same timestamp the backfill filters on, so a document is counted by exactly one of the two
+    return min((doc[field] for doc in docs if isinstance(doc.get(field), datetime)), default=datetime.utcnow())
+
+async def record_match_results(match_docs: List[Dict[str, Any]]):
+    """Folds newly saved match_results documents into the rollups. Never raises: analytics must not fail a match."""
+    if not match_docs:
+        return
+    try:
+        await _apply_increments(_match_increments(match_docs), _earliest(match_docs, "matched_at"))
+    except Exception as e:
+        logger.error(f"Failed to update analytics rollups for {len(match_docs)} match results: {e}", exc_info=True)
+
+async def record_scheduled_interviews(interview_docs: List[Dict[str, Any]]):
+    """Folds newly saved scheduled_interviews documents into the rollups. Never raises."""
+    if not interview_docs:
+        return
+    try:
+        await _apply_increments(_interview_increments(interview_docs), _earliest(interview_docs, "created_at"))
+    except Exception as e:
+        logger.error(f"Failed to update analytics rollups for {len(interview_docs)} interviews: {e}", exc_info=True)
+
+
+# --- One-time backfill of history saved before rollups existed ---
+async def backfill_analytics_rollups(cutoff: datetime):
+    try:
+        await _backfill_analytics_rollups(cutoff)
+    except Exception as e:
+        logger.error(f"Analytics rollup backfill failed: {e}", exc_info=True)
+
+async def _backfill_analytics_rollups(cutoff: datetime):
+    """
+    Rolls up every match result and interview created before incremental counting began: the global rollup's
+    increments_since, or `cutoff` (this process's startup, before it served any request) if nothing has been
+    counted yet. Runs once across all workers and restarts; the global rollup remembers it.
+    """
+    collection = _rollups_collection()
+    matches_collection = db_manager.get_collection("match_results")
+    interviews_collection = db_manager.get_collection("scheduled_interviews")
+    if collection is None or matches_collection is None or interviews_collection is None:
+        return
+    global_rollup = await _claim_backfill(collection, cutoff)
+    if global_rollup is None:
+        return
+    # Other workers (or this deployment's earlier runs) may have counted documents newer than that already
+    if isinstance(global_rollup.get("increments_since"), datetime):
+        cutoff = min(cutoff, global_rollup["increments_since"])
+    started = datetime.now(timezone.utc)
+    try:
+        increments, match_count, interview_count = await _backfill_increments(matches_collection, interviews_collection, cutoff)
+    except Exception:
+        # Nothing was counted yet, so another startup may retry
+        await collection.update_one({"_id": GLOBAL_ROLLUP_ID}, {"$unset": {"backfill_claimed": ""}})
+        raise
+    await _apply_increments(increments)
+    await collection.update_one({"_id": GLOBAL_ROLLUP_ID}, {"$set": {"backfilled_through": cutoff}})
+    logger.info(
+        f"Analytics rollups backfilled from {match_count} match results and {interview_count} interviews "
+        f"in {(datetime.now(timezone.utc) - started).total_seconds():.2f}s"
+    )
+
+async def _claim_backfill(collection, cutoff: datetime) -> Optional[Dict[str, Any]]:
+    """
+    Marks the global rollup as being backfilled, atomically, so only one worker of a multi-worker startup
+    applies the history. Returns the claimed global rollup, or None if another worker has it (or had it).
+    """
+    try:
+        claimed = await collection.find_one_and_update(
+            {"_id": GLOBAL_ROLLUP_ID, "backfill_claimed": {"$exists": False}, "backfilled_through": {"$exists": False}},
+            {"$set": {"backfill_claimed": cutoff}, "$setOnInsert": {"kind": "global"}},
+            upsert=True, return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError: # The global rollup exists but is already claimed (or a concurrent upsert won)
+        return None
+    return claimed if claimed and claimed.get("backfill_claimed") == cutoff else None
+
+async def _backfill_increments(matches_collection, interviews_collection, cutoff: datetime) -> Tuple[Dict[str, Counter], int, int]:
+    started = datetime.now(timezone.utc)
+    # Grouping server-side keeps the transfer proportional to distinct (jd, score, month, flags), not to documents
+    match_groups = matches_collection.aggregate([
+        {"$match": {"matched_at": {"$lt": cutoff}}},
+        {"$group": {
+            "_id": {
+                "jd_id": "$jd_id",
+                "score": "$jd_fit_score",
+                "month": {"$dateToString": {"format": "%Y-%m", "date": "$matched_at"}},
+                "red_flags": "$red_flags",
+            },
+            "count": {"$sum": 1},
+        }},
+    ], allowDiskUse=True)
+    increments: Dict[str, Counter] = defaultdict(Counter)
+    match_count = 0
+    async for group in match_groups:
+        key = group["_id"]
+        representative = {
+            "jd_id": key.get("jd_id"), "jd_fit_score": key.get("score") or 0, "red_flags": key.get("red_flags") or [],
+            "matched_at": datetime.strptime(key["month"], "%Y-%m") if key.get("month") else None,
+        }
+        for rollup_id, counter in _match_increments([representative]).items():
+            for field, value in counter.items():
+                increments[rollup_id][field] += value * group["count"]
+        match_count += group["count"]
+
+    interview_groups = interviews_collection.aggregate([
+        {"$match": {"created_at": {"$lt": cutoff}}},
+        {"$group": {"_id": {"$dateToString": {"format": "%Y-%m", "date": "$start_time"}}, "count": {"$sum": 1}}},
+    ])
+    interview_count = 0
+    async for group in interview_groups:
+        increments[GLOBAL_ROLLUP_ID]["interviews_scheduled"] += group["count"]
+        if group["_id"]:
+            increments[GLOBAL_ROLLUP_ID][f"interviews_monthly.{group['_id']}"] += group["count"]
+        interview_count += group["count"]
+    return increments, match_count, interview_count
+
+
+# --- Dashboard ---
+def _recent_months(months: int, now: datetime) -> List[str]:
+    year, month = now.year, now.month
+    keys = []
+    for _ in range(max(1, months)):
+        keys.append(f"{year:04d}-{month:02d}")
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    return list(reversed(keys))
+
+async def _jd_candidate_counts(collection) -> List[Dict[str, Any]]:
+    jd_rollups = await collection.find({"kind": "jd"}).sort("candidates", -1).limit(ANALYTICS_TOP_JDS).to_list(length=ANALYTICS_TOP_JDS)
+    jds_collection = db_manager.get_collection("job_descriptions")
+    jd_ids = [rollup["jd_id"] for rollup in jd_rollups if isinstance(rollup.get("jd_id"), ObjectId)]
+    filenames = {}
+    if jds_collection is not None and jd_ids:
+        filenames = {doc["_id"]: doc.get("filename") async for doc in jds_collection.find({"_id": {"$in": jd_ids}}, {"filename": 1})}
+    return [
+        {
+            "jdId": str(rollup.get("jd_id")),
+            "jdFilename": filenames.get(rollup.get("jd_id"), "Unknown JD"),
+            "candidates": rollup.get("candidates", 0),
+            "averageJdFit": round(rollup["score_sum"] / rollup["scored_candidates"], 1) if rollup.get("scored_candidates") else None,
+            "strongFits": rollup.get("strong_fits", 0),
+            "scoreDistribution": [rollup.get("score_buckets", {}).get(bucket, 0) for bucket in SCORE_BUCKETS],
+        }
+        for rollup in jd_rollups
+    ]
+
+async def _upcoming_interviews(now: datetime) -> Tuple[int, List[Dict[str, Any]]]:
+    # Upcoming depends on the clock, so it is read live; the start_time index keeps it a range scan over future interviews only
+    interviews_collection = db_manager.get_collection("scheduled_interviews")
+    if interviews_collection is None:
+        return 0, []
+    upcoming_filter = {"start_time": {"$gte": now}}
+    upcoming_count = await interviews_collection.count_documents(upcoming_filter)
+    cursor = interviews_collection.find(upcoming_filter, {"candidate_name": 1, "start_time": 1, "duration_minutes": 1}) \
+        .sort("start_time", 1).limit(ANALYTICS_UPCOMING_DETAILS)
+    details = [
+        {"name": doc.get("candidate_name", "Candidate"), "role": f"{doc.get('duration_minutes', 0)} min interview", "date": doc["start_time"].strftime("%B %d, %H:%M UTC")}
+        async for doc in cursor
+    ]
+    return upcoming_count, details
+
+async def get_dashboard_analytics() -> Dict[str, Any]:
+    """Everything AnalyticsDashboard.jsx renders, from the rollups plus two indexed reads for upcoming interviews."""
+    collection = _rollups_collection()
+    if collection is None:
+        raise RuntimeError("Analytics rollups collection unavailable.")
+    now = datetime.now(timezone.utc)
+    global_rollup = await collection.find_one({"_id": GLOBAL_ROLLUP_ID}) or {}
+    upcoming_count, upcoming_details = await _upcoming_interviews(now)
+
+    months = _recent_months(ANALYTICS_TREND_MONTHS, now)
+    monthly = global_rollup.get("monthly", {})
+    cqi_trend = [
+        round(monthly[month]["score_sum"] / monthly[month]["candidates"], 1) if monthly.get(month, {}).get("candidates") else 0
+        for month in months
+    ]
+    month_labels = [datetime.strptime(month, "%Y-%m").strftime("%b %Y") for month in months]
+    interviews_monthly = global_rollup.get("interviews_monthly", {})
+
+    red_flags = sorted(global_rollup.get("red_flags", {}).items(), key=lambda item: item[1], reverse=True)
+    scored = global_rollup.get("scored_candidates", 0)
+    interviews_scheduled = global_rollup.get("interviews_scheduled", 0)
+
+    return {
+        # Shapes read directly by AnalyticsDashboard.jsx
+        "pieLabels": ["Scored", "Interview Scheduled", "Skipped"],
+        "pieData": [max(0, scored - interviews_scheduled), interviews_scheduled, global_rollup.get("skipped_candidates", 0)],
+        "barLabels": month_labels,
+        "barData": cqi_trend,
+        "noShows": global_rollup.get("no_shows", 0), # No attendance tracking yet; stays 0 until something records it
+        "upcomingInterviews": upcoming_count,
+        "autoMatchedProfiles": global_rollup.get("candidates", 0),
+        "upcomingInterviewsDetails": upcoming_details,
+        "funnelStages": {
+            "labels": ["Matched", f"Good Fit (≥{GOOD_FIT_THRESHOLD}%)", f"Strong Fit (≥{STRONG_FIT_THRESHOLD}%)", "Interview Scheduled", "Upcoming"],
+            "data": [global_rollup.get("candidates", 0), global_rollup.get("good_fits", 0), global_rollup.get("strong_fits", 0), interviews_scheduled, upcoming_count],
+        },
+        "cqiTrend": {"labels": month_labels, "data": cqi_trend},
+        "redFlagFrequency": {"labels": [_RED_FLAG_LABELS.get(key, key) for key, _ in red_flags], "data": [count for _, count in red_flags]},
+        # Additional breakdowns
+        "scoreDistribution": {"labels": SCORE_BUCKETS, "data": [global_rollup.get("score_buckets", {}).get(bucket, 0) for bucket in SCORE_BUCKETS]},
+        "averageJdFit": round(global_rollup["score_sum"] / scored, 1) if scored else None,
+        "jdCandidateCounts": await _jd_candidate_counts(collection),
+        "interviewPipeline": {
+            "scheduled": interviews_scheduled,
+            "upcoming": upcoming_count,
+            "byMonth": {"labels": month_labels, "data": [interviews_monthly.get(month, 0) for month in months]},
+        },
+        "backfilledThrough": global_rollup.get("backfilled_through"),
+        "updatedAt": global_rollup.get("updated_at"),
+    }
@@ -4,11 +4,26 @@ import os
 from datetime import datetime, timedelta # Added timedelta
 from motor.motor_asyncio import AsyncIOMotorClient
 from pydantic import BaseModel, Field, field_validator, EmailStr # Added EmailStr
-from typing import Optional, List, Any
+from typing import Optional, List, Any, Dict, Tuple
 from bson import ObjectId
+from pymongo import IndexModel, ASCENDING, DESCENDING
+from pymongo.errors import BulkWriteError
 
 MONGO_CONNECTION_STRING = os.getenv("MONGO_CONNECTION_STRING", "mongodb://localhost:27017")
 DATABASE_NAME = os.getenv("DATABASE_NAME", "hisbandhr_db")
+# Shared by the model loader and the parse caches (cache keys include the model that produced the embeddings)
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+# Inference backend for that model (see embedding_backend.py); non-default backends get their own cache entries
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+# "chunked": long documents are embedded as word chunks sized to the model window and mean-pooled;
+# "truncate": the first MAX_EMBED_TEXT_LEN characters only (the model then cuts that to its own window)
+EMBEDDING_MODE = os.getenv("EMBEDDING_MODE", "chunked").lower()
+EMBEDDING_CHUNK_WORDS = int(os.getenv("EMBEDDING_CHUNK_WORDS", "180")) # ~256 word pieces, all-MiniLM-L6-v2's max_seq_length
+EMBEDDING_MAX_CHUNKS_PER_DOC = int(os.getenv("EMBEDDING_MAX_CHUNKS_PER_DOC", "8"))
+EMBEDDING_CACHE_MODEL_KEY = (
+    (EMBEDDING_MODEL_NAME if EMBEDDING_BACKEND == "torch" else f"{EMBEDDING_MODEL_NAME}@{EMBEDDING_BACKEND}")
+    + (f"+chunk{EMBEDDING_CHUNK_WORDS}x{EMBEDDING_MAX_CHUNKS_PER_DOC}" if EMBEDDING_MODE == "chunked" else "")
+)
 
 LOG_DIR = "logs"
 os.makedirs(LOG_DIR, exist_ok=True)
@@ -50,6 +65,40 @@ class PyObjectId(ObjectId):
         return JsonSchemaValue({'type': 'string', 'format': 'objectid'})
 
 
+# --- Managed Indexes ---
+# Every query path's index lives here; ensure_indexes() applies the set idempotently on connect.
+MONGO_ENSURE_INDEXES = os.getenv("MONGO_ENSURE_INDEXES", "true").lower() in ("1", "true", "yes")
+MANAGED_INDEXES: Dict[str, List[IndexModel]] = {
+    "scheduled_interviews": [
+        IndexModel([("start_time", ASCENDING), ("_id", ASCENDING)], name="start_time_1__id_1"), # /api/upcoming-interviews keyset pages
+    ],
+    "resumes": [
+        IndexModel([("session_id", ASCENDING)], name="session_id_1"),
+        IndexModel([("jd_id", ASCENDING)], name="jd_id_1"),
+    ],
+    "match_results": [
+        IndexModel([("session_id", ASCENDING), ("jd_fit_score", DESCENDING)], name="session_id_1_jd_fit_score_-1"), # Session lookups + ranked session reports
+        IndexModel([("jd_id", ASCENDING), ("jd_fit_score", DESCENDING)], name="jd_id_1_jd_fit_score_-1"), # Ranked results per JD
+        IndexModel([("resume_id", ASCENDING)], name="resume_id_1"),
+    ],
+    "analytics_rollups": [
+        IndexModel([("kind", ASCENDING), ("candidates", DESCENDING)], name="kind_1_candidates_-1"), # Top JDs by candidate count
+    ],
+    "match_jobs": [
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_1", expireAfterSeconds=0), # TTL: match_jobs.py sets expires_at on every write
+    ],
+}
+# Indexes earlier releases created that nothing queries any more; ensure_indexes() drops them where present.
+# The parse caches are looked up by _id (which embeds the content hash), so content_hash_1 only cost writes.
+RETIRED_INDEXES: Dict[str, List[str]] = {
+    "scheduled_interviews": ["start_time_1"], # Superseded by start_time_1__id_1
+    "resumes": ["content_hash_1"],
+    "match_results": ["session_id_1"], # Superseded by session_id_1_jd_fit_score_-1
+    "parsed_resume_cache": ["content_hash_1"],
+    "parsed_jd_cache": ["content_hash_1"],
+}
+
+
 class MongoDBManager:
     client: Optional[AsyncIOMotorClient] = None
     db: Optional[Any] = None
@@ -65,6 +114,8 @@ class MongoDBManager:
             await self.client.admin.command('ping')
             self.db = self.client[DATABASE_NAME]
             logger.info(f"Successfully connected to MongoDB, database: {DATABASE_NAME}")
+            if MONGO_ENSURE_INDEXES:
+                await self.ensure_indexes()
         except Exception as e:
             logger.error(f"Failed to connect to MongoDB: {e}", exc_info=True)
             if self.client:
@@ -72,6 +123,46 @@ class MongoDBManager:
             self.client = None
             self.db = None
 
+    async def ensure_indexes(self) -> Dict[str, Dict[str, List[str]]]:
+        """
+        Creates any MANAGED_INDEXES missing from their collections, drops RETIRED_INDEXES, and logs what changed
+        along with any other index nobody manages (left in place: an operator may have added it).
+        Returns {collection: {"created", "existing", "dropped", "unmanaged", "failed"}}. A failure on one collection does not stop the others.
+        """
+        report: Dict[str, Dict[str, List[str]]] = {}
+        for collection_name in dict.fromkeys([*MANAGED_INDEXES, *RETIRED_INDEXES]):
+            index_models = MANAGED_INDEXES.get(collection_name, [])
+            collection = self.db[collection_name]
+            collection_report = {"created": [], "existing": [], "dropped": [], "unmanaged": [], "failed": []}
+            try:
+                existing_names = set((await collection.index_information()).keys())
+                managed_names = {index.document["name"] for index in index_models}
+                missing = [index for index in index_models if index.document["name"] not in existing_names]
+                collection_report["existing"] = [index.document["name"] for index in index_models if index.document["name"] in existing_names]
+                if missing:
+                    collection_report["created"] = await collection.create_indexes(missing)
+                for name in RETIRED_INDEXES.get(collection_name, []):
+                    if name in existing_names and name not in managed_names:
+                        await collection.drop_index(name)
+                        collection_report["dropped"].append(name)
+                retired_names = set(RETIRED_INDEXES.get(collection_name, []))
+                collection_report["unmanaged"] = sorted(existing_names - managed_names - retired_names - {"_id_"})
+            except Exception as e:
+                collection_report["failed"] = [index.document["name"] for index in index_models if index.document["name"] not in collection_report["existing"]]
+                logger.error(f"Could not ensure indexes on '{collection_name}': {e}", exc_info=True)
+            report[collection_name] = collection_report
+
+        for collection_name, collection_report in report.items():
+            logger.info(
+                f"Indexes on '{collection_name}': created {collection_report['created'] or '-'}, "
+                f"existing {collection_report['existing'] or '-'}"
+                + (f", dropped retired {collection_report['dropped']}" if collection_report["dropped"] else "")
+                + (f", FAILED {collection_report['failed']}" if collection_report["failed"] else "")
+            )
+            if collection_report["unmanaged"]:
+                logger.warning(f"Unmanaged indexes on '{collection_name}' (not in MANAGED_INDEXES; left in place): {collection_report['unmanaged']}")
+        return report
+
     async def close_database_connection(self):
         if self.client:
             logger.info("Closing MongoDB connection...")
@@ -89,6 +180,28 @@ class MongoDBManager:
 
 db_manager = MongoDBManager()
 
+MONGO_BULK_WRITE_CHUNK_SIZE = int(os.getenv("MONGO_BULK_WRITE_CHUNK_SIZE", "500"))
+
+async def bulk_insert_documents(collection, documents: List[Dict[str, Any]], chunk_size: int = MONGO_BULK_WRITE_CHUNK_SIZE) -> set:
+    """
+    Inserts documents with unordered insert_many, chunk_size per round-trip.
+    Documents must already carry their _id so callers can reference them without reading results back.
+    Returns the _ids that failed to insert; the rest of a chunk is still written when one document fails.
+    """
+    failed_ids = set()
+    for start in range(0, len(documents), max(1, chunk_size)):
+        chunk = documents[start:start + chunk_size]
+        try:
+            await collection.insert_many(chunk, ordered=False)
+        except BulkWriteError as e:
+            write_errors = e.details.get("writeErrors", [])
+            failed_ids.update(chunk[err["index"]]["_id"] for err in write_errors)
+            logger.error(f"Bulk insert into '{collection.name}': {len(write_errors)}/{len(chunk)} documents failed: {write_errors[:3]}")
+        except Exception as e:
+            failed_ids.update(doc["_id"] for doc in chunk)
+            logger.error(f"Bulk insert into '{collection.name}' failed for {len(chunk)} documents: {e}", exc_info=True)
+    return failed_ids
+
 class BaseDBModel(BaseModel):
     model_config = {
         "populate_by_name": True,
@@ -112,8 +225,34 @@ class ResumeDB(BaseDBModel):
     session_id: Optional[str] = None
     filename: str
     parsed_text: str
+    content_hash: Optional[str] = None
+    parse_status: Optional[str] = None # "timed_out" when the file exceeded its parse budget
     uploaded_at: datetime = Field(default_factory=datetime.utcnow)
 
+# Content-addressed cache of parsed resumes; _id is "<sha256>:<parser version>:<embedding model>"
+class ParsedResumeCacheDB(BaseDBModel):
+    id: str = Field(alias="_id")
+    content_hash: str
+    parser_version: str
+    embedding_model: str
+    parsed_text: str
+    skills: List[str] = Field(default_factory=list)
+    person_entities: Optional[List[Tuple[str, int]]] = None
+    embedding: Optional[List[float]] = None
+    cached_at: datetime = Field(default_factory=datetime.utcnow)
+
+# Parsed-JD cache: the full parse_jd_file result; embeddings are stored as plain float lists
+class ParsedJDCacheDB(BaseDBModel):
+    id: str = Field(alias="_id")
+    content_hash: str
+    parser_version: str
+    embedding_model: str
+    parsed_text: str
+    categorized_keywords: Dict[str, List[str]] = Field(default_factory=dict)
+    sections: Dict[str, str] = Field(default_factory=dict)
+    embeddings: Dict[str, List[float]] = Field(default_factory=dict)
+    cached_at: datetime = Field(default_factory=datetime.utcnow)
+
 class MatchResultDB(BaseDBModel):
     id: Optional[PyObjectId] = Field(default=None, alias="_id")
     resume_id: PyObjectId
@@ -124,6 +263,7 @@ class MatchResultDB(BaseDBModel):
     interview_score: float
     red_flags: List[str] = Field(default_factory=list)
     experience_summary: str
+    original_filename: Optional[str] = None
     matched_at: datetime = Field(default_factory=datetime.utcnow)
 
     @field_validator('resume_id', 'jd_id', mode='before')
@@ -151,4 +291,32 @@ class ScheduledInterviewDB(BaseDBModel):
     created_at: datetime = Field(default_factory=datetime.utcnow)
     # Optional: jd_id and resume_id if you want to link back to the specific match
     jd_id: Optional[PyObjectId] = None
-    resume_id: Optional[PyObjectId] = None
\ No newline at end of file
+    resume_id: Optional[PyObjectId] = None
+
+
+# --- API request models ---
+BULK_SCHEDULE_MAX_ITEMS = int(os.getenv("BULK_SCHEDULE_MAX_ITEMS", "200"))
+
+class BulkInterviewItem(BaseModel):
+    # Emails are checked per item (as ScheduledInterviewDB) so one bad row does not reject the whole request
+    candidate_name: str
+    candidate_email: str
+    interviewer_emails: List[str]
+    start_time: str # Same format as /api/schedule-interview: YYYY-MM-DDTHH:MM, server-local unless an offset is given
+    duration_minutes: int = Field(gt=0, le=24 * 60)
+    jd_id: Optional[str] = None
+    resume_id: Optional[str] = None
+
+class BulkScheduleRequest(BaseModel):
+    interviews: List[BulkInterviewItem] = Field(min_length=1, max_length=BULK_SCHEDULE_MAX_ITEMS)
+
+class InterviewConflictCheckRequest(BaseModel):
+    interviewer_emails: List[str] = Field(min_length=1)
+    start_time: str # YYYY-MM-DDTHH:MM, server-local unless an offset is given
+    duration_minutes: int = Field(gt=0, le=24 * 60)
+
+class AutoSlotRequest(BaseModel):
+    interviewer_emails: List[str] = Field(min_length=1)
+    duration_minutes: int = Field(gt=0, le=24 * 60)
+    earliest_start: Optional[str] = None # Defaults to now
+    latest_end: Optional[str] = None # Defaults to AUTO_SLOT_HORIZON_DAYS after earliest_start
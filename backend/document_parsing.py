@@ -0,0 +1,350 @@
+# document_parsing.py
+import asyncio
+import multiprocessing
+import os
+import queue
+import re
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Dict, Any, Optional, Set, Tuple
+
+from database import logger
+from model_registry import model_registry
+from text_extraction import extract_text, cached_text, remember_text, forward_extraction_events, take_forwarded_events, record_extraction_event
+
+# Text extraction and cleaning for uploaded documents, shared by the resume and JD parsers, and the worker pools
+# that keep it off the API process. Nothing here imports either parser, so both can import it at module level.
+
+PARSE_OK = "ok"
+PARSE_TIMED_OUT = "timed_out"
+
+
+def clean_extracted_text(text: str) -> str:
+    if not text: return ""
+    text = re.sub(r'\s+', ' ', text).strip()
+    text = re.sub(r'http\S+|www\S+|https\S+', '', text, flags=re.MULTILINE)
+    text = re.sub(r'\S+@\S*\s?', '', text)
+    # Slightly more permissive regex for allowed characters, includes '&', '@', '*', "'"
+    text = re.sub(r'[^\w\s\.\,\-\/\(\)\+\#\:\%\&\@\*\']', '', text)
+    text = ''.join(filter(lambda x: x.isprintable() or x in '\n\r\t', text))
+    text = "\n".join([line.strip() for line in text.splitlines() if line.strip()])
+    return text.strip()
+
+def unparsed_document(filename: str, parse_status: str = PARSE_OK, parse_error: Optional[str] = None) -> Dict[str, Any]:
+    return {"filename": filename, "parsed_text": "", "raw_content": "", "parse_status": parse_status, "parse_error": parse_error}
+
+
+def parse_document_content(filename: str, content: bytes) -> Dict[str, Any]:
+    """
+    Synchronous extraction core: raw text plus its cleaned form. Takes raw bytes so it can run in a worker as well as inline.
+    A document the extractor fails on is read as plain text and marked degraded.
+    """
+    parsed_info = unparsed_document(filename)
+    try:
+        raw_parsed_text = extract_text(content, filename)
+        parsed_text = clean_extracted_text(raw_parsed_text)
+        if not parsed_text.strip():
+            logger.warning(f"No text could be extracted or cleaned from document: {filename}")
+            return parsed_info
+        parsed_info["parsed_text"] = parsed_text
+        parsed_info["raw_content"] = raw_parsed_text # The version before heavy cleaning
+        logger.debug(f"Document '{filename}' - Cleaned Parsed Text (first 300 chars): {parsed_text[:300]}")
+    except Exception as e:
+        logger.error(f"Error extracting text from {filename}: {e}", exc_info=True)
+        try:
+            raw_parsed_text_fallback = content.decode('utf-8', errors='replace').strip()
+            parsed_info["parsed_text"] = clean_extracted_text(raw_parsed_text_fallback)
+            parsed_info["raw_content"] = raw_parsed_text_fallback
+            parsed_info["degraded"] = True # A later attempt may extract it properly
+            logger.info(f"Fallback: Read {filename} as plain text.")
+        except Exception as e_fallback:
+            logger.error(f"Plain text fallback also failed for {filename}: {e_fallback}")
+            parsed_info["parsed_text"] = parsed_info["raw_content"] = ""
+    return parsed_info
+
+
+# --- Process-pool parsing engine ---
+# "inline" parses in the API process; "process" fans documents out to a pool of workers that load spaCy once
+# (resume_parser also annotates resumes there).
+RESUME_PARSE_MODE = os.getenv("RESUME_PARSE_MODE", "inline").lower()
+RESUME_PARSE_WORKERS = int(os.getenv("RESUME_PARSE_WORKERS", str(os.cpu_count() or 2)))
+PARSE_WORKER_MODELS = ["spacy"]
+
+_parse_process_pool: Optional[ProcessPoolExecutor] = None
+
+def _init_parse_worker():
+    # Load (and warm) spaCy once per worker, not per resume. Workers extract and annotate; embedding stays in the
+    # API process, so a sentence model here would be one unused encoder per core.
+    forward_extraction_events()
+    model_registry.load_all(warm_up=True, names=PARSE_WORKER_MODELS)
+    logger.info(f"Resume parse worker {os.getpid()} ready: {model_registry.status()['spacy']}")
+
+def _warm_parse_worker() -> int:
+    return os.getpid()
+
+def _parse_in_worker(filename: str, content: bytes) -> Dict[str, Any]:
+    # Extraction stats and hooks live in the API process: the worker's events go back with the result
+    parsed_info = parse_document_content(filename, content)
+    parsed_info["extraction_events"] = take_forwarded_events()
+    return parsed_info
+
+def get_parse_process_pool() -> ProcessPoolExecutor:
+    global _parse_process_pool
+    if _parse_process_pool is None:
+        # spawn: workers must not inherit torch/spaCy thread state from the API process
+        _parse_process_pool = ProcessPoolExecutor(
+            max_workers=max(1, RESUME_PARSE_WORKERS),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_parse_worker
+        )
+        logger.info(f"Started resume parse process pool with {RESUME_PARSE_WORKERS} workers.")
+    return _parse_process_pool
+
+async def start_parse_pool():
+    """Starts the worker pools and waits for every worker to finish loading its models."""
+    if RESUME_PARSE_ISOLATION:
+        await ready_extraction_pool()
+        logger.info("Resume extraction workers warmed up.")
+    if RESUME_PARSE_MODE != "process":
+        return
+    pool = get_parse_process_pool()
+    loop = asyncio.get_running_loop()
+    worker_pids = await asyncio.gather(*[loop.run_in_executor(pool, _warm_parse_worker) for _ in range(max(1, RESUME_PARSE_WORKERS))])
+    logger.info(f"Resume parse workers warmed up: {sorted(set(worker_pids))}")
+
+def shutdown_parse_pool():
+    global _parse_process_pool
+    if _parse_process_pool is not None:
+        _parse_process_pool.shutdown(wait=False, cancel_futures=True)
+        _parse_process_pool = None
+        logger.info("Resume parse process pool shut down.")
+
+# --- Deadline-bounded extraction ---
+# Text extraction (PyPDF2 on a malformed file can spin for minutes) runs in light, model-free workers with a
+# per-document CPU and wall-clock budget. The budgets raise inside the worker; a worker stuck in C code past the
+# hard deadline is killed and the pool replaced. Over-budget documents come back as PARSE_TIMED_OUT results.
+RESUME_PARSE_ISOLATION = os.getenv("RESUME_PARSE_ISOLATION", "true").lower() in ("1", "true", "yes")
+RESUME_EXTRACT_WORKERS = int(os.getenv("RESUME_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 2))))
+RESUME_PARSE_TIMEOUT_SECONDS = float(os.getenv("RESUME_PARSE_TIMEOUT_SECONDS", "30")) # Wall clock per document
+RESUME_PARSE_CPU_SECONDS = int(os.getenv("RESUME_PARSE_CPU_SECONDS", "20")) # CPU time per document (POSIX only)
+RESUME_PARSE_KILL_GRACE_SECONDS = float(os.getenv("RESUME_PARSE_KILL_GRACE_SECONDS", "5")) # Past the deadline before the worker is killed
+
+_extraction_pool: Optional[ProcessPoolExecutor] = None
+_extraction_pool_workers: Dict[ProcessPoolExecutor, Tuple[Any, Set[int]]] = {} # pool -> (queue its workers report PIDs on, PIDs seen)
+_extraction_pool_warmup: Optional[Tuple[ProcessPoolExecutor, asyncio.Future]] = None
+_extraction_slots: Optional[asyncio.Semaphore] = None
+
+
+class DocumentBudgetExceeded(BaseException):
+    # BaseException so the broad `except Exception` fallbacks in the parsing code cannot swallow it
+    pass
+
+def _raise_budget_exceeded(signum, frame):
+    raise DocumentBudgetExceeded(signal.Signals(signum).name)
+
+def _set_cpu_budget(cpu_seconds: Optional[int]):
+    try:
+        import resource
+    except ImportError: # Not available on Windows; the wall-clock deadline still applies
+        return
+    _, hard_limit = resource.getrlimit(resource.RLIMIT_CPU)
+    if cpu_seconds is None:
+        resource.setrlimit(resource.RLIMIT_CPU, (hard_limit, hard_limit))
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft_limit = int(usage.ru_utime + usage.ru_stime) + 1 + cpu_seconds # RLIMIT_CPU counts the worker's lifetime CPU
+    if hard_limit != resource.RLIM_INFINITY:
+        soft_limit = min(soft_limit, hard_limit)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft_limit, hard_limit))
+
+def _init_extraction_worker(pid_queue):
+    if hasattr(signal, "SIGXCPU"):
+        signal.signal(signal.SIGXCPU, _raise_budget_exceeded)
+    if hasattr(signal, "SIGALRM"):
+        signal.signal(signal.SIGALRM, _raise_budget_exceeded)
+    forward_extraction_events()
+    pid_queue.put(os.getpid()) # So a stuck worker can be killed without reaching into the pool's internals
+
+def _parse_with_budget(filename: str, content: bytes, cpu_seconds: int, wall_seconds: float) -> Dict[str, Any]:
+    # Runs in an extraction worker (main thread, so the signal handlers fire here)
+    try:
+        _set_cpu_budget(cpu_seconds)
+        if hasattr(signal, "setitimer"):
+            signal.setitimer(signal.ITIMER_REAL, wall_seconds)
+        return _parse_in_worker(filename, content)
+    except DocumentBudgetExceeded as e:
+        limit = f"{cpu_seconds}s CPU" if str(e) == "SIGXCPU" else f"{wall_seconds:g}s"
+        logger.warning(f"Parsing {filename} exceeded its {limit} budget; reporting it as timed out.")
+        return {**unparsed_document(filename, PARSE_TIMED_OUT, f"Parsing exceeded the {limit} budget."), "extraction_events": take_forwarded_events()}
+    finally:
+        if hasattr(signal, "setitimer"):
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        _set_cpu_budget(None)
+
+def get_extraction_pool() -> ProcessPoolExecutor:
+    global _extraction_pool
+    if _extraction_pool is None:
+        context = multiprocessing.get_context("spawn")
+        pid_queue = context.Queue()
+        _extraction_pool = ProcessPoolExecutor(
+            max_workers=max(1, RESUME_EXTRACT_WORKERS),
+            mp_context=context,
+            initializer=_init_extraction_worker,
+            initargs=(pid_queue,)
+        )
+        _extraction_pool_workers[_extraction_pool] = (pid_queue, set())
+        logger.info(f"Started resume extraction pool with {RESUME_EXTRACT_WORKERS} workers.")
+    return _extraction_pool
+
+async def ready_extraction_pool() -> ProcessPoolExecutor:
+    # Waits for the workers to spawn and import the parser, so that start-up time never counts against a document's deadline
+    global _extraction_pool_warmup
+    pool = get_extraction_pool()
+    if _extraction_pool_warmup is None or _extraction_pool_warmup[0] is not pool:
+        loop = asyncio.get_running_loop()
+        _extraction_pool_warmup = (pool, asyncio.gather(*[loop.run_in_executor(pool, _warm_parse_worker) for _ in range(max(1, RESUME_EXTRACT_WORKERS))]))
+    try:
+        await asyncio.shield(_extraction_pool_warmup[1])
+    except BrokenProcessPool:
+        pass # Surfaces again on the document's own submit
+    return pool
+
+def extraction_worker_pids(pool: ProcessPoolExecutor) -> Set[int]:
+    """PIDs of every worker the pool has started (each reports its own from the initializer)."""
+    pid_queue, pids = _extraction_pool_workers.get(pool, (None, set()))
+    while pid_queue is not None:
+        try:
+            pids.add(pid_queue.get_nowait())
+        except (queue.Empty, OSError, ValueError):
+            break
+    return pids
+
+def _forget_extraction_pool(pool: ProcessPoolExecutor):
+    pid_queue, _ = _extraction_pool_workers.pop(pool, (None, None))
+    if pid_queue is not None:
+        pid_queue.close()
+
+def _kill_extraction_pool(pool: ProcessPoolExecutor):
+    # Killing the workers breaks the pool: its other in-flight documents fail with BrokenProcessPool and are retried
+    global _extraction_pool
+    if _extraction_pool is pool:
+        _extraction_pool = None
+    kill_signal = getattr(signal, "SIGKILL", signal.SIGTERM) # SIGTERM is TerminateProcess on Windows
+    for pid in extraction_worker_pids(pool):
+        try:
+            os.kill(pid, kill_signal)
+        except ProcessLookupError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not kill extraction worker {pid}: {e}")
+    _forget_extraction_pool(pool)
+    pool.shutdown(wait=False)
+
+def shutdown_extraction_pool():
+    global _extraction_pool
+    if _extraction_pool is not None:
+        _extraction_pool.shutdown(wait=False, cancel_futures=True)
+        _forget_extraction_pool(_extraction_pool)
+        _extraction_pool = None
+        logger.info("Resume extraction pool shut down.")
+
+def _get_extraction_slots() -> asyncio.Semaphore:
+    # Submissions never exceed the worker count, so a document's deadline does not include time queued behind others
+    global _extraction_slots
+    if _extraction_slots is None:
+        _extraction_slots = asyncio.Semaphore(max(1, RESUME_EXTRACT_WORKERS))
+    return _extraction_slots
+
+async def _parse_isolated(filename: str, content: bytes) -> Optional[Dict[str, Any]]:
+    """Parsed document, a PARSE_TIMED_OUT result, or None if the pool broke underneath it (caller retries)."""
+    loop = asyncio.get_running_loop()
+    async with _get_extraction_slots():
+        pool = await ready_extraction_pool()
+        try:
+            return await asyncio.wait_for(
+                loop.run_in_executor(pool, _parse_with_budget, filename, content, RESUME_PARSE_CPU_SECONDS, RESUME_PARSE_TIMEOUT_SECONDS),
+                timeout=RESUME_PARSE_TIMEOUT_SECONDS + RESUME_PARSE_KILL_GRACE_SECONDS
+            )
+        except asyncio.TimeoutError:
+            logger.error(f"Parsing {filename} is stuck past its {RESUME_PARSE_TIMEOUT_SECONDS:g}s deadline; killing the extraction workers.")
+            _kill_extraction_pool(pool)
+            return unparsed_document(filename, PARSE_TIMED_OUT, f"Parsing exceeded the {RESUME_PARSE_TIMEOUT_SECONDS:g}s budget and was stopped.")
+        except BrokenProcessPool:
+            if _extraction_pool is pool:
+                _kill_extraction_pool(pool)
+            return None
+
+async def _parse_contents_isolated(documents: List[Tuple[str, bytes]]) -> List[Dict[str, Any]]:
+    results: List[Optional[Dict[str, Any]]] = [None] * len(documents)
+    pending = list(range(len(documents)))
+    for attempt in range(2): # A document caught in another's pool kill gets one retry in a fresh pool
+        outcomes = await asyncio.gather(*[_parse_isolated(*documents[i]) for i in pending])
+        for i, outcome in zip(pending, outcomes):
+            results[i] = outcome
+        pending = [i for i in pending if results[i] is None]
+        if not pending or attempt == 1:
+            break
+        logger.warning(f"Retrying {len(pending)} document(s) whose extraction worker was lost.")
+    for i in pending:
+        results[i] = unparsed_document(documents[i][0], PARSE_TIMED_OUT, "Extraction worker crashed while parsing this file.")
+
+    timed_out = [result["filename"] for result in results if result.get("parse_status") == PARSE_TIMED_OUT]
+    if timed_out:
+        logger.warning(f"{len(timed_out)}/{len(documents)} documents exceeded their parse budget: {timed_out}")
+    return results
+# --- End Deadline-bounded extraction ---
+
+async def _parse_contents_inline(documents: List[Tuple[str, bytes]]) -> List[Dict[str, Any]]:
+    # Still off the event loop, on the default thread pool
+    loop = asyncio.get_running_loop()
+    return await asyncio.gather(*[
+        loop.run_in_executor(None, parse_document_content, filename, content)
+        for filename, content in documents
+    ])
+
+async def _parse_contents_in_pool(documents: List[Tuple[str, bytes]]) -> List[Dict[str, Any]]:
+    loop = asyncio.get_running_loop()
+    try:
+        pool = get_parse_process_pool()
+        return await asyncio.gather(*[loop.run_in_executor(pool, _parse_in_worker, filename, content) for filename, content in documents])
+    except BrokenProcessPool as e:
+        logger.error(f"Resume parse process pool broke ({e}); restarting it and parsing this batch inline.")
+        shutdown_parse_pool()
+    return await _parse_contents_inline(documents)
+
+def _collect_worker_extraction(filename: str, content: bytes, parsed_info: Dict[str, Any]):
+    for event in parsed_info.pop("extraction_events", None) or []:
+        record_extraction_event(event)
+    if parsed_info.get("parse_status") == PARSE_OK and parsed_info.get("raw_content"):
+        remember_text(content, filename, parsed_info["raw_content"])
+
+async def parse_documents(documents: List[Tuple[str, bytes]]) -> List[Dict[str, Any]]:
+    """parse_document_content for each (filename, content) pair, in order, in whichever workers RESUME_PARSE_ISOLATION and RESUME_PARSE_MODE select."""
+    if not RESUME_PARSE_ISOLATION and RESUME_PARSE_MODE != "process":
+        return await _parse_contents_inline(documents)
+
+    # Extraction runs in worker processes, but the text cache, stats and hooks are the API process's:
+    # texts extracted before skip the workers (only cleaning is left), and worker results fill the cache.
+    results: List[Optional[Dict[str, Any]]] = [None] * len(documents)
+    cached_indices = [i for i, (filename, content) in enumerate(documents) if cached_text(content, filename) is not None]
+    cached_set = set(cached_indices)
+    dispatched_indices = [i for i in range(len(documents)) if i not in cached_set]
+    if cached_indices:
+        logger.info(f"Text cache hit for {len(cached_indices)}/{len(documents)} documents; not sending them to workers.")
+        for i, parsed_info in zip(cached_indices, await _parse_contents_inline([documents[i] for i in cached_indices])):
+            results[i] = parsed_info
+    if dispatched_indices:
+        dispatched_documents = [documents[i] for i in dispatched_indices]
+        parse_in_workers = _parse_contents_isolated if RESUME_PARSE_ISOLATION else _parse_contents_in_pool
+        for i, parsed_info in zip(dispatched_indices, await parse_in_workers(dispatched_documents)):
+            _collect_worker_extraction(*documents[i], parsed_info)
+            results[i] = parsed_info
+    return results
+
+async def parse_document_text(filename: str, content: bytes) -> Dict[str, Any]:
+    """
+    Extracted and cleaned text of one document (the JD parser uses it), under the same isolation and
+    deadlines as resumes. Returns unparsed_document's keys, filled in: parsed_text, raw_content, parse_status, parse_error.
+    """
+    return (await parse_documents([(filename, content)]))[0]
@@ -0,0 +1,179 @@
+# embedding_backend.py
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+from database import logger, EMBEDDING_MODEL_NAME, EMBEDDING_BACKEND
+
+# "torch": fp32 SentenceTransformer (reference)
+# "torch-int8": same model with its Linear layers dynamically quantized to int8
+# "onnx": SentenceTransformer's ONNX Runtime backend (needs optimum + onnxruntime); EMBEDDING_ONNX_FILE picks a
+#         pre-quantized export such as "onnx/model_qint8_avx512_vnni.onnx"
+SUPPORTED_EMBEDDING_BACKENDS = ("torch", "torch-int8", "onnx")
+EMBEDDING_ONNX_FILE = os.getenv("EMBEDDING_ONNX_FILE", "")
+EMBEDDING_TORCH_THREADS = int(os.getenv("EMBEDDING_TORCH_THREADS", "0")) # 0 = torch default
+
+
+def load_embedding_model(backend: str = EMBEDDING_BACKEND, model_name: str = EMBEDDING_MODEL_NAME):
+    """
+    Returns a model with SentenceTransformer's encode() for the requested backend.
+    Every backend produces embeddings of the same size, so the rest of the pipeline is unchanged.
+    """
+    from sentence_transformers import SentenceTransformer
+
+    backend = backend.lower()
+    if backend not in SUPPORTED_EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown EMBEDDING_BACKEND '{backend}'. Expected one of {SUPPORTED_EMBEDDING_BACKENDS}.")
+
+    if backend == "onnx":
+        model_kwargs = {"file_name": EMBEDDING_ONNX_FILE} if EMBEDDING_ONNX_FILE else None
+        model = SentenceTransformer(model_name, device="cpu", backend="onnx", model_kwargs=model_kwargs)
+        logger.info(f"Loaded '{model_name}' with the ONNX Runtime backend ({EMBEDDING_ONNX_FILE or 'default export'}).")
+        return model
+
+    import torch
+    if EMBEDDING_TORCH_THREADS > 0:
+        torch.set_num_threads(EMBEDDING_TORCH_THREADS)
+    model = SentenceTransformer(model_name, device="cpu" if backend == "torch-int8" else None)
+    if backend == "torch-int8":
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        logger.info(f"Loaded '{model_name}' with int8 dynamic quantization (torch).")
+    return model
+
+
+# --- Parity check ---
+def _cosine_rows(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    a_norms = np.linalg.norm(a, axis=1)
+    b_norms = np.linalg.norm(b, axis=1)
+    denom = np.where(a_norms * b_norms > 0, a_norms * b_norms, 1.0)
+    return np.einsum("ij,ij->i", a, b) / denom
+
+def _distribution(values: np.ndarray) -> Dict[str, float]:
+    if values.size == 0:
+        return {}
+    return {
+        "mean": round(float(values.mean()), 6),
+        "p50": round(float(np.percentile(values, 50)), 6),
+        "p95": round(float(np.percentile(values, 95)), 6),
+        "max": round(float(values.max()), 6),
+    }
+
+def _timed_embed(texts: List[str], model) -> Tuple[List[Any], float]:
+    from jd_parser import embed_texts
+    started = time.perf_counter()
+    embeddings = embed_texts(texts, sentence_model=model)
+    return embeddings, time.perf_counter() - started
+
+def _jd_fits(parsed_jd, jd_section_embeddings: Dict[str, Any], resumes: List[Dict[str, Any]], resume_embeddings: List[Any]) -> List[int]:
+    from match_engine import build_jd_match_context, calculate_semantic_scores, generate_match_score_and_details
+    parsed_jd_text, jd_categorized_keywords, jd_sections_text, _ = parsed_jd
+    jd_context = build_jd_match_context(parsed_jd_text, jd_categorized_keywords, jd_section_embeddings)
+    raw_semantic_scores = calculate_semantic_scores(jd_section_embeddings, resume_embeddings, jd_context)
+    return [
+        generate_match_score_and_details(
+            jd_sections_text, jd_section_embeddings, jd_categorized_keywords,
+            resume["parsed_text"], embedding, resume.get("skills", []), "Candidate",
+            jd_context, raw_semantic_score
+        )["final_jd_fit"]
+        for resume, embedding, raw_semantic_score in zip(resumes, resume_embeddings, raw_semantic_scores)
+    ]
+
+async def embedding_parity_report(
+    jd_filename: str,
+    jd_content: bytes,
+    resume_documents: List[Tuple[str, bytes]],
+    candidate_backend: str,
+    reference_backend: str = "torch"
+) -> Dict[str, Any]:
+    """
+    Embeds one JD and its resumes with both backends and reports cosine drift (1 - cosine between the two
+    embeddings of the same text), encode throughput, and how much each resume's jdFit moves.
+    Text extraction, keywords and skills are computed once and shared, so only the embeddings differ.
+    """
+    from jd_parser import parse_jd_content, jd_texts_to_embed
+    from resume_parser import parse_resume_content
+
+    parsed_jd = await parse_jd_content(jd_filename, jd_content)
+    if not parsed_jd[0]:
+        raise ValueError(f"Could not parse JD {jd_filename}")
+    parsed_jd_text, jd_categorized_keywords, jd_sections_text, _ = parsed_jd
+    jd_texts = {key: text for key, text in jd_texts_to_embed(parsed_jd_text, jd_sections_text, jd_categorized_keywords).items() if text and text.strip()}
+
+    # On a thread: the model registry never loads spaCy for a caller on the event loop, so skills would be regex-only
+    resumes = await asyncio.get_running_loop().run_in_executor(
+        None, lambda: [parse_resume_content(filename, content, embed=False, annotate=True) for filename, content in resume_documents]
+    )
+    resumes = [resume for resume in resumes if resume.get("parsed_text", "").strip()]
+    resume_texts = [resume["parsed_text"] for resume in resumes]
+
+    per_backend: Dict[str, Dict[str, Any]] = {}
+    for backend in (reference_backend, candidate_backend):
+        model = load_embedding_model(backend)
+        embed_texts_for_warmup = resume_texts[:2] or list(jd_texts.values())[:1]
+        _timed_embed(embed_texts_for_warmup, model) # First call pays lazy init; keep it out of the timing
+        resume_embeddings, resume_seconds = _timed_embed(resume_texts, model)
+        jd_embeddings_list, _ = _timed_embed(list(jd_texts.values()), model)
+        jd_section_embeddings = {key: emb for key, emb in zip(jd_texts.keys(), jd_embeddings_list) if emb is not None}
+        per_backend[backend] = {
+            "resume_embeddings": resume_embeddings,
+            "jd_embeddings": jd_section_embeddings,
+            "resume_seconds": resume_seconds,
+            "jd_fits": _jd_fits(parsed_jd, jd_section_embeddings, resumes, resume_embeddings),
+        }
+
+    reference, candidate = per_backend[reference_backend], per_backend[candidate_backend]
+    paired = [(r, c) for r, c in zip(reference["resume_embeddings"], candidate["resume_embeddings"]) if r is not None and c is not None]
+    resume_drift = 1.0 - _cosine_rows(np.vstack([r for r, _ in paired]), np.vstack([c for _, c in paired])) if paired else np.array([])
+    jd_keys = [key for key in reference["jd_embeddings"] if key in candidate["jd_embeddings"]]
+    jd_drift = 1.0 - _cosine_rows(
+        np.vstack([reference["jd_embeddings"][key] for key in jd_keys]),
+        np.vstack([candidate["jd_embeddings"][key] for key in jd_keys])
+    ) if jd_keys else np.array([])
+    fit_deltas = np.array([c - r for r, c in zip(reference["jd_fits"], candidate["jd_fits"])], dtype=np.float64)
+
+    return {
+        "model": EMBEDDING_MODEL_NAME,
+        "reference_backend": reference_backend,
+        "candidate_backend": candidate_backend,
+        "resumes": len(resumes),
+        "resume_cosine_drift": _distribution(resume_drift),
+        "jd_section_cosine_drift": _distribution(jd_drift),
+        "jd_fit_abs_delta": _distribution(np.abs(fit_deltas)),
+        "jd_fit_rank_changes": int(sum(
+            1 for r, c in zip(np.argsort(-np.array(reference["jd_fits"]), kind="stable"), np.argsort(-np.array(candidate["jd_fits"]), kind="stable")) if r != c
+        )),
+        "resume_encode_seconds": {
+            reference_backend: round(reference["resume_seconds"], 3),
+            candidate_backend: round(candidate["resume_seconds"], 3),
+        },
+        "speedup": round(reference["resume_seconds"] / candidate["resume_seconds"], 2) if candidate["resume_seconds"] > 0 else None,
+        "per_resume": [
+            {"filename": resume["filename"], "jdFit_reference": r_fit, "jdFit_candidate": c_fit}
+            for resume, r_fit, c_fit in zip(resumes, reference["jd_fits"], candidate["jd_fits"])
+        ],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare an embedding backend against the fp32 reference on a JD and its resumes.")
+    parser.add_argument("--backend", required=True, choices=SUPPORTED_EMBEDDING_BACKENDS)
+    parser.add_argument("--reference", default="torch", choices=SUPPORTED_EMBEDDING_BACKENDS)
+    parser.add_argument("--jd", required=True, help="Job description file (.pdf, .docx, .txt)")
+    parser.add_argument("resumes", nargs="+", help="Resume files")
+    args = parser.parse_args()
+
+    def _read(path: str) -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
+
+    report = asyncio.run(embedding_parity_report(
+        os.path.basename(args.jd), _read(args.jd),
+        [(os.path.basename(path), _read(path)) for path in args.resumes],
+        candidate_backend=args.backend, reference_backend=args.reference
+    ))
+    print(json.dumps(report, indent=2))
@@ -1,53 +1,188 @@
-import pandas as pd
-from typing import List, Dict, Any
+import asyncio
+import csv
 import os
-from datetime import datetime
+import time
+from contextlib import asynccontextmanager
+from typing import List, Dict, Any, Iterable, Optional
 
-from database import logger
+from bson import ObjectId
 
-REPORTS_DIR_BASE = "static" # Excel files will be served from /static/reports/
+from database import logger, db_manager
+
+REPORTS_DIR_BASE = "static" # Generated reports are cached under static/reports/ and served by /api/reports/{session_id}
 REPORTS_SUBDIR = "reports"
 FULL_REPORTS_DIR = os.path.join(REPORTS_DIR_BASE, REPORTS_SUBDIR)
+REPORT_FORMATS = ("xlsx", "csv")
+REPORT_BATCH_SIZE = int(os.getenv("REPORT_BATCH_SIZE", "500")) # Match results read (and rows written) per round trip
+REPORT_MAX_AGE_HOURS = float(os.getenv("REPORT_MAX_AGE_HOURS", "24")) # Cached reports not downloaded for this long are deleted (rebuilt on demand)
+REPORT_CLEANUP_INTERVAL_SECONDS = float(os.getenv("REPORT_CLEANUP_INTERVAL_SECONDS", "600"))
+
+REPORT_COLUMNS = ["Candidate Name", "JD Fit (%)", "Interview Score (X/5)", "Red Flags", "Experience Summary", "Original Filename"]
+_REPORT_PROJECTION = {"candidate_name": 1, "jd_fit_score": 1, "interview_score": 1, "red_flags": 1, "experience_summary": 1, "original_filename": 1, "resume_id": 1}
 
 os.makedirs(FULL_REPORTS_DIR, exist_ok=True) # Ensure directory exists
 
-def export_to_excel(match_results: List[Dict[str, Any]]) -> str:
+_report_locks: Dict[str, List[Any]] = {} # "session:format" -> [lock, requests holding or waiting for it]; dropped when none are
+_last_cleanup = 0.0
+
+
+class ReportNotFound(Exception):
+    pass
+
+
+def report_url(session_id: str, report_format: str = "xlsx") -> str:
+    # Cheap to hand out: nothing is generated until someone follows the link
+    return f"/api/reports/{session_id}?format={report_format}"
+
+
+def _report_row(match_doc: Dict[str, Any], filenames: Dict[ObjectId, str]) -> List[Any]:
+    return [
+        match_doc.get("candidate_name", "N/A"),
+        match_doc.get("jd_fit_score", 0),
+        match_doc.get("interview_score", 0),
+        ", ".join(match_doc.get("red_flags") or ["None"]),
+        match_doc.get("experience_summary", "N/A"),
+        match_doc.get("original_filename") or filenames.get(match_doc.get("resume_id"), "N/A"),
+    ]
+
+
+class _XlsxReportWriter:
+    # openpyxl write-only mode streams rows to a temp file instead of keeping cell objects in memory
+    def __init__(self, path: str):
+        from openpyxl import Workbook # Imported on first report, not at startup
+        self.path = path
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet("Candidates")
+        self.sheet.append(REPORT_COLUMNS)
+
+    def write_rows(self, rows: Iterable[List[Any]]):
+        for row in rows:
+            self.sheet.append(row)
+
+    def close(self):
+        self.workbook.save(self.path)
+
+
+class _CsvReportWriter:
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, "w", newline="", encoding="utf-8-sig") # BOM so Excel opens it as UTF-8
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(REPORT_COLUMNS)
+
+    def write_rows(self, rows: Iterable[List[Any]]):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+async def _filenames_for(resumes_collection, match_docs: List[Dict[str, Any]]) -> Dict[ObjectId, str]:
+    # Match results saved before original_filename was stored on them get it from their resume
+    missing_ids = [doc["resume_id"] for doc in match_docs if not doc.get("original_filename") and doc.get("resume_id")]
+    if not missing_ids or resumes_collection is None:
+        return {}
+    cursor = resumes_collection.find({"_id": {"$in": missing_ids}}, {"filename": 1})
+    return {doc["_id"]: doc.get("filename", "N/A") async for doc in cursor}
+
+
+async def _write_session_report(session_id: str, report_format: str, path: str) -> int:
+    matches_collection = db_manager.get_collection("match_results")
+    resumes_collection = db_manager.get_collection("resumes")
+    loop = asyncio.get_running_loop()
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    writer = await loop.run_in_executor(None, _XlsxReportWriter if report_format == "xlsx" else _CsvReportWriter, temp_path)
+    rows_written = 0
+    try:
+        cursor = matches_collection.find({"session_id": session_id}, _REPORT_PROJECTION) \
+            .sort([("jd_fit_score", -1), ("_id", 1)]).batch_size(REPORT_BATCH_SIZE)
+        batch: List[Dict[str, Any]] = []
+        async for match_doc in cursor:
+            batch.append(match_doc)
+            if len(batch) >= REPORT_BATCH_SIZE:
+                filenames = await _filenames_for(resumes_collection, batch)
+                await loop.run_in_executor(None, writer.write_rows, [_report_row(doc, filenames) for doc in batch])
+                rows_written += len(batch)
+                batch = []
+        if batch:
+            filenames = await _filenames_for(resumes_collection, batch)
+            await loop.run_in_executor(None, writer.write_rows, [_report_row(doc, filenames) for doc in batch])
+            rows_written += len(batch)
+        await loop.run_in_executor(None, writer.close)
+        os.replace(temp_path, path) # Readers never see a half-written report
+    except BaseException:
+        try:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    return rows_written
+
+
+@asynccontextmanager
+async def _report_lock(lock_key: str):
+    entry = _report_locks.setdefault(lock_key, [asyncio.Lock(), 0])
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0:
+            del _report_locks[lock_key]
+
+
+def _delete_stale_reports(max_age_seconds: float) -> int:
+    # Age is time since the report was last downloaded: serving a cached report refreshes its mtime
+    cutoff = time.time() - max_age_seconds
+    deleted = 0
+    if not os.path.isdir(FULL_REPORTS_DIR):
+        return 0
+    with os.scandir(FULL_REPORTS_DIR) as entries:
+        for entry in entries:
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    deleted += 1
+            except OSError as e: # Removed concurrently, or still open on Windows; the next sweep retries
+                logger.debug(f"Could not delete stale report {entry.path}: {e}")
+    return deleted
+
+async def cleanup_stale_reports(force: bool = False) -> int:
+    """Deletes cached reports older than REPORT_MAX_AGE_HOURS, at most once per REPORT_CLEANUP_INTERVAL_SECONDS unless forced."""
+    global _last_cleanup
+    if REPORT_MAX_AGE_HOURS <= 0 or (not force and time.monotonic() - _last_cleanup < REPORT_CLEANUP_INTERVAL_SECONDS):
+        return 0
+    _last_cleanup = time.monotonic()
+    deleted = await asyncio.get_running_loop().run_in_executor(None, _delete_stale_reports, REPORT_MAX_AGE_HOURS * 3600)
+    if deleted:
+        logger.info(f"Deleted {deleted} cached report(s) not downloaded in the last {REPORT_MAX_AGE_HOURS:g}h.")
+    return deleted
+
+
+async def build_session_report(session_id: str, report_format: str = "xlsx") -> str:
     """
-    Exports the matching results to an Excel file.
-    Returns the web-accessible path to the file.
+    Path of the session's report, generating it from match_results on first request.
+    The file name carries the session's result count, so a report requested while a
+    session was still saving results is rebuilt once more results have landed.
     """
-    if not match_results:
-        logger.warning("No match results to export to Excel.")
-        return ""
+    if report_format not in REPORT_FORMATS:
+        raise ValueError(f"Unsupported report format '{report_format}'. Expected one of {REPORT_FORMATS}.")
+    matches_collection = db_manager.get_collection("match_results")
+    if matches_collection is None:
+        raise RuntimeError("Match results collection unavailable.")
 
-    try:
-        # Prepare data for DataFrame
-        export_data = []
-        for res in match_results:
-            export_data.append({
-                "Candidate Name": res.get("name", "N/A"),
-                "JD Fit (%)": res.get("jdFit", 0),
-                "Interview Score (X/5)": res.get("interviewScore", 0),
-                "Red Flags": ", ".join(res.get("redFlags", []) if res.get("redFlags") else ["None"]),
-                "Experience Summary": res.get("experienceSummary", "N/A"),
-                "Original Filename": res.get("original_filename", "N/A")
-            })
-
-        df = pd.DataFrame(export_data)
-        
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        excel_filename = f"MatchedCandidates_{timestamp}.xlsx"
-        excel_filepath_system = os.path.join(FULL_REPORTS_DIR, excel_filename)
-        
-        # Use openpyxl engine for .xlsx format
-        df.to_excel(excel_filepath_system, index=False, engine='openpyxl')
-        
-        logger.info(f"Successfully exported results to {excel_filepath_system}")
-        
-        # Return web-accessible path
-        excel_url_path = f"/{REPORTS_DIR_BASE}/{REPORTS_SUBDIR}/{excel_filename}"
-        return excel_url_path
-
-    except Exception as e:
-        logger.error(f"Error exporting to Excel: {e}")
-        return ""
\ No newline at end of file
+    result_count = await matches_collection.count_documents({"session_id": session_id})
+    if result_count == 0:
+        raise ReportNotFound(f"No match results found for session {session_id}.")
+
+    path = os.path.join(FULL_REPORTS_DIR, f"session_{session_id}_{result_count}.{report_format}")
+    async with _report_lock(f"{session_id}:{report_format}"): # Concurrent first downloads build the report once
+        try:
+            os.utime(path) # Cache hit: mark it recently used so the cleanup keeps it
+        except FileNotFoundError:
+            rows_written = await _write_session_report(session_id, report_format, path)
+            logger.info(f"Generated {report_format} report for session {session_id}: {rows_written} rows at {path}")
+    await cleanup_stale_reports()
+    return path
@@ -0,0 +1,214 @@
+# google_calendar.py
+import asyncio
+import json
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Callable, Optional, Tuple
+
+from database import logger
+
+# Google API client layer. Credentials are loaded once and refreshed in one place; discovery-built services are
+# cached per worker thread (httplib2 connections are not thread-safe); every blocking .execute() runs on a small
+# dedicated thread pool, so scheduling never stalls the event loop or competes with /api/match for the default executor.
+GOOGLE_TOKEN_FILE = os.getenv("GOOGLE_TOKEN_FILE", "token.json")
+GOOGLE_API_WORKERS = int(os.getenv("GOOGLE_API_WORKERS", "4"))
+GOOGLE_API_NUM_RETRIES = int(os.getenv("GOOGLE_API_NUM_RETRIES", "2")) # Retries on 5xx/429 with backoff, inside the worker
+GOOGLE_BATCH_SIZE = int(os.getenv("GOOGLE_BATCH_SIZE", "50")) # Calls per batch HTTP request (Calendar's documented limit is 50)
+# Point the clients at another endpoint, e.g. a local fake Google server in tests: GOOGLE_API_ROOT_URL=http://127.0.0.1:8089/
+GOOGLE_API_ROOT_URL = os.getenv("GOOGLE_API_ROOT_URL", "")
+GOOGLE_SCOPES = [
+    'https://www.googleapis.com/auth/calendar',
+    'https://www.googleapis.com/auth/gmail.send',
+    'https://www.googleapis.com/auth/drive.file'
+]
+
+
+class GoogleAuthRequired(Exception):
+    pass
+
+
+class GoogleCredentialsManager:
+    """Holds the user's OAuth credentials in memory; token.json is read once and written only after a refresh or a new grant."""
+    def __init__(self, token_file: str = GOOGLE_TOKEN_FILE, scopes=GOOGLE_SCOPES):
+        self.token_file = token_file
+        self.scopes = scopes
+        self.generation = 0 # Bumped on every new grant so cached services are rebuilt
+        self._credentials = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        from google.oauth2.credentials import Credentials
+        if os.path.exists(self.token_file):
+            self._credentials = Credentials.from_authorized_user_file(self.token_file, self.scopes)
+        self._loaded = True
+
+    def _write(self):
+        with open(self.token_file, 'w') as token:
+            token.write(self._credentials.to_json())
+
+    def store(self, credentials):
+        """Saves credentials from a completed OAuth flow (the /callback endpoint)."""
+        with self._lock:
+            self._credentials = credentials
+            self._loaded = True
+            self.generation += 1
+            self._write()
+
+    def get_valid(self):
+        """Valid credentials, refreshing (and persisting) them if expired. Blocking: call from the Google API pool."""
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            credentials = self._credentials
+            if credentials and credentials.valid:
+                return credentials
+            if credentials and credentials.expired and credentials.refresh_token:
+                from google.auth.transport.requests import Request as GoogleRequest
+                try:
+                    credentials.refresh(GoogleRequest())
+                except Exception as refresh_err:
+                    logger.error(f"Error refreshing Google credentials: {refresh_err}")
+                    raise GoogleAuthRequired("Failed to refresh credentials.")
+                self._write()
+                logger.info("Google credentials refreshed.")
+                return credentials
+            logger.warning("Authentication required for Google API access.")
+            raise GoogleAuthRequired("User not authenticated.")
+
+
+google_credentials = GoogleCredentialsManager()
+
+_google_api_pool: Optional[ThreadPoolExecutor] = None
+_thread_services = threading.local()
+
+
+def get_google_api_pool() -> ThreadPoolExecutor:
+    global _google_api_pool
+    if _google_api_pool is None:
+        _google_api_pool = ThreadPoolExecutor(max_workers=max(1, GOOGLE_API_WORKERS), thread_name_prefix="google-api")
+    return _google_api_pool
+
+def shutdown_google_api_pool():
+    global _google_api_pool
+    if _google_api_pool is not None:
+        _google_api_pool.shutdown(wait=False, cancel_futures=True)
+        _google_api_pool = None
+        logger.info("Google API thread pool shut down.")
+
+
+def _discovery_document_with_root(api_name: str, api_version: str) -> Dict[str, Any]:
+    # Swap only rootUrl so each API keeps its servicePath (client_options.api_endpoint would replace both)
+    from googleapiclient.discovery_cache import get_static_doc
+    document = json.loads(get_static_doc(api_name, api_version))
+    document["rootUrl"] = GOOGLE_API_ROOT_URL.rstrip("/") + "/"
+    return document
+
+def get_service(api_name: str, api_version: str):
+    """This thread's client for the API, rebuilt only when the credentials were replaced. Call from the Google API pool."""
+    from googleapiclient.discovery import build, build_from_document
+    credentials = google_credentials.get_valid()
+    services: Dict[Tuple[str, str], Tuple[int, Any]] = getattr(_thread_services, "services", None)
+    if services is None:
+        services = _thread_services.services = {}
+    cached = services.get((api_name, api_version))
+    if cached is not None and cached[0] == google_credentials.generation:
+        return cached[1]
+    if GOOGLE_API_ROOT_URL:
+        service = build_from_document(_discovery_document_with_root(api_name, api_version), credentials=credentials)
+    else:
+        # static_discovery: the discovery document ships with the library, so building makes no network call
+        service = build(api_name, api_version, credentials=credentials, cache_discovery=False, static_discovery=True)
+    services[(api_name, api_version)] = (google_credentials.generation, service)
+    return service
+
+
+async def run_google_api(fn: Callable[..., Any], *args) -> Any:
+    """Runs a blocking Google API function on the dedicated pool."""
+    return await asyncio.get_running_loop().run_in_executor(get_google_api_pool(), fn, *args)
+
+
+# --- Interview events ---
+def parse_interview_start(start_time_str: str) -> datetime:
+    """
+    UTC start time from the scheduler's datetime-local value (`YYYY-MM-DDTHH:MM`). Raises ValueError.
+    Naive values are taken as the server's local time; values with an offset keep it.
+    """
+    return datetime.fromisoformat(start_time_str).astimezone().astimezone(timezone.utc)
+
+def interview_event_body(candidate_name: str, candidate_email: str, interviewer_emails: List[str], start_utc: datetime, end_utc: datetime) -> Dict[str, Any]:
+    attendees = [{'email': str(candidate_email)}] + [{'email': email} for email in interviewer_emails]
+    return {
+        'summary': f'Interview: {candidate_name}',
+        'description': f'Interview with {candidate_name}. Scheduled via HisbandHR.ai.',
+        'start': {'dateTime': start_utc.isoformat(), 'timeZone': 'UTC'},
+        'end': {'dateTime': end_utc.isoformat(), 'timeZone': 'UTC'},
+        'attendees': attendees,
+        'conferenceData': {
+            'createRequest': {
+                'requestId': str(uuid.uuid4()),
+                'conferenceSolutionKey': {'type': 'hangoutsMeet'}
+            }
+        },
+        'reminders': {'useDefault': True},
+    }
+
+def _google_error_message(exception: Exception) -> str:
+    status = getattr(getattr(exception, "resp", None), "status", None)
+    reason = getattr(exception, "reason", None) or str(exception)
+    return f"Google Calendar error {status}: {reason}" if status else reason
+
+
+def _insert_calendar_event(event_body: Dict[str, Any], calendar_id: str) -> Dict[str, Any]:
+    service = get_service('calendar', 'v3')
+    return service.events().insert(
+        calendarId=calendar_id,
+        body=event_body,
+        sendUpdates='all',
+        conferenceDataVersion=1
+    ).execute(num_retries=GOOGLE_API_NUM_RETRIES)
+
+async def create_calendar_event(event_body: Dict[str, Any], calendar_id: str = 'primary') -> Dict[str, Any]:
+    """Inserts an event (with a Meet conference request) and returns Google's event resource."""
+    return await run_google_api(_insert_calendar_event, event_body, calendar_id)
+
+
+def _insert_calendar_events_batched(event_bodies: List[Dict[str, Any]], calendar_id: str) -> List[Tuple[Optional[Dict[str, Any]], Optional[str]]]:
+    service = get_service('calendar', 'v3')
+    outcomes: List[Optional[Tuple[Optional[Dict[str, Any]], Optional[str]]]] = [None] * len(event_bodies)
+
+    def on_response(request_id: str, response: Optional[Dict[str, Any]], exception: Optional[Exception]):
+        outcomes[int(request_id)] = (response, None) if exception is None else (None, _google_error_message(exception))
+
+    for chunk_start in range(0, len(event_bodies), max(1, GOOGLE_BATCH_SIZE)):
+        chunk_indices = range(chunk_start, min(chunk_start + max(1, GOOGLE_BATCH_SIZE), len(event_bodies)))
+        batch = service.new_batch_http_request(callback=on_response)
+        for index in chunk_indices:
+            batch.add(
+                service.events().insert(calendarId=calendar_id, body=event_bodies[index], sendUpdates='all', conferenceDataVersion=1),
+                request_id=str(index)
+            )
+        try:
+            batch.execute()
+        except Exception as e: # The whole batch request failed (network, auth); report it on every call it carried
+            logger.error(f"Calendar batch of {len(chunk_indices)} inserts failed: {e}")
+            for index in chunk_indices:
+                if outcomes[index] is None:
+                    outcomes[index] = (None, _google_error_message(e))
+    return [outcome or (None, "No response for this event in the batch.") for outcome in outcomes]
+
+async def create_calendar_events(event_bodies: List[Dict[str, Any]], calendar_id: str = 'primary') -> List[Tuple[Optional[Dict[str, Any]], Optional[str]]]:
+    """
+    Inserts many events through batch HTTP requests (GOOGLE_BATCH_SIZE calls per round trip).
+    Returns (event resource, None) or (None, error message) per event body, in order.
+    """
+    if not event_bodies:
+        return []
+    return await run_google_api(_insert_calendar_events_batched, event_bodies, calendar_id)
+
+
+async def store_oauth_credentials(credentials):
+    await run_google_api(google_credentials.store, credentials)
@@ -0,0 +1,212 @@
+# interview_index.py
+import asyncio
+import bisect
+import math
+import os
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, Optional, Iterable, Set, Tuple
+
+from database import db_manager, logger
+
+# In-memory interval index over scheduled_interviews, keyed by interviewer email, so conflict checks and slot
+# proposals are a few bisects per interviewer instead of a Mongo range scan. Loaded at startup, updated on every
+# insert this process makes, and reloaded every INTERVIEW_INDEX_RELOAD_SECONDS to pick up other workers' inserts.
+INTERVIEW_INDEX_LOOKBACK_HOURS = float(os.getenv("INTERVIEW_INDEX_LOOKBACK_HOURS", "24")) # Load interviews starting this far back (covers ones in progress)
+INTERVIEW_INDEX_RELOAD_SECONDS = float(os.getenv("INTERVIEW_INDEX_RELOAD_SECONDS", "300")) # 0 disables the periodic reload
+AUTO_SLOT_GRANULARITY_MINUTES = int(os.getenv("AUTO_SLOT_GRANULARITY_MINUTES", "15")) # Proposed starts are aligned to this
+AUTO_SLOT_HORIZON_DAYS = int(os.getenv("AUTO_SLOT_HORIZON_DAYS", "30")) # Default search window for auto-slotting
+_LOAD_BATCH_SIZE = 1000
+
+
+class InterviewIndexUnavailable(RuntimeError):
+    pass
+
+
+def _timestamp(value: datetime) -> float:
+    # Mongo hands back naive datetimes that are UTC
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+def _datetime(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc)
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+
+class _InterviewerSchedule:
+    """
+    One interviewer's interviews, sorted by start, plus the union of their intervals as disjoint busy blocks.
+    Interviews may overlap each other (existing double bookings), so conflict lookups bound the scan by the
+    longest interview; the merged blocks are what slot search walks.
+    """
+    __slots__ = ("starts", "entries", "max_duration", "busy_starts", "busy_ends")
+
+    def __init__(self):
+        self.starts: List[float] = []
+        self.entries: List[Tuple[float, float, str, str]] = [] # (start, end, interview_id, candidate_name)
+        self.max_duration = 0.0
+        self.busy_starts: List[float] = []
+        self.busy_ends: List[float] = []
+
+    def add(self, start: float, end: float, interview_id: str, candidate_name: str):
+        position = bisect.bisect_right(self.starts, start)
+        self.starts.insert(position, start)
+        self.entries.insert(position, (start, end, interview_id, candidate_name))
+        self.max_duration = max(self.max_duration, end - start)
+
+        # Merge with every busy block it overlaps or touches
+        lo = bisect.bisect_left(self.busy_ends, start)
+        hi = bisect.bisect_right(self.busy_starts, end)
+        if lo < hi:
+            start = min(start, self.busy_starts[lo])
+            end = max(end, self.busy_ends[hi - 1])
+        self.busy_starts[lo:hi] = [start]
+        self.busy_ends[lo:hi] = [end]
+
+    def overlapping(self, start: float, end: float) -> List[Tuple[float, float, str, str]]:
+        # Only interviews starting within max_duration before `start` can still be running at `start`
+        lo = bisect.bisect_right(self.starts, start - self.max_duration)
+        hi = bisect.bisect_left(self.starts, end)
+        return [entry for entry in self.entries[lo:hi] if entry[1] > start]
+
+    def busy_until(self, start: float, end: float) -> Optional[float]:
+        """End of the busy block overlapping [start, end), or None if the interviewer is free for all of it."""
+        position = bisect.bisect_right(self.busy_ends, start)
+        if position < len(self.busy_starts) and self.busy_starts[position] < end:
+            return self.busy_ends[position]
+        return None
+
+
+class InterviewIndex:
+    def __init__(self):
+        self.loaded = False
+        self._schedules: Dict[str, _InterviewerSchedule] = {}
+        self._interview_ids: Set[str] = set()
+        self._loading = False
+        self._added_while_loading: List[Dict[str, Any]] = []
+
+    def _add_to(self, schedules: Dict[str, _InterviewerSchedule], interview_ids: Set[str], interview_doc: Dict[str, Any]) -> bool:
+        interview_id = str(interview_doc.get("_id"))
+        if interview_id in interview_ids or not interview_doc.get("start_time") or not interview_doc.get("end_time"):
+            return False
+        start, end = _timestamp(interview_doc["start_time"]), _timestamp(interview_doc["end_time"])
+        if end <= start:
+            return False
+        interview_ids.add(interview_id)
+        for email in {normalize_email(str(email)) for email in interview_doc.get("interviewer_emails") or []}:
+            schedules.setdefault(email, _InterviewerSchedule()).add(start, end, interview_id, interview_doc.get("candidate_name", "N/A"))
+        return True
+
+    def add_interviews(self, interview_docs: Iterable[Dict[str, Any]]):
+        """Indexes newly saved scheduled_interviews documents (they must carry their _id)."""
+        for interview_doc in interview_docs:
+            self._add_to(self._schedules, self._interview_ids, interview_doc)
+            if self._loading: # Replayed into the index being built, so the swap cannot drop it
+                self._added_while_loading.append(interview_doc)
+
+    async def load(self):
+        """Rebuilds the index from Mongo (interviews starting after now - lookback) and swaps it in."""
+        collection = db_manager.get_collection("scheduled_interviews")
+        if collection is None:
+            raise InterviewIndexUnavailable("Scheduled interviews collection unavailable.")
+        since = datetime.now(timezone.utc) - timedelta(hours=INTERVIEW_INDEX_LOOKBACK_HOURS)
+        schedules: Dict[str, _InterviewerSchedule] = {}
+        interview_ids: Set[str] = set()
+        self._loading = True
+        self._added_while_loading = []
+        try:
+            cursor = collection.find(
+                {"start_time": {"$gte": since}}, # Served by the (start_time, _id) index
+                {"start_time": 1, "end_time": 1, "interviewer_emails": 1, "candidate_name": 1}
+            ).batch_size(_LOAD_BATCH_SIZE)
+            async for interview_doc in cursor:
+                self._add_to(schedules, interview_ids, interview_doc)
+            for interview_doc in self._added_while_loading:
+                self._add_to(schedules, interview_ids, interview_doc)
+        finally:
+            self._loading = False
+            self._added_while_loading = []
+        self._schedules, self._interview_ids = schedules, interview_ids
+        self.loaded = True
+        logger.info(f"Interview index loaded: {len(interview_ids)} interviews across {len(schedules)} interviewers.")
+
+    def _require_loaded(self):
+        if not self.loaded:
+            raise InterviewIndexUnavailable("Interview index is still loading.")
+
+    def find_conflicts(self, interviewer_emails: List[str], start_time: datetime, end_time: datetime) -> List[Dict[str, Any]]:
+        """Interviews that overlap [start_time, end_time) for any of the interviewers. Back-to-back is not a conflict."""
+        self._require_loaded()
+        start, end = _timestamp(start_time), _timestamp(end_time)
+        conflicts = []
+        for email in dict.fromkeys(normalize_email(email) for email in interviewer_emails):
+            schedule = self._schedules.get(email)
+            if schedule is None:
+                continue
+            for entry_start, entry_end, interview_id, candidate_name in schedule.overlapping(start, end):
+                conflicts.append({
+                    "interviewer_email": email,
+                    "interview_id": interview_id,
+                    "candidate_name": candidate_name,
+                    "start_time": _datetime(entry_start).isoformat(),
+                    "end_time": _datetime(entry_end).isoformat(),
+                })
+        return conflicts
+
+    def earliest_free_slot(self, interviewer_emails: List[str], duration_minutes: int,
+                           not_before: Optional[datetime] = None, not_after: Optional[datetime] = None) -> Optional[Tuple[datetime, datetime]]:
+        """
+        Earliest aligned window of duration_minutes, starting at or after not_before (default: now) and ending
+        by not_after (default: AUTO_SLOT_HORIZON_DAYS later), in which none of the interviewers is busy.
+        Each probe is a bisect per interviewer and jumps past a busy block, so the search never revisits time.
+        """
+        self._require_loaded()
+        schedules = [self._schedules[email] for email in dict.fromkeys(normalize_email(email) for email in interviewer_emails) if email in self._schedules]
+        granularity = max(1, AUTO_SLOT_GRANULARITY_MINUTES) * 60
+        duration = duration_minutes * 60
+        earliest = _timestamp(not_before or datetime.now(timezone.utc))
+        latest = _timestamp(not_after) if not_after else earliest + AUTO_SLOT_HORIZON_DAYS * 86400
+
+        candidate = math.ceil(earliest / granularity) * granularity
+        while candidate + duration <= latest:
+            blocked_until = max(
+                (until for until in (schedule.busy_until(candidate, candidate + duration) for schedule in schedules) if until is not None),
+                default=None
+            )
+            if blocked_until is None:
+                return _datetime(candidate), _datetime(candidate + duration)
+            candidate = math.ceil(blocked_until / granularity) * granularity
+        return None
+
+
+interview_index = InterviewIndex()
+_reload_task: Optional[asyncio.Task] = None
+
+
+async def _load_and_reload():
+    while True:
+        try:
+            await interview_index.load()
+        except Exception as e:
+            logger.error(f"Failed to load interview index: {e}", exc_info=True)
+        if INTERVIEW_INDEX_RELOAD_SECONDS <= 0:
+            return
+        await asyncio.sleep(INTERVIEW_INDEX_RELOAD_SECONDS)
+
+def start_interview_index():
+    """Loads the index in the background (queries get InterviewIndexUnavailable until it is ready) and keeps it fresh."""
+    global _reload_task
+    if _reload_task is None or _reload_task.done():
+        _reload_task = asyncio.create_task(_load_and_reload())
+
+async def shutdown_interview_index():
+    global _reload_task
+    if _reload_task is not None:
+        _reload_task.cancel()
+        try:
+            await _reload_task
+        except asyncio.CancelledError:
+            pass
+        _reload_task = None
@@ -0,0 +1,84 @@
+# interview_scheduling.py
+from datetime import timedelta
+from typing import List, Dict, Any, Tuple
+
+from bson import ObjectId
+from pydantic import ValidationError
+
+from analytics import record_scheduled_interviews
+from database import bulk_insert_documents, BulkInterviewItem, ScheduledInterviewDB, logger
+from google_calendar import parse_interview_start, interview_event_body, create_calendar_events
+from interview_index import interview_index
+from upcoming_interviews import invalidate_upcoming_interviews_cache
+
+# Per-item outcomes of a bulk request: "scheduled_not_saved" is on the calendar but missing from scheduled_interviews
+SCHEDULE_STATUSES = ("scheduled", "scheduled_not_saved", "failed", "invalid")
+
+
+async def schedule_interviews(interviews: List[BulkInterviewItem], scheduled_interviews_collection) -> Dict[str, Any]:
+    """
+    Validates each item, creates the valid ones' events with batched Calendar requests, then saves them in one insert_many.
+    Returns {"requested", <count per SCHEDULE_STATUSES>, "results"}, one result per item in request order.
+    Raises GoogleAuthRequired when there are no usable Google credentials.
+    """
+    results: List[Dict[str, Any]] = []
+    pending: List[Tuple[Dict[str, Any], ScheduledInterviewDB]] = [] # (result entry, validated record without Google links)
+    for index, item in enumerate(interviews):
+        result = {"index": index, "candidate_name": item.candidate_name, "status": "invalid"}
+        results.append(result)
+        interviewer_emails = [email.strip() for email in item.interviewer_emails if email.strip()]
+        if not interviewer_emails:
+            result["error"] = "At least one interviewer email is required."
+            continue
+        try:
+            start_utc = parse_interview_start(item.start_time)
+        except ValueError:
+            result["error"] = "Invalid start_time format. Expected YYYY-MM-DDTHH:MM."
+            continue
+        try:
+            record = ScheduledInterviewDB(
+                _id=ObjectId(),
+                candidate_name=item.candidate_name,
+                candidate_email=item.candidate_email.strip(),
+                interviewer_emails=interviewer_emails,
+                start_time=start_utc,
+                end_time=start_utc + timedelta(minutes=item.duration_minutes),
+                duration_minutes=item.duration_minutes,
+                jd_id=ObjectId(item.jd_id) if item.jd_id and ObjectId.is_valid(item.jd_id) else None,
+                resume_id=ObjectId(item.resume_id) if item.resume_id and ObjectId.is_valid(item.resume_id) else None,
+            )
+        except ValidationError as e:
+            result["error"] = "; ".join(f"Field '{' -> '.join(str(loc) for loc in err['loc']) or 'general'}': {err['msg']}" for err in e.errors())
+            continue
+        pending.append((result, record))
+
+    event_bodies = [
+        interview_event_body(record.candidate_name, record.candidate_email, record.interviewer_emails, record.start_time, record.end_time)
+        for _, record in pending
+    ]
+    outcomes = await create_calendar_events(event_bodies)
+
+    records_to_save = []
+    for (result, record), (created_event, error) in zip(pending, outcomes):
+        if created_event is None:
+            result.update(status="failed", error=error)
+            continue
+        record.google_meet_link = created_event.get('hangoutLink')
+        record.google_calendar_link = created_event.get('htmlLink')
+        result.update(status="scheduled", interview_id=str(record.id), event_link=record.google_calendar_link, meet_link=record.google_meet_link)
+        records_to_save.append(record.model_dump(by_alias=True, exclude_none=True))
+
+    # One insert_many for the whole request; an event that could not be saved is still on the calendar
+    failed_ids = await bulk_insert_documents(scheduled_interviews_collection, records_to_save) if records_to_save else set()
+    for result in results:
+        if result["status"] == "scheduled" and ObjectId(result["interview_id"]) in failed_ids:
+            result.update(status="scheduled_not_saved", error="Interview scheduled in Google but failed to save to local DB.")
+    saved_records = [record for record in records_to_save if record["_id"] not in failed_ids]
+    if saved_records:
+        invalidate_upcoming_interviews_cache()
+        interview_index.add_interviews(saved_records)
+        await record_scheduled_interviews(saved_records)
+
+    status_counts = {status: sum(1 for result in results if result["status"] == status) for status in SCHEDULE_STATUSES}
+    logger.info(f"Bulk scheduling: {len(results)} requested, {status_counts}")
+    return {"requested": len(results), **status_counts, "results": results}
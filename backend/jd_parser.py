@@ -1,40 +1,73 @@
 # jd_parser.py
-import tempfile
 import os
-import shutil
-import spacy
 from fastapi import UploadFile
 import asyncio
 import re
-from sentence_transformers import SentenceTransformer
+import numpy as np
 from typing import Dict, List, Any, Tuple
 
-# --- New Imports for Text Extraction ---
-import docx # For .docx files (from python-docx)
-import PyPDF2 # For .pdf files
-# --- End New Imports ---
+from database import logger, EMBEDDING_MODE, EMBEDDING_CHUNK_WORDS, EMBEDDING_MAX_CHUNKS_PER_DOC
+from model_registry import get_nlp, get_sentence_model
+from parse_cache import content_hash, get_cached_parsed_jd, store_parsed_jd
+from ocr import needs_ocr, ocr_pdf
+from document_parsing import clean_extracted_text, parse_document_text, PARSE_TIMED_OUT
+
+# Embedding batching: one encode call per batch of documents instead of one per document
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+MAX_EMBED_TEXT_LEN = 10000 # Characters, used in EMBEDDING_MODE=truncate; sentence transformers have input limits too.
+
+def _embedding_chunks(text: str) -> List[Tuple[str, int]]:
+    """(chunk text, word count) pairs for one document, at most EMBEDDING_MAX_CHUNKS_PER_DOC of them."""
+    if EMBEDDING_MODE != "chunked":
+        return [(text[:MAX_EMBED_TEXT_LEN], 1)]
+    words = text.split()
+    chunk_words = max(1, EMBEDDING_CHUNK_WORDS)
+    return [
+        (" ".join(words[start:start + chunk_words]), len(words[start:start + chunk_words]))
+        for start in range(0, min(len(words), chunk_words * max(1, EMBEDDING_MAX_CHUNKS_PER_DOC)), chunk_words)
+    ]
 
-from database import logger
+def embed_texts(texts: List[str], batch_size: int = EMBEDDING_BATCH_SIZE, sentence_model: Any = None) -> List[Any]:
+    """
+    Encodes all texts with the sentence model (the configured one unless given) in batches of `batch_size`.
+    In chunked mode every chunk of every text goes through the same batched encode, then each text's
+    chunks are mean-pooled (weighted by word count) into one embedding.
+    Returns one embedding per input text (None for empty texts or on failure).
+    """
+    embeddings: List[Any] = [None] * len(texts)
+    sentence_model = sentence_model if sentence_model is not None else get_sentence_model()
+    if not sentence_model or not texts:
+        return embeddings
+
+    indices_to_embed = [i for i, text in enumerate(texts) if text and text.strip()]
+    if not indices_to_embed:
+        return embeddings
+
+    chunk_texts: List[str] = []
+    chunk_spans: List[Tuple[int, int, int]] = [] # (text index, first chunk, chunk count)
+    chunk_weights: List[int] = []
+    for i in indices_to_embed:
+        chunks = _embedding_chunks(texts[i])
+        chunk_spans.append((i, len(chunk_texts), len(chunks)))
+        chunk_texts.extend(chunk for chunk, _ in chunks)
+        chunk_weights.extend(weight for _, weight in chunks)
 
-nlp = None
-try:
-    nlp = spacy.load("en_core_web_sm")
-    logger.info("'en_core_web_sm' model loaded.")
-except OSError:
-    logger.warning("Spacy 'en_core_web_sm' model not found. Attempting to download...")
     try:
-        spacy.cli.download("en_core_web_sm")
-        nlp = spacy.load("en_core_web_sm")
-        logger.info("'en_core_web_sm' model downloaded and loaded.")
-    except Exception as e:
-        logger.error(f"Failed to download or load spaCy model: {e}. spaCy-dependent features will be limited.")
-
-sentence_model = None
-try:
-    sentence_model = SentenceTransformer('all-MiniLM-L6-v2')
-    logger.info("'all-MiniLM-L6-v2' sentence transformer model loaded.")
-except Exception as e:
-    logger.error(f"Failed to load SentenceTransformer model: {e}. Semantic matching will be significantly impacted.")
+        encoded = np.asarray(sentence_model.encode(
+            chunk_texts,
+            batch_size=max(1, batch_size),
+            show_progress_bar=False
+        ))
+        weights = np.asarray(chunk_weights, dtype=np.float32)
+        for i, first, count in chunk_spans:
+            if count == 1:
+                embeddings[i] = encoded[first]
+            else:
+                embeddings[i] = np.average(encoded[first:first + count], axis=0, weights=weights[first:first + count]).astype(encoded.dtype)
+        logger.debug(f"Embedded {len(indices_to_embed)} texts as {len(chunk_texts)} chunks (batch size: {batch_size})")
+    except Exception as emb_ex:
+        logger.error(f"Error embedding batch of {len(indices_to_embed)} texts: {emb_ex}")
+    return embeddings
 
 COMMON_TECH_DOMAINS = [
     "python", "java", "javascript", "c++", "c#", "c", "r", "ruby", "php", "swift", "kotlin", "golang", "scala", "typescript", "perl", "rust", "dart", # Added 'r'
@@ -83,17 +116,6 @@ JD_RESUME_STOPWORDS = { # Expanded and slightly refined
     "title" # "job title" is a common phrase, "title" itself is too generic for a skill
 }
 
-def clean_extracted_text(text: str) -> str:
-    if not text: return ""
-    text = re.sub(r'\s+', ' ', text).strip()
-    text = re.sub(r'http\S+|www\S+|https\S+', '', text, flags=re.MULTILINE)
-    text = re.sub(r'\S+@\S*\s?', '', text)
-    # Slightly more permissive regex for allowed characters, includes '&', '@', '*', "'"
-    text = re.sub(r'[^\w\s\.\,\-\/\(\)\+\#\:\%\&\@\*\']', '', text)
-    text = ''.join(filter(lambda x: x.isprintable() or x in '\n\r\t', text))
-    text = "\n".join([line.strip() for line in text.splitlines() if line.strip()])
-    return text.strip()
-
 def extract_jd_sections(text: str) -> Dict[str, str]:
     sections = {
         "full_text": text, "essential_requirements": "", "desirable_requirements": "",
@@ -226,6 +248,7 @@ def extract_jd_sections(text: str) -> Dict[str, str]:
 
 
 def extract_keywords_from_section(section_text: str, is_essential: bool = False) -> set:
+    nlp = get_nlp()
     if not nlp or not section_text:
         return set()
 
@@ -390,240 +413,157 @@ def extract_keywords_from_section(section_text: str, is_essential: bool = False)
     return final_keywords
 
 
-async def _extract_text_from_file(filepath: str, original_filename: str) -> str:
-    """Helper function to extract text based on file extension."""
-    _, file_extension = os.path.splitext(original_filename)
-    file_extension = file_extension.lower()
-    raw_text = ""
-
-    try:
-        logger.info(f"Attempting to extract text from: {original_filename} (extension: {file_extension})")
-        if file_extension == ".pdf":
-            with open(filepath, 'rb') as f:
-                reader = PyPDF2.PdfReader(f, strict=False) # Added strict=False for more tolerance
-                if reader.is_encrypted:
-                    try:
-                        reader.decrypt('') 
-                        logger.info(f"Decrypted PDF: {original_filename}")
-                    except Exception as decrypt_err:
-                        logger.warning(f"Could not decrypt PDF {original_filename}: {decrypt_err}. Text extraction may fail or be incomplete.")
-
-                text_parts = []
-                for i, page in enumerate(reader.pages):
-                    try:
-                        page_text = page.extract_text()
-                        if page_text:
-                            text_parts.append(page_text)
-                    except Exception as page_err: # Catch broad exceptions during page extraction
-                        logger.warning(f"Error extracting text from page {i+1} of {original_filename}: {page_err}")
-                raw_text = "\n".join(text_parts)
-                if not raw_text.strip() and len(reader.pages) > 0:
-                    logger.warning(f"PyPDF2 extracted no text from {original_filename}, though it has pages. PDF might be image-based or have complex encoding.")
-
-        elif file_extension == ".docx":
-            doc = docx.Document(filepath)
-            raw_text = "\n".join([para.text for para in doc.paragraphs])
-        elif file_extension == ".txt":
-            with open(filepath, 'r', encoding='utf-8', errors='replace') as f:
-                raw_text = f.read()
-        elif file_extension == ".doc":
-            logger.warning(f".doc format ({original_filename}) has limited support. Trying basic text decode. For best results, convert to .docx or .pdf.")
-            try:
-                with open(filepath, 'rb') as f_doc:
-                    content_bytes = f_doc.read()
-                raw_text = content_bytes.decode('utf-8', errors='replace')
-            except UnicodeDecodeError:
-                try:
-                    with open(filepath, 'rb') as f_doc_latin:
-                        content_bytes = f_doc_latin.read()
-                    raw_text = content_bytes.decode('latin-1', errors='replace') 
-                except Exception as e_doc_latin:
-                    logger.error(f"Failed to decode .doc file {original_filename} with latin-1: {e_doc_latin}")
-                    raw_text = ""
-            except Exception as e_doc_open:
-                logger.error(f"Failed to open or read .doc file {original_filename} as binary: {e_doc_open}")
-                raw_text = ""
-        else:
-            logger.warning(f"Unsupported file extension '{file_extension}' for {original_filename}. Attempting to read as plain text.")
-            try:
-                with open(filepath, 'rb') as f_unknown: 
-                    content_bytes = f_unknown.read()
-                raw_text = content_bytes.decode('utf-8', errors='replace')
-            except UnicodeDecodeError:
-                 try:
-                    with open(filepath, 'rb') as f_unknown_latin:
-                        content_bytes = f_unknown_latin.read()
-                    raw_text = content_bytes.decode('latin-1', errors='replace')
-                 except Exception as e_unknown_latin:
-                    logger.error(f"Failed to decode unknown file {original_filename} with latin-1: {e_unknown_latin}")
-                    raw_text = ""
-            except Exception as e_unknown_open:
-                logger.error(f"Failed to open or read unknown file {original_filename} as binary: {e_unknown_open}")
-                raw_text = ""
-
-
-        logger.info(f"Successfully extracted raw text (length: {len(raw_text)}) from {original_filename}")
-        return raw_text.strip()
-
-    except Exception as e:
-        logger.error(f"Error during text extraction for {original_filename} (path: {filepath}): {e}", exc_info=True)
-        try:
-            logger.info(f"Fallback extraction attempt for {original_filename}")
-            with open(filepath, 'rb') as f_fallback:
-                content_bytes = f_fallback.read()
-            return content_bytes.decode('utf-8', errors='replace').strip()
-        except Exception as e_fallback:
-            logger.error(f"Final fallback text extraction also failed for {original_filename}: {e_fallback}")
-            return ""
+def jd_texts_to_embed(parsed_text: str, jd_sections_text: Dict[str, str], categorized_keywords: Dict[str, List[str]]) -> Dict[str, str]:
+    """The JD texts that get embedded, keyed as in jd_embeddings (empty ones are skipped by the caller)."""
+    # Build skills_semantic_document from the most relevant text parts
+    # This should ideally use the text that yields the best keywords
+    skills_semantic_document_parts = []
+    if jd_sections_text.get("essential_requirements"):
+        skills_semantic_document_parts.append(jd_sections_text["essential_requirements"])
+    if jd_sections_text.get("general_skills") and jd_sections_text["general_skills"] not in skills_semantic_document_parts: # Avoid duplicate if general_skills was essential
+        skills_semantic_document_parts.append(jd_sections_text["general_skills"])
+    if jd_sections_text.get("responsibilities") and jd_sections_text["responsibilities"] not in skills_semantic_document_parts:
+        skills_semantic_document_parts.append(jd_sections_text["responsibilities"])
+
+    # Add top categorized keywords to reinforce their semantic meaning
+    if categorized_keywords["essential"]:
+        skills_semantic_document_parts.append(". ".join(categorized_keywords["essential"][:15])) # Join with period for sentence structure
+    if categorized_keywords["desirable"]:
+        skills_semantic_document_parts.append(". ".join(categorized_keywords["desirable"][:10]))
+
+    skills_semantic_document_text = " \n\n ".join(filter(None, skills_semantic_document_parts)).strip()
+
+
+    return {
+        "essential_requirements": jd_sections_text.get("essential_requirements"),
+        "skills_semantic_document": skills_semantic_document_text, 
+        "responsibilities": jd_sections_text.get("responsibilities"),
+        "desirable_requirements": jd_sections_text.get("desirable_requirements"),
+        "full_text": parsed_text
+    }
 
 
-async def parse_jd_file(jd_file: UploadFile) -> Tuple[str, Dict[str, List[str]], Dict[str, str], Dict[str, Any]]:
-    parsed_text = ""
+def analyze_jd_text(filename: str, parsed_text: str) -> Tuple[Dict[str, List[str]], Dict[str, str], Dict[str, Any]]:
+    """
+    Sections, categorized keywords and section embeddings for a cleaned JD text.
+    CPU-bound (spaCy and the sentence model): parse_jd_content runs it on a thread, off the event loop.
+    """
     categorized_keywords: Dict[str, List[str]] = {"essential": [], "desirable": [], "general": []}
-    jd_sections_text: Dict[str, str] = {}
     jd_embeddings: Dict[str, Any] = {}
-    temp_file_path = None
 
-    try:
-        suffix = os.path.splitext(jd_file.filename)[1] if jd_file.filename else '.tmp'
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            shutil.copyfileobj(jd_file.file, tmp)
-            temp_file_path = tmp.name
-        
-        raw_parsed_text = await _extract_text_from_file(temp_file_path, jd_file.filename)
+    jd_sections_text = extract_jd_sections(parsed_text)
+    logger.info(f"JD Sections Extracted (keys): {list(jd_sections_text.keys())}")
+    for section_name, section_content in jd_sections_text.items():
+        if section_name != "full_text" and section_content: # Log only if content exists
+             logger.debug(f"JD Section '{section_name}' (first 300 chars): {section_content[:300]}")
+        elif section_name != "full_text":
+             logger.debug(f"JD Section '{section_name}': No content extracted.")
+
+
+    essential_kws_set = extract_keywords_from_section(jd_sections_text.get("essential_requirements", ""), is_essential=True)
+    desirable_kws_set = extract_keywords_from_section(jd_sections_text.get("desirable_requirements", ""), is_essential=False) # is_essential is false here
+    
+    skills_section_text_for_general_kws = jd_sections_text.get("general_skills", "")
+    if not skills_section_text_for_general_kws:
+        skills_section_text_for_general_kws = jd_sections_text.get("responsibilities", "")
+    if not skills_section_text_for_general_kws and (jd_sections_text.get("essential_requirements") or jd_sections_text.get("responsibilities")):
+         skills_section_text_for_general_kws = jd_sections_text.get("essential_requirements", "") + "\n" + jd_sections_text.get("responsibilities", "")
+    
+    general_kws_set = extract_keywords_from_section(skills_section_text_for_general_kws, is_essential=False)
+
+    categorized_keywords["essential"] = sorted(list(essential_kws_set), key=lambda x: (-len(x.split()), -len(x), x))
+    categorized_keywords["desirable"] = sorted(list(desirable_kws_set - essential_kws_set), key=lambda x: (-len(x.split()), -len(x), x))
+    current_categorized_kws_for_general = essential_kws_set.union(desirable_kws_set)
+    categorized_keywords["general"] = sorted(list(general_kws_set - current_categorized_kws_for_general), key=lambda x: (-len(x.split()), -len(x), x))
+
+    logger.info(f"--- JD Categorized Keywords for '{filename}' (Post-processing) ---")
+    logger.info(f"Essential ({len(categorized_keywords['essential'])}): {categorized_keywords['essential'][:20]}...")
+    logger.info(f"Desirable ({len(categorized_keywords['desirable'])}): {categorized_keywords['desirable'][:20]}...")
+    logger.info(f"General ({len(categorized_keywords['general'])}): {categorized_keywords['general'][:20]}...")
+
+    if not categorized_keywords["essential"] and (categorized_keywords["desirable"] or categorized_keywords["general"]):
+        promoted = []
+        # Promote more aggressively if essentials are empty
+        if categorized_keywords["desirable"]:
+            promoted.extend(categorized_keywords["desirable"][:15]) # Promote up to 15
+        if categorized_keywords["general"] and len(promoted) < 15 :
+             promoted.extend(categorized_keywords["general"][:(15 - len(promoted))])
         
-        parsed_text = clean_extracted_text(raw_parsed_text)
-        logger.info(f"Parsed JD: {jd_file.filename}, Cleaned Full Text Length: {len(parsed_text)}")
-        if not parsed_text.strip():
-             logger.warning(f"No text could be extracted or cleaned from JD: {jd_file.filename}")
-             return "", {"essential": [], "desirable": [], "general": []}, {}, {}
+        if promoted:
+            promoted_set = set(promoted)
+            categorized_keywords["essential"] = sorted(list(promoted_set), key=lambda x: (-len(x.split()), -len(x), x))
+            categorized_keywords["desirable"] = [kw for kw in categorized_keywords["desirable"] if kw not in promoted_set]
+            categorized_keywords["general"] = [kw for kw in categorized_keywords["general"] if kw not in promoted_set]
+            logger.info(f"--- JD Categorized Keywords AFTER PROMOTION for '{filename}' ---")
+            logger.info(f"Essential ({len(categorized_keywords['essential'])}): {categorized_keywords['essential']}")
 
-        jd_sections_text = extract_jd_sections(parsed_text)
-        logger.info(f"JD Sections Extracted (keys): {list(jd_sections_text.keys())}")
-        for section_name, section_content in jd_sections_text.items():
-            if section_name != "full_text" and section_content: # Log only if content exists
-                 logger.debug(f"JD Section '{section_name}' (first 300 chars): {section_content[:300]}")
-            elif section_name != "full_text":
-                 logger.debug(f"JD Section '{section_name}': No content extracted.")
 
+    if get_sentence_model():
+        sections_to_embed = jd_texts_to_embed(parsed_text, jd_sections_text, categorized_keywords)
+        section_keys_to_embed = [key for key, text_content in sections_to_embed.items() if text_content and text_content.strip()]
+        section_embeddings = embed_texts([sections_to_embed[key] for key in section_keys_to_embed])
+        for key, embedding in zip(section_keys_to_embed, section_embeddings):
+            if embedding is not None:
+                jd_embeddings[key] = embedding
+                logger.debug(f"Embedded section '{key}' (text length: {len(sections_to_embed[key])})")
+        logger.info(f"Generated embeddings for JD sections: {list(jd_embeddings.keys())}")
 
-        essential_kws_set = extract_keywords_from_section(jd_sections_text.get("essential_requirements", ""), is_essential=True)
-        desirable_kws_set = extract_keywords_from_section(jd_sections_text.get("desirable_requirements", ""), is_essential=False) # is_essential is false here
-        
-        skills_section_text_for_general_kws = jd_sections_text.get("general_skills", "")
-        if not skills_section_text_for_general_kws:
-            skills_section_text_for_general_kws = jd_sections_text.get("responsibilities", "")
-        if not skills_section_text_for_general_kws and (jd_sections_text.get("essential_requirements") or jd_sections_text.get("responsibilities")):
-             skills_section_text_for_general_kws = jd_sections_text.get("essential_requirements", "") + "\n" + jd_sections_text.get("responsibilities", "")
-        
-        general_kws_set = extract_keywords_from_section(skills_section_text_for_general_kws, is_essential=False)
-
-        categorized_keywords["essential"] = sorted(list(essential_kws_set), key=lambda x: (-len(x.split()), -len(x), x))
-        categorized_keywords["desirable"] = sorted(list(desirable_kws_set - essential_kws_set), key=lambda x: (-len(x.split()), -len(x), x))
-        current_categorized_kws_for_general = essential_kws_set.union(desirable_kws_set)
-        categorized_keywords["general"] = sorted(list(general_kws_set - current_categorized_kws_for_general), key=lambda x: (-len(x.split()), -len(x), x))
-
-        logger.info(f"--- JD Categorized Keywords for '{jd_file.filename}' (Post-processing) ---")
-        logger.info(f"Essential ({len(categorized_keywords['essential'])}): {categorized_keywords['essential'][:20]}...")
-        logger.info(f"Desirable ({len(categorized_keywords['desirable'])}): {categorized_keywords['desirable'][:20]}...")
-        logger.info(f"General ({len(categorized_keywords['general'])}): {categorized_keywords['general'][:20]}...")
-
-        if not categorized_keywords["essential"] and (categorized_keywords["desirable"] or categorized_keywords["general"]):
-            promoted = []
-            # Promote more aggressively if essentials are empty
-            if categorized_keywords["desirable"]:
-                promoted.extend(categorized_keywords["desirable"][:15]) # Promote up to 15
-            if categorized_keywords["general"] and len(promoted) < 15 :
-                 promoted.extend(categorized_keywords["general"][:(15 - len(promoted))])
-            
-            if promoted:
-                promoted_set = set(promoted)
-                categorized_keywords["essential"] = sorted(list(promoted_set), key=lambda x: (-len(x.split()), -len(x), x))
-                categorized_keywords["desirable"] = [kw for kw in categorized_keywords["desirable"] if kw not in promoted_set]
-                categorized_keywords["general"] = [kw for kw in categorized_keywords["general"] if kw not in promoted_set]
-                logger.info(f"--- JD Categorized Keywords AFTER PROMOTION for '{jd_file.filename}' ---")
-                logger.info(f"Essential ({len(categorized_keywords['essential'])}): {categorized_keywords['essential']}")
-
-
-        if sentence_model:
-            # Build skills_semantic_document from the most relevant text parts
-            # This should ideally use the text that yields the best keywords
-            skills_semantic_document_parts = []
-            if jd_sections_text.get("essential_requirements"):
-                skills_semantic_document_parts.append(jd_sections_text["essential_requirements"])
-            if jd_sections_text.get("general_skills") and jd_sections_text["general_skills"] not in skills_semantic_document_parts: # Avoid duplicate if general_skills was essential
-                skills_semantic_document_parts.append(jd_sections_text["general_skills"])
-            if jd_sections_text.get("responsibilities") and jd_sections_text["responsibilities"] not in skills_semantic_document_parts:
-                skills_semantic_document_parts.append(jd_sections_text["responsibilities"])
-            
-            # Add top categorized keywords to reinforce their semantic meaning
-            if categorized_keywords["essential"]:
-                skills_semantic_document_parts.append(". ".join(categorized_keywords["essential"][:15])) # Join with period for sentence structure
-            if categorized_keywords["desirable"]:
-                skills_semantic_document_parts.append(". ".join(categorized_keywords["desirable"][:10]))
-            
-            skills_semantic_document_text = " \n\n ".join(filter(None, skills_semantic_document_parts)).strip()
+    return categorized_keywords, jd_sections_text, jd_embeddings
 
 
-            sections_to_embed = {
-                "essential_requirements": jd_sections_text.get("essential_requirements"),
-                "skills_semantic_document": skills_semantic_document_text, 
-                "responsibilities": jd_sections_text.get("responsibilities"),
-                "desirable_requirements": jd_sections_text.get("desirable_requirements"),
-                "full_text": parsed_text
-            }
-            
-            for key, text_content in sections_to_embed.items():
-                if text_content and text_content.strip(): # Ensure content exists
-                    try:
-                        # Limit length of text for embedding to avoid excessive processing time/memory for very long sections
-                        max_embed_len = 10000 # Characters, adjust as needed. Sentence transformers have input limits too.
-                        text_to_embed = text_content[:max_embed_len]
-                        
-                        jd_embeddings[key] = sentence_model.encode(text_to_embed)
-                        logger.debug(f"Embedded section '{key}' (text length: {len(text_to_embed)})")
-                    except Exception as emb_ex:
-                        logger.error(f"Error embedding section {key} for JD {jd_file.filename}: {emb_ex}")
-            logger.info(f"Generated embeddings for JD sections: {list(jd_embeddings.keys())}")
+async def parse_jd_content(filename: str, content: bytes) -> Tuple[str, Dict[str, List[str]], Dict[str, str], Dict[str, Any]]:
+    parsed_text = ""
+    jd_content_hash = None
+    loop = asyncio.get_running_loop()
+
+    try:
+        jd_content_hash = content_hash(content)
+        cached_jd = await get_cached_parsed_jd(jd_content_hash)
+        if cached_jd is not None:
+            logger.info(f"Using cached parse for JD: {filename}")
+            return cached_jd
+
+        # Extraction gets the same isolated workers and per-document deadline as resumes
+        extracted = await parse_document_text(filename, content)
+        if extracted["parse_status"] == PARSE_TIMED_OUT:
+            logger.warning(f"JD {filename} could not be parsed: {extracted['parse_error']}")
+            return "", {"essential": [], "desirable": [], "general": []}, {}, {}
+        raw_parsed_text, parsed_text = extracted["raw_content"], extracted["parsed_text"]
+        if needs_ocr(filename, raw_parsed_text):
+            logger.info(f"JD {filename} looks image-only; trying OCR")
+            ocr_text = (await ocr_pdf(filename, content)).strip()
+            if ocr_text:
+                parsed_text = await loop.run_in_executor(None, clean_extracted_text, ocr_text)
+        logger.info(f"Parsed JD: {filename}, Cleaned Full Text Length: {len(parsed_text)}")
+        if not parsed_text.strip():
+             logger.warning(f"No text could be extracted or cleaned from JD: {filename}")
+             return "", {"essential": [], "desirable": [], "general": []}, {}, {}
+
+        # Sections, spaCy keywords and embeddings on a thread, so the event loop keeps serving meanwhile
+        categorized_keywords, jd_sections_text, jd_embeddings = await loop.run_in_executor(None, analyze_jd_text, filename, parsed_text)
 
     except Exception as e:
-        logger.error(f"Major error parsing JD file {jd_file.filename}: {e}", exc_info=True)
-        try:
-            # Fallback for general errors
-            if jd_file and hasattr(jd_file, 'read') and hasattr(jd_file, 'seek'):
-                await jd_file.seek(0)
-                content_bytes = await jd_file.read()
-                raw_parsed_text_fb = content_bytes.decode('utf-8', errors='replace').strip()
-                parsed_text_fb = clean_extracted_text(raw_parsed_text_fb)
-                jd_sections_text = {"full_text": parsed_text_fb} 
-                if parsed_text_fb:
-                    raw_kws_fb = re.findall(r'\b[a-zA-Z]{3,}\b', parsed_text_fb)
-                    general_kws_fallback_fb = list(set(kw.lower() for kw in raw_kws_fb if kw.lower() not in JD_RESUME_STOPWORDS and len(kw)>2))[:50]
-                    categorized_keywords["essential"] = general_kws_fallback_fb[:15]
-                    categorized_keywords["general"] = general_kws_fallback_fb[15:]
-                    logger.info(f"--- JD Categorized Keywords (EMERGENCY FALLBACK) for '{jd_file.filename}' ---")
-
-                if sentence_model and parsed_text_fb:
-                    try:
-                        jd_embeddings["full_text"] = sentence_model.encode(parsed_text_fb[:10000])
-                    except Exception as emb_fb_ex:
-                        logger.error(f"Error embedding full_text in emergency fallback for JD {jd_file.filename}: {emb_fb_ex}")
-            else:
-                logger.error(f"JD file object was not valid for emergency fallback parsing: {jd_file.filename}")
-        except Exception as e_fallback_inner:
-            logger.error(f"Emergency fallback also failed for JD {jd_file.filename}: {e_fallback_inner}")
+        logger.error(f"Major error parsing JD file {filename}: {e}", exc_info=True)
         # Ensure returning the defined tuple structure even on complete failure
         return "", {"essential": [], "desirable": [], "general": []}, {}, {}
+
+    if not jd_embeddings:
+        # Keyword-only until the sentence model is back; caching it would pin that for as long as the entry lives
+        logger.warning(f"JD {filename} was parsed without embeddings; not caching it.")
+    elif jd_content_hash and parsed_text:
+        await store_parsed_jd(jd_content_hash, (parsed_text, categorized_keywords, jd_sections_text, jd_embeddings))
+    return parsed_text, categorized_keywords, jd_sections_text, jd_embeddings
+
+async def parse_jd_file(jd_file: UploadFile) -> Tuple[str, Dict[str, List[str]], Dict[str, str], Dict[str, Any]]:
+    try:
+        content = await jd_file.read()
+    except Exception as e:
+        logger.error(f"Could not read uploaded JD {jd_file.filename}: {e}", exc_info=True)
+        return "", {"essential": [], "desirable": [], "general": []}, {}, {}
     finally:
-        if temp_file_path and os.path.exists(temp_file_path):
-            try:
-                os.remove(temp_file_path)
-            except Exception as e_remove:
-                 logger.warning(f"Could not remove temp file {temp_file_path}: {e_remove}")
         if jd_file and hasattr(jd_file, 'file') and jd_file.file and not jd_file.file.closed:
             try:
                 jd_file.file.close()
             except Exception as e_close:
                 logger.warning(f"Error closing UploadFile {jd_file.filename}: {e_close}")
-        
-    return parsed_text, categorized_keywords, jd_sections_text, jd_embeddings
\ No newline at end of file
+    return await parse_jd_content(jd_file.filename, content)
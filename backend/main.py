@@ -1,36 +1,55 @@
 # main.py
-from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Request
+from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, StreamingResponse, JSONResponse, FileResponse, Response
+from fastapi.encoders import jsonable_encoder
 import os
+import json
+import asyncio
 import uuid
 from datetime import datetime, timedelta, timezone # Added timezone
 from bson import ObjectId
-from typing import List, Any, Dict, Tuple
+from typing import List, Any, Dict, Optional, Tuple
 import io
 import base64
 from email.mime.text import MIMEText
 from pydantic import EmailStr, ValidationError # Import ValidationError for explicit catch
 
 # --- Google API Imports ---
-from google.auth.transport.requests import Request as GoogleRequest
-from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build
 from googleapiclient.http import MediaIoBaseUpload
 
-# --- EARLY PANDAS IMPORT ---
-try:
-    from excel_exporter import export_to_excel
-    print("DEBUG: Successfully imported excel_exporter (pandas) early.")
-except Exception as e:
-    print(f"DEBUG: FAILED to import excel_exporter (pandas) early: {e}")
-
 # --- Application Specific Imports ---
 from jd_parser import parse_jd_file
 from resume_parser import parse_resumes
+from document_parsing import start_parse_pool, shutdown_parse_pool, shutdown_extraction_pool
+from ocr import shutdown_ocr_pool
 from match_engine import match_resumes_to_jd
+from match_pipeline import (
+    save_job_description,
+    save_resumes,
+    save_match_results,
+    iter_match_session,
+    MatchCollectionsUnavailable
+)
+from model_registry import model_registry, MODEL_WARMUP_ON_STARTUP, MODEL_DEGRADED
+from excel_exporter import build_session_report, report_url, ReportNotFound, REPORT_FORMATS
+from analytics import get_dashboard_analytics, record_scheduled_interviews, backfill_analytics_rollups, ANALYTICS_BACKFILL_ON_STARTUP
+from upcoming_interviews import get_upcoming_interviews_page, invalidate_upcoming_interviews_cache, etag_matches, InvalidInterviewQuery
+from interview_index import interview_index, start_interview_index, shutdown_interview_index, InterviewIndexUnavailable
+from google_calendar import (
+    GOOGLE_SCOPES as SCOPES,
+    GoogleAuthRequired,
+    create_calendar_event,
+    parse_interview_start,
+    interview_event_body,
+    run_google_api,
+    store_oauth_credentials,
+    shutdown_google_api_pool
+)
+from interview_scheduling import schedule_interviews
+from match_jobs import submit_match_job, get_match_job, shutdown_match_jobs, MatchJobQueueFull, JOB_FAILED
 
 # Import from database.py
 from database import (
@@ -39,7 +58,11 @@ from database import (
     ResumeDB,
     MatchResultDB,
     ScheduledInterviewDB, 
-    logger
+    BulkScheduleRequest,
+    InterviewConflictCheckRequest,
+    AutoSlotRequest,
+    logger,
+    EMBEDDING_BACKEND
 )
 
 STATIC_DIR = "static"
@@ -53,11 +76,6 @@ app = FastAPI(
 # --- Google API Configuration ---
 os.environ['OAUTHLIB_INSECURE_TRANSPORT'] = '1' 
 CLIENT_SECRETS_FILE = "credentials.json"
-SCOPES = [
-    'https://www.googleapis.com/auth/calendar',
-    'https://www.googleapis.com/auth/gmail.send',
-    'https://www.googleapis.com/auth/drive.file'
-]
 # --- End Google API Configuration ---
 
 
@@ -80,17 +98,26 @@ async def startup_db_client():
         logger.critical("CRITICAL: Database connection failed on startup. Application may not function correctly.")
     else:
         logger.info("Database client started and connection appears successful.")
+        if ANALYTICS_BACKFILL_ON_STARTUP:
+            # Upper bound taken before this worker serves a request; the backfill stops earlier if any worker has counted incrementally
+            app.state.analytics_backfill_task = asyncio.create_task(backfill_analytics_rollups(datetime.utcnow()))
+        start_interview_index()
+    if MODEL_WARMUP_ON_STARTUP:
+        # In the background so the server can answer /ready (503) while the models load
+        app.state.model_warmup_task = asyncio.create_task(model_registry.warm_up_all())
+    await start_parse_pool()
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await shutdown_match_jobs()
+    await shutdown_interview_index()
     await db_manager.close_database_connection()
+    shutdown_parse_pool()
+    shutdown_extraction_pool()
+    shutdown_ocr_pool()
+    shutdown_google_api_pool()
 
 # --- Google API Helper Functions ---
-def get_user_credentials():
-    if os.path.exists('token.json'):
-        return Credentials.from_authorized_user_file('token.json', SCOPES)
-    return None
-
 async def _get_or_create_folder_id(service, folder_name: str) -> str:
     # This function seems unused in the current context, but keeping it for completeness
     query = f"name = '{folder_name}' and mimeType = 'application/vnd.google-apps.folder' and 'root' in parents and trashed = false"
@@ -124,11 +151,8 @@ async def callback(request: Request):
     flow.redirect_uri = 'http://localhost:8000/callback'
     
     authorization_response = str(request.url)
-    flow.fetch_token(authorization_response=authorization_response)
-
-    creds = flow.credentials
-    with open('token.json', 'w') as token:
-        token.write(creds.to_json())
+    await run_google_api(lambda: flow.fetch_token(authorization_response=authorization_response)) # Token exchange is a blocking HTTP call
+    await store_oauth_credentials(flow.credentials)
     
     # Redirect to the frontend app's main page or a specific success page
     return RedirectResponse(url="http://localhost:5173/app?auth=success") 
@@ -143,26 +167,7 @@ async def schedule_interview(
     start_time_str: str = Form(..., alias="start_time"), 
     duration_minutes: int = Form(...) 
 ):
-    creds = get_user_credentials()
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            try:
-                creds.refresh(GoogleRequest())
-                with open('token.json', 'w') as token:
-                    token.write(creds.to_json())
-                logger.info("Google credentials refreshed.")
-            except Exception as refresh_err:
-                logger.error(f"Error refreshing Google credentials: {refresh_err}")
-                auth_url_for_user = "http://localhost:8000/authorize"
-                raise HTTPException(status_code=401, detail=f"Failed to refresh credentials. Please re-authorize via {auth_url_for_user}")
-        else:
-            logger.warning("Authentication required for scheduling.")
-            auth_url_for_user = "http://localhost:8000/authorize"
-            raise HTTPException(status_code=401, detail=f"User not authenticated. Please authorize via {auth_url_for_user}")
-
     try:
-        service = build('calendar', 'v3', credentials=creds)
-
         # Split and strip interviewer emails. Pydantic will validate them when creating ScheduledInterviewDB.
         interviewer_email_list_strings: List[str] = [
             email.strip() for email in interviewer_emails_str.split(',') if email.strip()
@@ -171,45 +176,21 @@ async def schedule_interview(
             raise HTTPException(status_code=422, detail="At least one interviewer email is required.")
 
         try:
-            # Ensure start_time_str is parsed correctly. Google API expects ISO format.
-            # Frontend sends datetime-local input which is usually `YYYY-MM-DDTHH:MM`.
-            # This is compatible with fromisoformat if it has no Z or offset.
-            start_datetime_obj_naive = datetime.fromisoformat(start_time_str)
-            # IMPORTANT: Assume frontend sends local time. Convert to UTC for Google Calendar.
-            # For simplicity, let's assume the server's local timezone is what the user meant.
-            # A more robust solution would involve getting timezone from frontend or user profile.
-            start_datetime_obj_local = start_datetime_obj_naive.astimezone() # Convert to server's local timezone
-            start_datetime_obj_utc = start_datetime_obj_local.astimezone(timezone.utc) # Convert to UTC
+            # Frontend sends datetime-local input (`YYYY-MM-DDTHH:MM`), taken as the server's local time and converted to UTC
+            start_datetime_obj_utc = parse_interview_start(start_time_str)
         except ValueError:
             raise HTTPException(status_code=422, detail="Invalid start_time format. Expected YYYY-MM-DDTHH:MM.")
 
         end_datetime_obj_utc = start_datetime_obj_utc + timedelta(minutes=duration_minutes)
-
-        # For Google API, emails must be strings. candidate_email is already a validated string.
-        google_api_attendees = [{'email': str(candidate_email)}] # Convert EmailStr to str
-        google_api_attendees.extend([{'email': email} for email in interviewer_email_list_strings])
-
-        event_body_for_google = {
-            'summary': f'Interview: {candidate_name}',
-            'description': f'Interview with {candidate_name}. Scheduled via HisbandHR.ai.',
-            'start': {'dateTime': start_datetime_obj_utc.isoformat(), 'timeZone': 'UTC'},
-            'end': {'dateTime': end_datetime_obj_utc.isoformat(), 'timeZone': 'UTC'},
-            'attendees': google_api_attendees,
-            'conferenceData': {
-                'createRequest': {
-                    'requestId': str(uuid.uuid4()),
-                    'conferenceSolutionKey': {'type': 'hangoutsMeet'}
-                }
-            },
-            'reminders': {'useDefault': True},
-        }
+        event_body_for_google = interview_event_body(
+            candidate_name, str(candidate_email), interviewer_email_list_strings, start_datetime_obj_utc, end_datetime_obj_utc
+        )
         
-        created_event = service.events().insert(
-            calendarId='primary', 
-            body=event_body_for_google, 
-            sendUpdates='all', 
-            conferenceDataVersion=1
-        ).execute()
+        try:
+            created_event = await create_calendar_event(event_body_for_google)
+        except GoogleAuthRequired as e:
+            auth_url_for_user = "http://localhost:8000/authorize"
+            raise HTTPException(status_code=401, detail=f"{e} Please authorize via {auth_url_for_user}")
 
         meet_link = created_event.get('hangoutLink')
         calendar_link = created_event.get('htmlLink')
@@ -234,8 +215,12 @@ async def schedule_interview(
             logger.error("scheduled_interviews collection not available.")
             raise HTTPException(status_code=500, detail="Interview scheduled in Google but failed to save to local DB.")
         
-        await scheduled_interviews_collection.insert_one(scheduled_interview_doc.model_dump(by_alias=True, exclude_none=True))
+        scheduled_interview_record = scheduled_interview_doc.model_dump(by_alias=True, exclude_none=True)
+        await scheduled_interviews_collection.insert_one(scheduled_interview_record)
         logger.info(f"Scheduled interview for {candidate_name} saved to DB.")
+        invalidate_upcoming_interviews_cache()
+        interview_index.add_interviews([scheduled_interview_record])
+        await record_scheduled_interviews([scheduled_interview_record])
 
         return {"status": "success", "event_link": calendar_link, "meet_link": meet_link}
 
@@ -254,26 +239,86 @@ async def schedule_interview(
         raise HTTPException(status_code=500, detail=f"Failed to create calendar event or save to DB: {str(e)}")
 
 
-@app.get("/api/upcoming-interviews", response_model=List[ScheduledInterviewDB], summary="Get all upcoming scheduled interviews")
-async def get_upcoming_interviews():
-    if db_manager.db is None:
-        raise HTTPException(status_code=503, detail="Database service unavailable.")
-    
+@app.post("/api/schedule-interviews/bulk", summary="Schedules many interviews with batched Calendar requests; per-item status")
+async def schedule_interviews_bulk(request_body: BulkScheduleRequest):
     scheduled_interviews_collection = db_manager.get_collection("scheduled_interviews")
     if scheduled_interviews_collection is None:
         raise HTTPException(status_code=503, detail="Scheduled interviews collection unavailable.")
-    
-    now_utc = datetime.now(timezone.utc)
-    
-    interviews_cursor = scheduled_interviews_collection.find(
-        {"start_time": {"$gte": now_utc}} 
-    ).sort("start_time", 1).limit(100) 
-    
-    interviews_list = await interviews_cursor.to_list(length=100)
-    return interviews_list
+
+    try:
+        return await schedule_interviews(request_body.interviews, scheduled_interviews_collection)
+    except GoogleAuthRequired as e:
+        auth_url_for_user = "http://localhost:8000/authorize"
+        raise HTTPException(status_code=401, detail=f"{e} Please authorize via {auth_url_for_user}")
+
+
+@app.post("/api/interviews/conflicts", summary="Interviews that overlap a proposed slot for any of the given interviewers")
+async def check_interview_conflicts(request_body: InterviewConflictCheckRequest):
+    try:
+        start_utc = parse_interview_start(request_body.start_time)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Invalid start_time format. Expected YYYY-MM-DDTHH:MM.")
+    end_utc = start_utc + timedelta(minutes=request_body.duration_minutes)
+    try:
+        conflicts = interview_index.find_conflicts(request_body.interviewer_emails, start_utc, end_utc)
+    except InterviewIndexUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {
+        "start_time": start_utc.isoformat(),
+        "end_time": end_utc.isoformat(),
+        "has_conflicts": bool(conflicts),
+        "conflicts": conflicts
+    }
+
+
+@app.post("/api/interviews/auto-slot", summary="Earliest window in which all the given interviewers are free")
+async def auto_slot_interview(request_body: AutoSlotRequest):
+    try:
+        earliest_start = parse_interview_start(request_body.earliest_start) if request_body.earliest_start else None
+        latest_end = parse_interview_start(request_body.latest_end) if request_body.latest_end else None
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Invalid earliest_start/latest_end format. Expected YYYY-MM-DDTHH:MM.")
+    try:
+        slot = interview_index.earliest_free_slot(request_body.interviewer_emails, request_body.duration_minutes, earliest_start, latest_end)
+    except InterviewIndexUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    if slot is None:
+        raise HTTPException(status_code=404, detail="No common free window of that length in the requested range.")
+    return {"start_time": slot[0].isoformat(), "end_time": slot[1].isoformat(), "duration_minutes": request_body.duration_minutes}
+
+
+@app.get("/api/upcoming-interviews", summary="Upcoming scheduled interviews, keyset-paginated (X-Next-Cursor header) with ETag support")
+async def get_upcoming_interviews(
+    request: Request,
+    limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. candidate_name,start_time")
+):
+    if db_manager.db is None:
+        raise HTTPException(status_code=503, detail="Database service unavailable.")
+    try:
+        page = await get_upcoming_interviews_page(cursor, limit, fields)
+    except InvalidInterviewQuery as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    headers = {"ETag": page.etag, "Cache-Control": "no-cache"} # no-cache: clients revalidate every poll and mostly get 304
+    if page.next_cursor:
+        headers["X-Next-Cursor"] = page.next_cursor
+        headers["Link"] = f'<{request.url.include_query_params(cursor=page.next_cursor)}>; rel="next"'
+    if etag_matches(request.headers.get("if-none-match"), page.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=page.body, media_type="application/json", headers=headers)
 
 
 # --- Your Existing HisbandHR.ai Endpoints ---
+def _require_models_loaded():
+    # Matching while the models load would score keyword-only and persist those scores; ask the client to retry
+    loading = model_registry.loading_models()
+    if loading:
+        raise HTTPException(status_code=503, detail=f"Models are still loading ({', '.join(loading)}). Please retry shortly.", headers={"Retry-After": "10"})
+
 @app.post("/api/match", summary="Process JD and Resumes for Advanced Semantic Matching")
 async def process_files_for_matching(
     jd_file_upload: UploadFile = File(..., alias="jd"),
@@ -284,17 +329,10 @@ async def process_files_for_matching(
     if db_manager.db is None:
         logger.error("Database is not connected. Cannot process request.")
         raise HTTPException(status_code=503, detail="Database service unavailable. Please try again later.")
+    _require_models_loaded()
 
     session_id = str(uuid.uuid4()) 
 
-    jds_collection = db_manager.get_collection("job_descriptions")
-    resumes_collection = db_manager.get_collection("resumes")
-    matches_collection = db_manager.get_collection("match_results")
-
-    if jds_collection is None or resumes_collection is None or matches_collection is None:
-        logger.error("One or more MongoDB collections are not available (returned None).")
-        raise HTTPException(status_code=503, detail="Database collections unavailable.")
-
     try:
         parsed_jd_text, jd_categorized_keywords, jd_sections_text, jd_embeddings = await parse_jd_file(jd_file_upload)
         
@@ -302,101 +340,34 @@ async def process_files_for_matching(
             logger.error(f"Failed to parse Job Description content: {jd_file_upload.filename}")
             raise HTTPException(status_code=422, detail=f"Failed to parse Job Description: {jd_file_upload.filename}. It might be empty, corrupted, or an unsupported format.")
 
-        flat_jd_keywords_for_db = []
-        if jd_categorized_keywords:
-            flat_jd_keywords_for_db.extend(jd_categorized_keywords.get("essential", []))
-            flat_jd_keywords_for_db.extend(jd_categorized_keywords.get("desirable", []))
-            flat_jd_keywords_for_db.extend(jd_categorized_keywords.get("general", []))
-            flat_jd_keywords_for_db = sorted(list(set(flat_jd_keywords_for_db)), key=len, reverse=True)
-
-
-        jd_doc_data = JobDescriptionDB(
-            filename=jd_file_upload.filename,
-            parsed_text=parsed_jd_text,
-            keywords=flat_jd_keywords_for_db,
-        )
-        dict_to_insert_jd = jd_doc_data.model_dump(by_alias=True, exclude_none=True)
-        result_jd = await jds_collection.insert_one(dict_to_insert_jd)
-        jd_db_id = result_jd.inserted_id
-        logger.info(f"Saved JD '{jd_file_upload.filename}' to DB with ID: {jd_db_id}")
+        jd_db_id = await save_job_description(jd_file_upload.filename, parsed_jd_text, jd_categorized_keywords)
 
         parsed_resumes_full_data = await parse_resumes(resume_file_uploads)
         if not parsed_resumes_full_data:
              logger.warning("No resumes were successfully parsed from the uploaded files.")
              return {"results": [], "excelUrl": None, "message": "No resume content could be processed."}
 
-        resumes_for_matching_engine = []
-        for resume_item_data in parsed_resumes_full_data:
-            resume_doc_data = ResumeDB(
-                jd_id=jd_db_id, 
-                session_id=session_id,
-                filename=resume_item_data["filename"],
-                parsed_text=resume_item_data["parsed_text"],
-            )
-            dict_to_insert_resume = resume_doc_data.model_dump(by_alias=True, exclude_none=True)
-            result_resume = await resumes_collection.insert_one(dict_to_insert_resume)
-            
-            resumes_for_matching_engine.append({
-                "filename": resume_item_data["filename"],
-                "parsed_text": resume_item_data["parsed_text"],
-                "embedding": resume_item_data.get("embedding"), 
-                "skills": resume_item_data.get("skills", []),   
-                "db_id": result_resume.inserted_id             
-            })
-            logger.info(f"Saved resume '{resume_item_data['filename']}' to DB with ID: {result_resume.inserted_id}")
-
-        match_results_from_engine = match_resumes_to_jd(
-            parsed_jd_text,        
-            jd_categorized_keywords, 
-            jd_sections_text,      
-            jd_embeddings,         
-            resumes_for_matching_engine 
+        resumes_for_matching_engine = await save_resumes(parsed_resumes_full_data, jd_db_id, session_id)
+
+        # Scoring is synchronous NumPy/regex work; run it on a thread so other requests keep being served
+        match_results_from_engine = await asyncio.get_running_loop().run_in_executor(
+            None, match_resumes_to_jd,
+            parsed_jd_text, jd_categorized_keywords, jd_sections_text, jd_embeddings, resumes_for_matching_engine
         )
 
-        final_match_results_for_response = []
-        for match_item_from_engine in match_results_from_engine:
-            resume_db_id_for_match = None
-            for r_data in resumes_for_matching_engine:
-                if r_data["filename"] == match_item_from_engine.get("original_filename"): 
-                    resume_db_id_for_match = r_data["db_id"]
-                    break
-            
-            if resume_db_id_for_match is None:
-                logger.warning(f"Could not find DB ID for matched resume: {match_item_from_engine.get('original_filename')}. Skipping DB save for this specific match result, but including in response.")
-                final_match_results_for_response.append(match_item_from_engine) 
-                continue
-
-            match_doc_data = MatchResultDB(
-                resume_id=resume_db_id_for_match, 
-                jd_id=jd_db_id, 
-                session_id=session_id,
-                candidate_name=match_item_from_engine.get("name", "Unknown Candidate"),
-                jd_fit_score=match_item_from_engine.get("jdFit", 0),
-                interview_score=match_item_from_engine.get("interviewScore", 0.0),
-                red_flags=match_item_from_engine.get("redFlags", []),
-                experience_summary=match_item_from_engine.get("experienceSummary", "N/A"),
-            )
-            dict_to_insert_match = match_doc_data.model_dump(by_alias=True, exclude_none=True)
-            result_match = await matches_collection.insert_one(dict_to_insert_match)
-            logger.info(f"Saved match result for '{match_item_from_engine.get('name')}' to DB with ID: {result_match.inserted_id}")
-            
-            response_item = {**match_item_from_engine}
-            response_item["match_db_id"] = str(result_match.inserted_id) 
-            response_item["resume_db_id"] = str(resume_db_id_for_match)
-            response_item["jd_db_id"] = str(jd_db_id)
-            # Add candidate email and phone to response if extracted by match_engine
-            response_item["email"] = match_item_from_engine.get("email") 
-            response_item["phone"] = match_item_from_engine.get("phone")
-            final_match_results_for_response.append(response_item)
-
-        excel_url = export_to_excel(final_match_results_for_response)
-        
+        final_match_results_for_response = await save_match_results(match_results_from_engine, jd_db_id, session_id)
+
+        # Only links: the report is generated from match_results the first time it is downloaded
+        has_results = bool(final_match_results_for_response)
         return {
             "results": final_match_results_for_response,
-            "excelUrl": excel_url,
+            "excelUrl": report_url(session_id, "xlsx") if has_results else None,
+            "csvUrl": report_url(session_id, "csv") if has_results else None,
             "message": f"Successfully processed and matched {len(final_match_results_for_response)} candidates." if final_match_results_for_response else "No candidates were matched or processed successfully."
         }
 
+    except MatchCollectionsUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except HTTPException as http_exc: 
         logger.error(f"HTTP Exception in /api/match: {http_exc.detail}", exc_info=True)
         raise http_exc
@@ -405,6 +376,148 @@ async def process_files_for_matching(
         raise HTTPException(status_code=500, detail=f"An unexpected server error occurred. Please check logs. Error: {str(e)}")
 
 
+async def _read_resume_uploads(resume_file_uploads: List[UploadFile]) -> List[Tuple[str, bytes]]:
+    resume_documents: List[Tuple[str, bytes]] = []
+    for resume in resume_file_uploads:
+        try:
+            resume_documents.append((resume.filename, await resume.read()))
+        except Exception as e:
+            logger.error(f"Could not read uploaded resume {resume.filename}: {e}", exc_info=True)
+    return resume_documents
+
+def _format_stream_event(event: Dict[str, Any], stream_format: str) -> str:
+    payload = json.dumps(jsonable_encoder(event))
+    if stream_format == "sse":
+        return f"event: {event['event']}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+@app.post("/api/match/stream", summary="Streams candidates as they are scored (NDJSON or Server-Sent Events)")
+async def stream_files_for_matching(
+    jd_file_upload: UploadFile = File(..., alias="jd"),
+    resume_file_uploads: List[UploadFile] = File(..., alias="resumes"),
+    stream_format: str = Query("ndjson", alias="format", pattern="^(ndjson|sse)$")
+):
+    logger.info(f"Received JD (streaming): {jd_file_upload.filename}, Resumes count: {len(resume_file_uploads)}")
+
+    if db_manager.db is None:
+        logger.error("Database is not connected. Cannot process request.")
+        raise HTTPException(status_code=503, detail="Database service unavailable. Please try again later.")
+    _require_models_loaded()
+
+    # Everything request-bound is read before the response starts; uploads are closed once the handler returns
+    parsed_jd = await parse_jd_file(jd_file_upload)
+    if not parsed_jd[0]:
+        logger.error(f"Failed to parse Job Description content: {jd_file_upload.filename}")
+        raise HTTPException(status_code=422, detail=f"Failed to parse Job Description: {jd_file_upload.filename}. It might be empty, corrupted, or an unsupported format.")
+    resume_documents = await _read_resume_uploads(resume_file_uploads)
+    jd_filename = jd_file_upload.filename
+
+    async def event_stream():
+        try:
+            async for event in iter_match_session(jd_filename, parsed_jd, resume_documents):
+                yield _format_stream_event(event, stream_format)
+        except Exception as e:
+            logger.exception(f"An unexpected error occurred in /api/match/stream: {e}")
+            yield _format_stream_event({"event": "error", "detail": f"An unexpected server error occurred. Error: {str(e)}"}, stream_format)
+
+    media_type = "text/event-stream" if stream_format == "sse" else "application/x-ndjson"
+    # X-Accel-Buffering stops nginx-style proxies from holding events back until the stream ends
+    return StreamingResponse(event_stream(), media_type=media_type, headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+# --- Background Match Jobs ---
+@app.post("/api/match/jobs", status_code=202, summary="Queues a JD/resumes match as a background job and returns its ID")
+async def submit_matching_job(
+    jd_file_upload: UploadFile = File(..., alias="jd"),
+    resume_file_uploads: List[UploadFile] = File(..., alias="resumes")
+):
+    logger.info(f"Received JD (job): {jd_file_upload.filename}, Resumes count: {len(resume_file_uploads)}")
+
+    if db_manager.db is None:
+        logger.error("Database is not connected. Cannot process request.")
+        raise HTTPException(status_code=503, detail="Database service unavailable. Please try again later.")
+    _require_models_loaded()
+
+    jd_content = await jd_file_upload.read()
+    resume_documents = await _read_resume_uploads(resume_file_uploads)
+    try:
+        job = submit_match_job(jd_file_upload.filename, jd_content, resume_documents)
+    except MatchJobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+    return {
+        "job_id": job.job_id,
+        "status": job.status,
+        "status_url": f"/api/match/jobs/{job.job_id}",
+        "result_url": f"/api/match/jobs/{job.job_id}/result",
+    }
+
+@app.get("/api/match/jobs/{job_id}", summary="Status and progress of a background match job")
+async def get_matching_job_status(job_id: str):
+    job = await get_match_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Match job {job_id} not found (it may have expired).")
+    return job.status_view()
+
+@app.get("/api/match/jobs/{job_id}/result", summary="Results of a finished background match job")
+async def get_matching_job_result(job_id: str):
+    job = await get_match_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Match job {job_id} not found (it may have expired).")
+    if not job.is_finished:
+        return JSONResponse(status_code=202, content=job.status_view())
+    if job.status == JOB_FAILED:
+        raise HTTPException(status_code=500, detail=f"Match job failed: {job.error}")
+    return {
+        "job_id": job.job_id,
+        "results": job.results,
+        "excelUrl": job.excel_url,
+        "csvUrl": job.csv_url,
+        "message": job.message,
+    }
+
+
+@app.get("/api/analytics", summary="Dashboard analytics: score distributions, per-JD counts, red flags and interview pipeline")
+async def get_analytics():
+    if db_manager.db is None:
+        raise HTTPException(status_code=503, detail="Database service unavailable. Please try again later.")
+    try:
+        return jsonable_encoder(await get_dashboard_analytics(), custom_encoder={ObjectId: str})
+    except Exception as e:
+        logger.exception(f"Error building analytics: {e}")
+        raise HTTPException(status_code=500, detail="Could not load analytics.")
+
+@app.get("/api/reports/{session_id}", summary="Download a match session's report (xlsx or csv), generated on first request")
+async def download_session_report(session_id: str, format: str = Query("xlsx", description="xlsx or csv")):
+    report_format = format.lower()
+    if report_format not in REPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported report format '{format}'. Use one of: {', '.join(REPORT_FORMATS)}.")
+    if db_manager.db is None:
+        raise HTTPException(status_code=503, detail="Database service unavailable. Please try again later.")
+    try:
+        report_path = await build_session_report(session_id, report_format)
+    except ReportNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.exception(f"Error generating {report_format} report for session {session_id}: {e}")
+        raise HTTPException(status_code=500, detail="Could not generate the report.")
+    media_type = "text/csv" if report_format == "csv" else "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    return FileResponse(report_path, media_type=media_type, filename=f"MatchedCandidates_{session_id}.{report_format}")
+
+@app.get("/ready", summary="Readiness probe: 200 only once the NLP and embedding models are loaded and warmed up")
+async def readiness():
+    models_ready = model_registry.is_ready()
+    model_status = model_registry.status()
+    body = {
+        "ready": models_ready,
+        "degraded": any(model["state"] == MODEL_DEGRADED for model in model_status.values()), # Ready, but a warm-up failed
+        "models": model_status,
+        "embedding_backend": EMBEDDING_BACKEND,
+        "database_connected": db_manager.db is not None,
+    }
+    return JSONResponse(status_code=200 if models_ready else 503, content=body)
+
+
 @app.get("/", include_in_schema=False) 
 async def root_redirect():
     # Redirect to the frontend's main application page
@@ -1,14 +1,18 @@
 # match_engine.py
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Iterable, Mapping, Optional, Tuple
+from dataclasses import dataclass
+from types import MappingProxyType
+import bisect
+import math
 import uuid
 import random
 import re
 import os
-from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
 
 from database import logger
-from jd_parser import nlp, sentence_model, JD_RESUME_STOPWORDS, COMMON_TECH_DOMAINS # Import COMMON_TECH_DOMAINS
+from jd_parser import JD_RESUME_STOPWORDS, COMMON_TECH_DOMAINS # Import COMMON_TECH_DOMAINS
+from model_registry import get_nlp
 
 MIN_RESUME_LENGTH_WORDS = 40 # Reduced slightly
 
@@ -47,7 +51,8 @@ def is_plausible_name(name_str: str, filename_context: str = "") -> bool:
     if all(word.lower() in JD_RESUME_STOPWORDS for word in name_str.split() if len(word)>2): return False
     return True
 
-def extract_name_from_text(resume_text: str, filename: str) -> str:
+def extract_name_from_text(resume_text: str, filename: str, person_entities: Optional[List[Tuple[str, int]]] = None) -> str:
+    # person_entities: (text, start_char) PERSON entities from resume_parser's shared spaCy pass; avoids a second nlp() call
     logger.debug(f"Extracting name from: {filename}")
     potential_names = []
     if resume_text:
@@ -58,11 +63,14 @@ def extract_name_from_text(resume_text: str, filename: str) -> str:
         if explicit_match:
             name = " ".join(explicit_match.group(1).strip().title().split())
             if is_plausible_name(name, filename): potential_names.append((name, 100))
-    if nlp and resume_text:
+    nlp = get_nlp() if person_entities is None and resume_text else None
+    if nlp:
         doc = nlp(resume_text[:min(len(resume_text),1200)]) # Ensure not too long
-        person_ents = sorted([ent for ent in doc.ents if ent.label_ == "PERSON" and ent.start_char < 600], key=lambda e: e.start_char)
-        for ent in person_ents:
-            name_candidate = " ".join(ent.text.strip().split())
+        person_entities = [(ent.text, ent.start_char) for ent in doc.ents if ent.label_ == "PERSON" and ent.start_char < 600]
+    if person_entities and resume_text:
+        person_ents = sorted(person_entities, key=lambda e: e[1])
+        for ent_text, _ in person_ents:
+            name_candidate = " ".join(ent_text.strip().split())
             parts = name_candidate.split()
             if 1 < len(parts) <= 4:
                 cap_parts = sum(1 for p in parts if p and p[0].isupper())
@@ -167,19 +175,92 @@ def extract_years_of_experience(text: str) -> Dict[str, float]:
     if experiences: logger.debug(f"Extracted YOE: {experiences}")
     return experiences
 
-def calculate_semantic_similarity(jd_embedding: np.ndarray, resume_embedding: np.ndarray) -> float:
-    if not all(isinstance(emb, np.ndarray) and emb.size > 0 for emb in [jd_embedding, resume_embedding]): return 0.0
-    jd_emb = jd_embedding.reshape(1, -1) if jd_embedding.ndim == 1 else jd_embedding
-    resume_emb = resume_embedding.reshape(1, -1) if resume_embedding.ndim == 1 else resume_embedding
-    if jd_emb.shape[1] != resume_emb.shape[1]:
-        logger.warning(f"Embedding shape mismatch: JD {jd_emb.shape}, Resume {resume_emb.shape}")
-        return 0.0
-    try:
-        sim = cosine_similarity(jd_emb, resume_emb)
-        return float(sim[0][0]) if sim.size > 0 else 0.0
-    except Exception as e:
-        logger.error(f"Error in calculate_semantic_similarity: {e}")
-        return 0.0
+SEMANTIC_SECTION_WEIGHTS = {
+    "essential_requirements": 0.40,
+    "skills_semantic_document": 0.40, 
+    "responsibilities": 0.20,
+}
+
+def _adjust_similarities(sims: np.ndarray) -> np.ndarray:
+    # Piecewise stretch of raw cosine similarity, then clamp to [0, 1]
+    adjusted = np.where(sims >= 0.60, sims + (sims - 0.60) * 0.7,
+               np.where(sims >= 0.45, sims + (sims - 0.45) * 0.4,
+               np.where(sims < 0.30, sims * 0.9, sims)))
+    return np.clip(adjusted, 0.0, 1.0)
+
+def _normalized_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0 # Zero vectors get similarity 0, as with sklearn's cosine_similarity
+    return matrix / norms
+
+SectionBlocks = Tuple[Tuple[Tuple[int, ...], np.ndarray], ...]
+
+def _compile_jd_section_embeddings(jd_embeddings: Dict[str, Any]) -> Tuple[Tuple[str, ...], SectionBlocks, Optional[np.ndarray], bool]:
+    """
+    Stacks the scored JD section embeddings into row-normalized, read-only matrices, one per embedding size
+    (a single block unless the sections were embedded at mixed sizes), each with the section columns it fills.
+    Returns (section names, blocks, section weights, full_text_fallback); blocks is empty if nothing can be scored.
+    """
+    if not jd_embeddings:
+        return (), (), None, False
+    section_names = [name for name in SEMANTIC_SECTION_WEIGHTS
+                     if isinstance(jd_embeddings.get(name), np.ndarray) and jd_embeddings[name].size > 0]
+    full_text_fallback = False
+    if not section_names and isinstance(jd_embeddings.get("full_text"), np.ndarray) and jd_embeddings["full_text"].size > 0:
+        section_names = ["full_text"] # Fallback: plain clamped similarity against the whole JD
+        full_text_fallback = True
+    if not section_names:
+        return (), (), None, False
+
+    columns_by_size: Dict[int, List[int]] = {}
+    for column, name in enumerate(section_names):
+        columns_by_size.setdefault(jd_embeddings[name].size, []).append(column)
+    if len(columns_by_size) > 1:
+        # Each section is still scored against resumes of its own size; the rest score 0 for it, as when scored one by one
+        logger.warning(f"JD section embeddings have mixed sizes {sorted(columns_by_size)}; scoring each size separately.")
+    section_blocks = []
+    for columns in columns_by_size.values():
+        block_matrix = _normalized_rows(np.vstack([jd_embeddings[section_names[column]].reshape(-1) for column in columns]).astype(np.float64))
+        block_matrix.flags.writeable = False
+        section_blocks.append((tuple(columns), block_matrix))
+    section_weights = None if full_text_fallback else np.array([SEMANTIC_SECTION_WEIGHTS[name] for name in section_names])
+    return tuple(section_names), tuple(section_blocks), section_weights, full_text_fallback
+
+def calculate_semantic_scores(jd_embeddings: Dict[str, Any], resume_embeddings: List[Any], jd_context: Optional["JDMatchContext"] = None) -> List[float]:
+    """
+    Raw semantic score (0-100, before calibration) for every resume embedding against the JD sections.
+    All resumes are stacked into one normalized matrix and compared to all JD sections in a single product
+    (one product per embedding size if the JD sections were embedded at mixed sizes).
+    """
+    scores = np.zeros(len(resume_embeddings), dtype=np.float64)
+    if jd_context is not None:
+        section_names, section_blocks, section_weights, full_text_fallback = jd_context.section_names, jd_context.section_blocks, jd_context.section_weights, jd_context.full_text_fallback
+    else:
+        section_names, section_blocks, section_weights, full_text_fallback = _compile_jd_section_embeddings(jd_embeddings)
+    if not section_blocks or not resume_embeddings:
+        return scores.tolist()
+
+    valid_indices = [i for i, emb in enumerate(resume_embeddings) if isinstance(emb, np.ndarray) and emb.size > 0]
+    if not valid_indices:
+        return scores.tolist()
+
+    sims = np.zeros((len(valid_indices), len(section_names)), dtype=np.float64)
+    for columns, block_matrix in section_blocks:
+        jd_dim = block_matrix.shape[1]
+        matching_rows = [row for row, i in enumerate(valid_indices) if resume_embeddings[i].size == jd_dim]
+        if matching_rows:
+            resume_matrix = np.vstack([resume_embeddings[valid_indices[row]].reshape(-1) for row in matching_rows]).astype(np.float64)
+            sims[np.ix_(matching_rows, columns)] = _normalized_rows(resume_matrix) @ block_matrix.T
+    block_dims = {block_matrix.shape[1] for _, block_matrix in section_blocks}
+    for i in valid_indices:
+        if resume_embeddings[i].size not in block_dims:
+            logger.warning(f"Embedding shape mismatch: JD {sorted(block_dims)}, Resume {resume_embeddings[i].shape}")
+
+    if full_text_fallback:
+        scores[valid_indices] = np.clip(sims[:, 0], 0.0, 1.0) * 100
+    else:
+        scores[valid_indices] = (_adjust_similarities(sims) @ section_weights) / section_weights.sum() * 100
+    return scores.tolist()
 
 def is_meaningful_keyword(kw: str) -> bool:
     kw_lower = kw.lower()
@@ -217,10 +298,195 @@ def is_meaningful_keyword(kw: str) -> bool:
     return True
 
 
+_KEYWORD_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+_SKILL_INDEX_SEPARATOR = "\x00"
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+def _has_word_boundaries(text: str, start: int, end: int) -> bool:
+    # Same test re applies for r'\b' + re.escape(kw) + r'\b' at text[start:end]
+    before_is_word = start > 0 and _is_word_char(text[start - 1])
+    after_is_word = end < len(text) and _is_word_char(text[end])
+    return before_is_word != _is_word_char(text[start]) and _is_word_char(text[end - 1]) != after_is_word
+
+
+class ResumeSkillIndex:
+    """Per-resume lookup structures for the partial skill rules of KeywordMatcher."""
+
+    def __init__(self, resume_skills_lower_set: set):
+        self.skills = resume_skills_lower_set
+        self.words_in_skill_phrases = {word for r_skill in resume_skills_lower_set if ' ' in r_skill for word in r_skill.split()}
+        ordered_skills = list(resume_skills_lower_set)
+        self.joined_skills = _SKILL_INDEX_SEPARATOR.join(ordered_skills)
+        self.skill_starts: List[int] = []
+        offset = 0
+        for r_skill in ordered_skills:
+            self.skill_starts.append(offset)
+            offset += len(r_skill) + 1
+        self.ordered_skills = ordered_skills
+
+    def skill_containing(self, kw_lower: str) -> bool:
+        """True if some resume skill contains kw_lower and is not much longer than it."""
+        position = self.joined_skills.find(kw_lower)
+        while position != -1:
+            r_skill = self.ordered_skills[bisect.bisect_right(self.skill_starts, position) - 1]
+            if len(kw_lower) >= max(3, 0.6 * len(r_skill)):
+                return True
+            position = self.joined_skills.find(kw_lower, position + 1)
+        return False
+
+    def skill_within(self, kw_lower: str, min_skill_len: int) -> bool:
+        """True if some resume skill of length >= min_skill_len is a substring of kw_lower."""
+        for length in range(min_skill_len, len(kw_lower) + 1):
+            for start in range(0, len(kw_lower) - length + 1):
+                if kw_lower[start:start + length] in self.skills:
+                    return True
+        return False
+
+
+class KeywordMatcher:
+    """
+    Compiled once per JD. Finds every JD keyword occurring in a resume in one pass over the
+    resume's tokens, with the same word-boundary semantics as re.search(r'\bkw\b'), and applies
+    the Direct Skill / Text Exact / partial rules of calculate_weighted_keyword_score.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = set()
+        self._token_counts_by_first_token: Dict[str, set] = {}
+        self._fallback_patterns: Dict[str, "re.Pattern"] = {}
+        for kw in keywords:
+            kw_lower = kw.lower()
+            if not kw_lower or kw_lower in self.keywords:
+                continue
+            self.keywords.add(kw_lower)
+            tokens = _KEYWORD_TOKEN_PATTERN.findall(kw_lower)
+            if tokens and kw_lower == kw_lower.strip():
+                self._token_counts_by_first_token.setdefault(tokens[0], set()).add(len(tokens))
+            else: # Keywords with surrounding whitespace can't be token-aligned; keep the regex for them
+                self._fallback_patterns[kw_lower] = re.compile(r'\b' + re.escape(kw_lower) + r'\b')
+
+    def find_in_text(self, text_lower: str) -> set:
+        """Returns the keywords that occur in text_lower as whole words."""
+        found = set()
+        if not text_lower:
+            return found
+        token_matches = list(_KEYWORD_TOKEN_PATTERN.finditer(text_lower))
+        token_count = len(token_matches)
+        for i, token_match in enumerate(token_matches):
+            token_counts = self._token_counts_by_first_token.get(token_match.group())
+            if not token_counts:
+                continue
+            start = token_match.start()
+            for count in token_counts:
+                if i + count > token_count:
+                    continue
+                end = token_matches[i + count - 1].end()
+                candidate = text_lower[start:end]
+                if candidate in self.keywords and candidate not in found and _has_word_boundaries(text_lower, start, end):
+                    found.add(candidate)
+        for kw_lower, pattern in self._fallback_patterns.items():
+            if pattern.search(text_lower):
+                found.add(kw_lower)
+        return found
+
+    def match(self, resume_text_lower: str, resume_skills_lower_set: set) -> Dict[str, str]:
+        """Maps every JD keyword (lowercased) to its match type, or "None" if it is not matched."""
+        text_hits = self.find_in_text(resume_text_lower)
+        skill_index = None
+        match_types: Dict[str, str] = {}
+        for kw_lower in self.keywords:
+            if kw_lower in resume_skills_lower_set:
+                match_types[kw_lower] = "Direct Skill"
+                continue
+            if not resume_text_lower:
+                match_types[kw_lower] = "None"
+                continue
+            if kw_lower in text_hits:
+                match_types[kw_lower] = "Text Exact"
+                continue
+            if skill_index is None:
+                skill_index = ResumeSkillIndex(resume_skills_lower_set)
+            match_type = "None"
+            if ' ' in kw_lower:
+                if skill_index.skill_within(kw_lower, max(3, math.ceil(0.6 * len(kw_lower)))):
+                    match_type = "Partial JD by RSkill"
+                elif skill_index.skill_containing(kw_lower):
+                    match_type = "Partial RSkill by JD"
+            elif kw_lower in skill_index.words_in_skill_phrases:
+                match_type = "JD Word in RSkill Phrase"
+            match_types[kw_lower] = match_type
+        return match_types
+
+
+KEYWORD_CATEGORY_WEIGHTS = {"essential": 6.0, "desirable": 2.5, "general": 1.2} # MODIFIED: Increased category weights
+
+
+@dataclass(frozen=True)
+class JDMatchContext:
+    """
+    Everything per-resume scoring needs from the JD, built once per match request by
+    build_jd_match_context and shared read-only by every resume.
+    """
+    meaningful_keywords: Mapping[str, Tuple[str, ...]] # By category, original case, JD order
+    scored_keywords: Tuple[Tuple[str, str, str, float], ...] # (category, original, lowercased, category weight x keyword weight)
+    total_possible_keyword_score: float
+    essential_keywords: Tuple[str, ...]
+    essential_keywords_lower: Tuple[str, ...]
+    essential_patterns: Tuple["re.Pattern", ...]
+    keyword_matcher: KeywordMatcher
+    section_names: Tuple[str, ...]
+    section_blocks: SectionBlocks # (section columns, row-normalized JD section embeddings) per embedding size
+    section_weights: Optional[np.ndarray]
+    full_text_fallback: bool
+    candidate_role: str
+
+
+def _role_from_jd_text(parsed_jd_text: str) -> str:
+    jd_text_lower = parsed_jd_text.lower() if parsed_jd_text else ""
+    if "product manager" in jd_text_lower: return "Product Manager"
+    if "data scientist" in jd_text_lower: return "Data Scientist"
+    return "Software Engineer"
+
+
+def build_jd_match_context(parsed_jd_text: str, jd_categorized_keywords: Dict[str, List[str]], jd_embeddings: Dict[str, Any]) -> JDMatchContext:
+    meaningful_keywords = {
+        category: tuple(kw for kw in keywords if is_meaningful_keyword(kw))
+        for category, keywords in jd_categorized_keywords.items()
+    }
+    scored_keywords = []
+    for category, keywords in meaningful_keywords.items():
+        cat_weight = KEYWORD_CATEGORY_WEIGHTS.get(category, 0.0)
+        for kw_orig_case in keywords:
+            kw_lower = kw_orig_case.lower()
+            # MODIFIED: Slightly increased keyword_base_weight for multi-word
+            keyword_base_weight = 1.0 + min((len(kw_lower.split()) - 1) * 0.25, 0.5)
+            scored_keywords.append((category, kw_orig_case, kw_lower, cat_weight * keyword_base_weight))
+
+    essential_keywords = meaningful_keywords.get("essential", ())
+    section_names, section_blocks, section_weights, full_text_fallback = _compile_jd_section_embeddings(jd_embeddings)
+    return JDMatchContext(
+        meaningful_keywords=MappingProxyType(meaningful_keywords),
+        scored_keywords=tuple(scored_keywords),
+        total_possible_keyword_score=sum(weight for *_, weight in scored_keywords),
+        essential_keywords=essential_keywords,
+        essential_keywords_lower=tuple(kw.lower() for kw in essential_keywords),
+        essential_patterns=tuple(re.compile(r'\b' + re.escape(kw.lower()) + r'\b') for kw in essential_keywords),
+        keyword_matcher=KeywordMatcher(kw_lower for _, _, kw_lower, _ in scored_keywords),
+        section_names=section_names,
+        section_blocks=section_blocks,
+        section_weights=section_weights,
+        full_text_fallback=full_text_fallback,
+        candidate_role=_role_from_jd_text(parsed_jd_text),
+    )
+
+
 def calculate_weighted_keyword_score(
     resume_text_lower: str,
     resume_skills_lower_set: set, 
-    jd_categorized_keywords: Dict[str, List[str]]
+    jd_categorized_keywords: Dict[str, List[str]],
+    jd_context: Optional[JDMatchContext] = None
 ) -> Tuple[float, float, int, int]:
 
     logger.debug(f"--- Calculating Keyword Score ---")
@@ -228,71 +494,29 @@ def calculate_weighted_keyword_score(
     if not any(jd_categorized_keywords.values()):
         logger.debug("No JD keywords provided to calculate_weighted_keyword_score.")
         return 0.0, 0.0, 0, 0
+    if jd_context is None:
+        jd_context = build_jd_match_context("", jd_categorized_keywords, {})
 
-    # MODIFIED: Increased category weights
-    category_weights = {"essential": 6.0, "desirable": 2.5, "general": 1.2}
     total_weighted_match_score = 0.0
-    total_possible_category_weighted_score = 0.0
     essential_matched_count = 0
-    
-    valid_essential_keywords_from_jd_orig_case = [
-        kw_orig for kw_orig in jd_categorized_keywords.get("essential", [])
-        if is_meaningful_keyword(kw_orig)
-    ]
-    essential_total_valid_count = len(valid_essential_keywords_from_jd_orig_case)
+    essential_total_valid_count = len(jd_context.essential_keywords)
     logger.debug(f"Total *meaningful* essential JD keywords count: {essential_total_valid_count} (from {len(jd_categorized_keywords.get('essential', []))} raw)")
-    if essential_total_valid_count > 0:
-        logger.debug(f"Meaningful essential JD keywords (sample): {valid_essential_keywords_from_jd_orig_case[:20]}")
 
     matched_essential_keywords_details = []
-
-    for category, jd_keywords_in_cat_orig_case in jd_categorized_keywords.items():
-        cat_weight = category_weights.get(category, 0.0)
-        if not jd_keywords_in_cat_orig_case:
-            continue
-
-        for kw_orig_case in jd_keywords_in_cat_orig_case:
-            if not is_meaningful_keyword(kw_orig_case):
-                continue
-
-            kw_lower = kw_orig_case.lower()
-            # MODIFIED: Slightly increased keyword_base_weight for multi-word
-            keyword_base_weight = 1.0 + min((len(kw_lower.split()) - 1) * 0.25, 0.5) 
-            total_possible_category_weighted_score += (cat_weight * keyword_base_weight)
-
-            is_matched_for_scoring = False
-            match_type = "None"
-
-            if kw_lower in resume_skills_lower_set:
-                is_matched_for_scoring = True
-                match_type = "Direct Skill"
-            elif resume_text_lower: 
-                pattern_exact = r'\b' + re.escape(kw_lower) + r'\b'
-                if re.search(pattern_exact, resume_text_lower):
-                    is_matched_for_scoring = True
-                    match_type = "Text Exact"
-                
-                if not is_matched_for_scoring:
-                    if ' ' in kw_lower: 
-                        for r_skill in resume_skills_lower_set:
-                            if r_skill in kw_lower and len(r_skill) >= max(3, 0.6 * len(kw_lower)):
-                                is_matched_for_scoring = True; match_type = "Partial JD by RSkill"; break
-                            if kw_lower in r_skill and len(kw_lower) >= max(3, 0.6 * len(r_skill)):
-                                is_matched_for_scoring = True; match_type = "Partial RSkill by JD"; break
-                    elif not ' ' in kw_lower: 
-                         for r_skill in resume_skills_lower_set:
-                             if ' ' in r_skill and kw_lower in r_skill.split():
-                                 is_matched_for_scoring = True; match_type = "JD Word in RSkill Phrase"; break
-            
-            if is_matched_for_scoring:
-                total_weighted_match_score += (keyword_base_weight * cat_weight)
-                if category == "essential":
-                    essential_matched_count += 1
-                    matched_essential_keywords_details.append(f"{kw_orig_case} ({match_type})")
+    keyword_match_types = jd_context.keyword_matcher.match(resume_text_lower, resume_skills_lower_set)
+
+    for category, kw_orig_case, kw_lower, weighted_value in jd_context.scored_keywords:
+        match_type = keyword_match_types.get(kw_lower, "None")
+        if match_type != "None":
+            total_weighted_match_score += weighted_value
+            if category == "essential":
+                essential_matched_count += 1
+                matched_essential_keywords_details.append(f"{kw_orig_case} ({match_type})")
         
     if essential_total_valid_count > 0 and essential_matched_count > 0:
         logger.debug(f"Matched essential JD keywords & types: {matched_essential_keywords_details}")
 
+    total_possible_category_weighted_score = jd_context.total_possible_keyword_score
     keyword_score_percent = (total_weighted_match_score / total_possible_category_weighted_score) * 100 if total_possible_category_weighted_score > 0 else 0.0
     essential_match_ratio = (essential_matched_count / essential_total_valid_count) if essential_total_valid_count > 0 else 1.0 # Default to 1.0 if no essentials, to avoid harsh penalties
     
@@ -307,45 +531,17 @@ def generate_match_score_and_details(
     resume_text: str,
     resume_embedding: np.ndarray,
     resume_skills_list: List[str],
-    candidate_name: str
+    candidate_name: str,
+    jd_context: Optional[JDMatchContext] = None,
+    raw_semantic_score: Optional[float] = None
 ) -> Dict[str, Any]:
+    # raw_semantic_score: this resume's entry from calculate_semantic_scores, when the caller scored the whole batch at once
 
     score_details = {"semantic_score_raw": 0.0, "keyword_score_raw": 0.0, "final_jd_fit": 0, 
                      "essential_match_ratio": 0.0, "ess_matched_count": 0, "ess_total_count":0}
 
-    semantic_section_weights = {
-        "essential_requirements": 0.40,
-        "skills_semantic_document": 0.40, 
-        "responsibilities": 0.20,
-    }
-    weighted_semantic_scores_sum = 0.0
-    total_semantic_weight_applied = 0.0
-    raw_semantic_score = 0.0
-
-    if isinstance(resume_embedding, np.ndarray) and resume_embedding.size > 0 and jd_embeddings:
-        for section_name, weight in semantic_section_weights.items():
-            jd_section_emb = jd_embeddings.get(section_name)
-            if isinstance(jd_section_emb, np.ndarray) and jd_section_emb.size > 0:
-                sim = calculate_semantic_similarity(jd_section_emb, resume_embedding)
-                
-                if sim >= 0.60: adjusted_sim = sim + (sim - 0.60) * 0.7 
-                elif sim >= 0.45: adjusted_sim = sim + (sim - 0.45) * 0.4
-                elif sim < 0.30: adjusted_sim = sim * 0.9 
-                else: adjusted_sim = sim
-                
-                current_sim_score = max(0, min(1, adjusted_sim))
-                logger.debug(f"Semantic sim for section '{section_name}': raw={sim:.3f}, adjusted={current_sim_score:.3f}, weight={weight}")
-                weighted_semantic_scores_sum += (current_sim_score * weight)
-                total_semantic_weight_applied += weight
-        
-        if total_semantic_weight_applied > 0.01:
-            raw_semantic_score = (weighted_semantic_scores_sum / total_semantic_weight_applied) * 100
-        elif jd_embeddings.get("full_text") is not None: 
-            jd_full_emb = jd_embeddings.get("full_text")
-            if isinstance(jd_full_emb, np.ndarray) and jd_full_emb.size > 0:
-                 sim_full = calculate_semantic_similarity(jd_full_emb, resume_embedding)
-                 raw_semantic_score = max(0, min(1, sim_full)) * 100
-                 logger.debug(f"Semantic sim using full_text fallback: raw={sim_full:.3f}, score={raw_semantic_score:.1f}")
+    if raw_semantic_score is None:
+        raw_semantic_score = calculate_semantic_scores(jd_embeddings, [resume_embedding], jd_context)[0]
     
     # MODIFIED: Boost semantic score
     raw_semantic_score = min(100.0, raw_semantic_score * 1.05 + 7.0) # Boost by 5% and add 7 points
@@ -354,7 +550,8 @@ def generate_match_score_and_details(
     keyword_score_percent, essential_match_ratio, ess_matched, ess_total_valid = calculate_weighted_keyword_score(
         resume_text.lower() if resume_text else "",
         set(s.lower() for s in resume_skills_list if s), 
-        jd_categorized_keywords
+        jd_categorized_keywords,
+        jd_context
     )
     score_details["keyword_score_raw"] = keyword_score_percent
     score_details["essential_match_ratio"] = essential_match_ratio
@@ -406,21 +603,21 @@ def generate_match_score_and_details(
     logger.info(f"Scores for '{candidate_name}': SemRaw={raw_semantic_score:.1f}, KeyRaw={keyword_score_percent:.1f}, EssMatchRatio={essential_match_ratio:.2f} (EssMatched: {ess_matched}, EssTotalMeaningful: {ess_total_valid}), InitComb={score_details['initial_combined_debug']:.1f}, CalibratedScore={final_score_boosted:.1f} -> Fit:{score_details['final_jd_fit']}")
     return score_details
 
-def create_detailed_summary(resume_text: str, jd_categorized_keywords: Dict[str,List[str]], extracted_resume_skills: List[str], candidate_name: str, jd_fit_score: int):
+def create_detailed_summary(resume_text: str, jd_categorized_keywords: Dict[str,List[str]], extracted_resume_skills: List[str], candidate_name: str, jd_fit_score: int, jd_context: Optional[JDMatchContext] = None):
     summary_points = []
+    if jd_context is None:
+        jd_context = build_jd_match_context("", jd_categorized_keywords, {})
     
-    meaningful_jd_essential_kws = [
-        kw_orig for kw_orig in jd_categorized_keywords.get("essential", []) if is_meaningful_keyword(kw_orig)
-    ]
+    meaningful_jd_essential_kws = list(jd_context.essential_keywords)
 
     if meaningful_jd_essential_kws and extracted_resume_skills:
-        jd_kw_set_lower = set(kw.lower() for kw in meaningful_jd_essential_kws) 
         resume_skills_set_lower = set(skill.lower() for skill in extracted_resume_skills if skill)
+        multi_word_resume_skills = [r_skill for r_skill in resume_skills_set_lower if ' ' in r_skill]
         
-        matched_for_summary = [kw_orig for kw_orig in meaningful_jd_essential_kws
-                               if kw_orig.lower() in resume_skills_set_lower or 
-                                  any(kw_orig.lower() in r_skill for r_skill in resume_skills_set_lower if ' ' in r_skill and len(kw_orig.lower()) > 3) or
-                                  any(r_skill in kw_orig.lower() for r_skill in resume_skills_set_lower if ' ' in kw_orig.lower() and len(r_skill) > 3)
+        matched_for_summary = [kw_orig for kw_orig, kw_lower in zip(meaningful_jd_essential_kws, jd_context.essential_keywords_lower)
+                               if kw_lower in resume_skills_set_lower or 
+                                  (len(kw_lower) > 3 and any(kw_lower in r_skill for r_skill in multi_word_resume_skills)) or
+                                  (' ' in kw_lower and any(r_skill in kw_lower for r_skill in resume_skills_set_lower if len(r_skill) > 3))
                               ]
         unique_matched_for_summary = sorted(list(set(matched_for_summary)), key=len, reverse=True)[:3]
 
@@ -469,9 +666,12 @@ def generate_detailed_red_flags(
     resume_skills: List[str], 
     essential_match_ratio: float, 
     ess_matched: int, 
-    ess_total_valid: int 
+    ess_total_valid: int,
+    jd_context: Optional[JDMatchContext] = None
 ) -> List[str]:
     flags = []
+    if jd_context is None:
+        jd_context = build_jd_match_context("", jd_categorized_keywords, {})
     # MODIFIED: Adjusted red flag thresholds for scores
     if jd_fit_score < 30: flags.append(f"Critically Low JD Fit ({jd_fit_score}%). Major misalignment likely.")
     elif jd_fit_score < 50: flags.append(f"Low JD Fit ({jd_fit_score}%). Review essential requirements carefully.")
@@ -480,10 +680,7 @@ def generate_detailed_red_flags(
     if not resume_text or len(resume_text.split()) < MIN_RESUME_LENGTH_WORDS:
         flags.append(f"Brief Resume (~{len(resume_text.split()) if resume_text else 0} words). May lack detail.")
 
-    meaningful_jd_essential_kws_orig_case = [
-        kw_orig for kw_orig in jd_categorized_keywords.get("essential", [])
-        if is_meaningful_keyword(kw_orig)
-    ]
+    meaningful_jd_essential_kws_orig_case = jd_context.essential_keywords
 
     if ess_total_valid > 0:
         percentage_missing = (1 - essential_match_ratio) * 100 if essential_match_ratio is not None else 100.0
@@ -494,15 +691,12 @@ def generate_detailed_red_flags(
             resume_text_lower_for_flag = resume_text.lower() if resume_text else ""
             resume_skills_lower_set_for_flag = set(skill.lower() for skill in resume_skills if skill)
 
-            for kw_jd_orig in meaningful_jd_essential_kws_orig_case:
-                kw_jd_lower = kw_jd_orig.lower()
-                
+            for kw_jd_orig, kw_jd_lower, kw_jd_pattern in zip(meaningful_jd_essential_kws_orig_case, jd_context.essential_keywords_lower, jd_context.essential_patterns):
                 is_this_kw_matched = False
                 if kw_jd_lower in resume_skills_lower_set_for_flag: is_this_kw_matched = True
                 
                 if not is_this_kw_matched and resume_text_lower_for_flag:
-                    pattern = r'\b' + re.escape(kw_jd_lower) + r'\b'
-                    if re.search(pattern, resume_text_lower_for_flag): is_this_kw_matched = True
+                    if kw_jd_pattern.search(resume_text_lower_for_flag): is_this_kw_matched = True
                 
                 if not is_this_kw_matched and ' ' in kw_jd_lower: 
                     for r_skill in resume_skills_lower_set_for_flag:
@@ -539,18 +733,26 @@ def match_resumes_to_jd(
     jd_categorized_keywords: Dict[str, List[str]],
     jd_sections_text: Dict[str, str],
     jd_embeddings: Dict[str, Any],
-    parsed_resumes_data: List[Dict[str, Any]]
+    parsed_resumes_data: List[Dict[str, Any]],
+    jd_context: Optional[JDMatchContext] = None
 ) -> List[Dict[str, Any]]:
     results = []
-
-    if not sentence_model:
-        logger.error("SentenceTransformer model not loaded. Semantic matching will be severely impacted or disabled.")
+    if jd_context is None:
+        jd_context = build_jd_match_context(parsed_jd_text, jd_categorized_keywords, jd_embeddings) # Compiled once, shared by every resume
+
+    # Embeddings were computed at parse time; scoring needs them, not the model. Without any on either side
+    # (the sentence model was unavailable when they were parsed) there is nothing to compare semantically.
+    jd_has_embeddings = bool(jd_embeddings) and any(isinstance(emb, np.ndarray) and emb.size > 0 for emb in jd_embeddings.values())
+    resumes_have_embeddings = any(resume_data.get("embedding") is not None for resume_data in parsed_resumes_data)
+    if not jd_has_embeddings or not resumes_have_embeddings:
+        logger.error("No JD or resume embeddings (sentence model unavailable at parse time). Semantic matching disabled; scoring on keywords only.")
         for resume_data in parsed_resumes_data:
-            candidate_name = extract_name_from_text(resume_data.get("parsed_text", ""), resume_data["filename"])
+            candidate_name = extract_name_from_text(resume_data.get("parsed_text", ""), resume_data["filename"], resume_data.get("person_entities"))
             kw_score_percent, ess_match_ratio, ess_matched_fallback, ess_total_fallback = calculate_weighted_keyword_score(
                 resume_data.get("parsed_text","").lower(),
                 set(s.lower() for s in resume_data.get("skills",[])),
-                jd_categorized_keywords
+                jd_categorized_keywords,
+                jd_context
             )
             fit_score = int(kw_score_percent * 0.6 * (ess_match_ratio + 0.2)) # Slightly boosted fallback 
             fit_score = min(max(20, fit_score), 45) # Cap fallback scores
@@ -562,9 +764,12 @@ def match_resumes_to_jd(
                 "id": str(uuid.uuid4()), "name": candidate_name, "role": "Candidate",
                 "jdFit": fit_score, "interviewScore": interview_score_placeholder,
                 "profilePicture": f"https://avatar.iran.liara.run/username?username={re.sub(r'[^a-zA-Z0-9]', '', candidate_name) or 'Candidate'}",
-                "redFlags": ["CRITICAL: Semantic analysis disabled. Scores are highly approximate based on keywords only."],
+                "redFlags": ["CRITICAL: Semantic analysis disabled. Scores are highly approximate based on keywords only."] + (
+                    [f"Resume processing timed out: {resume_data.get('parse_error')}"] if resume_data.get("parse_status") == "timed_out" else []
+                ),
                 "experienceSummary": "Summary unavailable due to system limitations.",
                 "communication": random.randint(5,7), "original_filename": resume_data["filename"], # Slightly higher
+                "resume_key": resume_data.get("resume_key"),
                 "aiInterviewScore": None, "sentimentAnalysis": None,
             })
         results.sort(key=lambda x: x["jdFit"], reverse=True)
@@ -578,13 +783,31 @@ def match_resumes_to_jd(
     if not has_any_jd_embedding:
         logger.warning("No valid JD embeddings for key sections. Semantic matching quality will be very low.")
 
-    for resume_data in parsed_resumes_data:
+    # Semantic scores for the whole batch in one matrix product
+    raw_semantic_scores = calculate_semantic_scores(jd_embeddings, [resume_data.get("embedding") for resume_data in parsed_resumes_data], jd_context)
+
+    for resume_data, raw_semantic_score in zip(parsed_resumes_data, raw_semantic_scores):
         resume_text = resume_data.get("parsed_text", "")
         resume_embedding = resume_data.get("embedding")
         resume_filename = resume_data["filename"]
         resume_skills_list = resume_data.get("skills", []) 
 
-        candidate_name = extract_name_from_text(resume_text, resume_filename)
+        candidate_name = extract_name_from_text(resume_text, resume_filename, resume_data.get("person_entities"))
+
+        if resume_data.get("parse_status") == "timed_out":
+            logger.warning(f"Skipping {resume_filename} for '{candidate_name}': parsing timed out.")
+            results.append({
+                "id": str(uuid.uuid4()), "name": candidate_name, "role": "Candidate (Processing Timed Out)",
+                "jdFit": 10, "interviewScore": 1.0,
+                "profilePicture": f"https://avatar.iran.liara.run/username?username={re.sub(r'[^a-zA-Z0-9]', '', candidate_name) or 'Candidate'}",
+                "redFlags": [f"Resume processing timed out: {resume_data.get('parse_error') or 'the file took too long to parse'} Review the file manually."],
+                "experienceSummary": "Resume could not be analyzed within the processing time limit.",
+                "communication": random.randint(3,5), "original_filename": resume_filename,
+                "resume_key": resume_data.get("resume_key"),
+                "aiInterviewScore": None, "sentimentAnalysis": None,
+                "parseStatus": "timed_out",
+            })
+            continue
 
         if not resume_text or len(resume_text.split()) < MIN_RESUME_LENGTH_WORDS:
             logger.warning(f"Skipping {resume_filename} for '{candidate_name}': resume text too short or empty.")
@@ -595,13 +818,15 @@ def match_resumes_to_jd(
                 "redFlags": ["Resume content too short, empty, or unreadable."],
                 "experienceSummary": "Could not process resume for detailed analysis.",
                 "communication": random.randint(3,5), "original_filename": resume_filename,
+                "resume_key": resume_data.get("resume_key"),
                 "aiInterviewScore": None, "sentimentAnalysis": None,
             })
             continue
 
         score_and_details = generate_match_score_and_details(
             jd_sections_text, jd_embeddings, jd_categorized_keywords,
-            resume_text, resume_embedding, resume_skills_list, candidate_name
+            resume_text, resume_embedding, resume_skills_list, candidate_name,
+            jd_context, raw_semantic_score
         )
 
         jd_fit_score = score_and_details["final_jd_fit"]
@@ -621,16 +846,14 @@ def match_resumes_to_jd(
             jd_fit_score, resume_text, jd_categorized_keywords,
             resume_skills_list, 
             essential_match_ratio_val,
-            ess_matched_val, ess_total_valid_val
+            ess_matched_val, ess_total_valid_val,
+            jd_context
         )
-        experience_summary = create_detailed_summary(resume_text, jd_categorized_keywords, resume_skills_list, candidate_name, jd_fit_score)
+        experience_summary = create_detailed_summary(resume_text, jd_categorized_keywords, resume_skills_list, candidate_name, jd_fit_score, jd_context)
 
         communication_score_val = random.randint(7,10) if jd_fit_score >= 70 else random.randint(6,9) if jd_fit_score >=50 else random.randint(4,7) # Boosted
         profile_pic_name_sanitized = re.sub(r'[^a-zA-Z0-9_.-]', '', candidate_name) or "Candidate"
-        
-        candidate_role = "Software Engineer" 
-        if "product manager" in parsed_jd_text.lower(): candidate_role = "Product Manager"
-        elif "data scientist" in parsed_jd_text.lower(): candidate_role = "Data Scientist"
+        candidate_role = jd_context.candidate_role
 
         candidate_profile = {
             "id": str(uuid.uuid4()), "name": candidate_name, "role": candidate_role, 
@@ -640,6 +863,7 @@ def match_resumes_to_jd(
             "communication": communication_score_val,
             "aiInterviewScore": None, "sentimentAnalysis": None,
             "original_filename": resume_filename,
+            "resume_key": resume_data.get("resume_key"), # Opaque caller key (the resume's DB ID) carried through unchanged
             "_debug_scores": {
                 "semantic_raw": score_and_details.get("semantic_score_raw", 0.0),
                 "keyword_raw": score_and_details.get("keyword_score_raw", 0.0),
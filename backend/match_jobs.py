@@ -0,0 +1,207 @@
+# match_jobs.py
+import asyncio
+import os
+import time
+import uuid
+from dataclasses import dataclass, field, fields
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Tuple
+
+from database import db_manager, logger
+from jd_parser import parse_jd_content
+from match_pipeline import iter_match_session
+
+MATCH_JOB_WORKERS = int(os.getenv("MATCH_JOB_WORKERS", "2")) # Jobs running the pipeline at once
+MATCH_JOB_MAX_PENDING = int(os.getenv("MATCH_JOB_MAX_PENDING", "50")) # Queued + running jobs accepted before submits are refused
+MATCH_JOB_RETENTION_SECONDS = int(os.getenv("MATCH_JOB_RETENTION_SECONDS", "3600")) # Finished jobs are kept this long for polling
+# Job status and results are mirrored here so a poll served by any uvicorn worker finds the job;
+# the task itself (and its queue slot) stays on the worker that accepted the submit.
+MATCH_JOBS_COLLECTION = "match_jobs"
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+
+class MatchJobQueueFull(Exception):
+    pass
+
+
+@dataclass
+class MatchJob:
+    job_id: str
+    jd_filename: str
+    total_resumes: int
+    status: str = JOB_QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    session_id: Optional[str] = None
+    jd_db_id: Optional[str] = None
+    processed_resumes: int = 0
+    parsed_resumes: int = 0
+    scored_resumes: int = 0
+    results: List[Dict[str, Any]] = field(default_factory=list)
+    excel_url: Optional[str] = None
+    csv_url: Optional[str] = None
+    message: Optional[str] = None
+    error: Optional[str] = None
+    # Uploaded bytes are held only until the job runs
+    jd_content: Optional[bytes] = field(default=None, repr=False)
+    resume_documents: Optional[List[Tuple[str, bytes]]] = field(default=None, repr=False)
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (JOB_COMPLETED, JOB_FAILED)
+
+    def status_view(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "jd_filename": self.jd_filename,
+            "session_id": self.session_id,
+            "jd_db_id": self.jd_db_id,
+            "progress": {
+                "total": self.total_resumes,
+                "processed": self.processed_resumes,
+                "parsed": self.parsed_resumes,
+                "scored": self.scored_resumes,
+            },
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "message": self.message,
+            "error": self.error,
+        }
+
+    def to_document(self, include_results: bool = False) -> Dict[str, Any]:
+        document = {
+            job_field.name: getattr(self, job_field.name)
+            for job_field in fields(self)
+            if job_field.repr and job_field.name not in ("job_id", "results")
+        }
+        if include_results:
+            document["results"] = self.results
+        # Refreshed on every write; the TTL index on expires_at removes jobs nobody has touched for the retention period
+        document["expires_at"] = datetime.utcnow() + timedelta(seconds=MATCH_JOB_RETENTION_SECONDS)
+        return document
+
+    @classmethod
+    def from_document(cls, document: Dict[str, Any]) -> "MatchJob":
+        known_fields = {job_field.name for job_field in fields(cls) if job_field.repr}
+        return cls(job_id=document["_id"], **{name: value for name, value in document.items() if name in known_fields and name != "job_id"})
+
+
+_jobs: Dict[str, MatchJob] = {}
+_job_slots: Optional[asyncio.Semaphore] = None
+
+
+def _get_job_slots() -> asyncio.Semaphore:
+    global _job_slots
+    if _job_slots is None:
+        _job_slots = asyncio.Semaphore(max(1, MATCH_JOB_WORKERS))
+    return _job_slots
+
+
+def _prune_finished_jobs():
+    cutoff = time.time() - MATCH_JOB_RETENTION_SECONDS
+    for job_id in [job_id for job_id, job in _jobs.items() if job.is_finished and job.finished_at < cutoff]:
+        del _jobs[job_id]
+
+
+async def _save_match_job(job: MatchJob, include_results: bool = False):
+    """Mirrors the job to MATCH_JOBS_COLLECTION; failures are logged and the job keeps running (polls on this worker still answer)."""
+    jobs_collection = db_manager.get_collection(MATCH_JOBS_COLLECTION)
+    if jobs_collection is None:
+        return
+    try:
+        await jobs_collection.update_one({"_id": job.job_id}, {"$set": job.to_document(include_results)}, upsert=True)
+    except Exception as e:
+        logger.error(f"Could not save match job {job.job_id} ({job.status}); other workers will not see this update: {e}")
+
+
+async def _run_match_job(job: MatchJob):
+    await _save_match_job(job)
+    async with _get_job_slots():
+        job.status = JOB_RUNNING
+        job.started_at = time.time()
+        await _save_match_job(job)
+        jd_content, resume_documents = job.jd_content, job.resume_documents
+        job.jd_content = job.resume_documents = None
+        logger.info(f"Match job {job.job_id} started: JD {job.jd_filename}, {job.total_resumes} resumes")
+        try:
+            parsed_jd = await parse_jd_content(job.jd_filename, jd_content)
+            if not parsed_jd[0]:
+                raise ValueError(f"Failed to parse Job Description: {job.jd_filename}. It might be empty, corrupted, or an unsupported format.")
+
+            async for event in iter_match_session(job.jd_filename, parsed_jd, resume_documents):
+                if event["event"] == "session":
+                    job.session_id, job.jd_db_id = event["session_id"], event["jd_db_id"]
+                    await _save_match_job(job)
+                elif event["event"] == "progress":
+                    job.processed_resumes, job.parsed_resumes = event["processed_resumes"], event["parsed_resumes"]
+                    await _save_match_job(job)
+                elif event["event"] == "candidate":
+                    job.results.append(event["candidate"])
+                    job.scored_resumes += 1
+                elif event["event"] == "summary":
+                    job.excel_url, job.csv_url = event["excelUrl"], event["csvUrl"]
+                    job.message = event["message"]
+
+            job.results.sort(key=lambda x: x.get("jdFit", 0), reverse=True)
+            job.status = JOB_COMPLETED
+            logger.info(f"Match job {job.job_id} completed: {job.scored_resumes}/{job.total_resumes} candidates scored")
+        except asyncio.CancelledError:
+            job.status, job.error = JOB_FAILED, "Job cancelled (server shutting down)."
+            raise
+        except Exception as e:
+            logger.exception(f"Match job {job.job_id} failed: {e}")
+            job.status, job.error = JOB_FAILED, str(e)
+        finally:
+            job.finished_at = time.time()
+            await _save_match_job(job, include_results=job.status == JOB_COMPLETED)
+
+
+def submit_match_job(jd_filename: str, jd_content: bytes, resume_documents: List[Tuple[str, bytes]]) -> MatchJob:
+    _prune_finished_jobs()
+    if sum(1 for job in _jobs.values() if not job.is_finished) >= MATCH_JOB_MAX_PENDING:
+        raise MatchJobQueueFull(f"Too many match jobs pending (limit {MATCH_JOB_MAX_PENDING}). Try again later.")
+
+    job = MatchJob(
+        job_id=str(uuid.uuid4()),
+        jd_filename=jd_filename,
+        total_resumes=len(resume_documents),
+        jd_content=jd_content,
+        resume_documents=resume_documents,
+    )
+    _jobs[job.job_id] = job
+    job.task = asyncio.create_task(_run_match_job(job))
+    logger.info(f"Match job {job.job_id} queued: JD {jd_filename}, {len(resume_documents)} resumes")
+    return job
+
+
+async def get_match_job(job_id: str) -> Optional[MatchJob]:
+    """This worker's own jobs are answered from memory; jobs accepted by another worker are read from MATCH_JOBS_COLLECTION."""
+    job = _jobs.get(job_id)
+    if job is not None:
+        return job
+    jobs_collection = db_manager.get_collection(MATCH_JOBS_COLLECTION)
+    if jobs_collection is None:
+        return None
+    try:
+        document = await jobs_collection.find_one({"_id": job_id})
+    except Exception as e:
+        logger.error(f"Could not look up match job {job_id}: {e}")
+        return None
+    return MatchJob.from_document(document) if document is not None else None
+
+
+async def shutdown_match_jobs():
+    pending_tasks = [job.task for job in _jobs.values() if job.task is not None and not job.task.done()]
+    for task in pending_tasks:
+        task.cancel()
+    if pending_tasks:
+        await asyncio.gather(*pending_tasks, return_exceptions=True)
+        logger.info(f"Cancelled {len(pending_tasks)} unfinished match jobs.")
@@ -0,0 +1,209 @@
+# match_pipeline.py
+import asyncio
+import os
+import uuid
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
+
+from bson import ObjectId
+
+from database import db_manager, bulk_insert_documents, JobDescriptionDB, ResumeDB, MatchResultDB, logger
+from match_engine import match_resumes_to_jd, build_jd_match_context
+from parse_cache import ParsedJD
+from excel_exporter import report_url
+from analytics import record_match_results
+from resume_parser import parse_resume_documents
+
+MATCH_STREAM_CHUNK_SIZE = int(os.getenv("MATCH_STREAM_CHUNK_SIZE", "4"))
+
+
+class MatchCollectionsUnavailable(Exception):
+    pass
+
+
+def _match_collections():
+    jds_collection = db_manager.get_collection("job_descriptions")
+    resumes_collection = db_manager.get_collection("resumes")
+    matches_collection = db_manager.get_collection("match_results")
+    if jds_collection is None or resumes_collection is None or matches_collection is None:
+        logger.error("One or more MongoDB collections are not available (returned None).")
+        raise MatchCollectionsUnavailable("Database collections unavailable.")
+    return jds_collection, resumes_collection, matches_collection
+
+
+def flatten_jd_keywords(jd_categorized_keywords: Dict[str, List[str]]) -> List[str]:
+    flat_jd_keywords = []
+    if jd_categorized_keywords:
+        flat_jd_keywords.extend(jd_categorized_keywords.get("essential", []))
+        flat_jd_keywords.extend(jd_categorized_keywords.get("desirable", []))
+        flat_jd_keywords.extend(jd_categorized_keywords.get("general", []))
+        flat_jd_keywords = sorted(list(set(flat_jd_keywords)), key=len, reverse=True)
+    return flat_jd_keywords
+
+
+async def save_job_description(jd_filename: str, parsed_jd_text: str, jd_categorized_keywords: Dict[str, List[str]]) -> ObjectId:
+    jds_collection, _, _ = _match_collections()
+    jd_doc_data = JobDescriptionDB(
+        filename=jd_filename,
+        parsed_text=parsed_jd_text,
+        keywords=flatten_jd_keywords(jd_categorized_keywords),
+    )
+    result_jd = await jds_collection.insert_one(jd_doc_data.model_dump(by_alias=True, exclude_none=True))
+    logger.info(f"Saved JD '{jd_filename}' to DB with ID: {result_jd.inserted_id}")
+    return result_jd.inserted_id
+
+
+async def save_resumes(parsed_resumes_data: List[Dict[str, Any]], jd_db_id: ObjectId, session_id: str) -> List[Dict[str, Any]]:
+    """
+    Bulk-stores parsed resumes and returns them in the shape match_resumes_to_jd expects.
+    Each gets its DB ID up front; it is also the resume_key the engine carries into its results.
+    """
+    _, resumes_collection, _ = _match_collections()
+    resume_docs = []
+    resumes_for_matching_engine = []
+    for resume_item_data in parsed_resumes_data:
+        resume_db_id = ObjectId()
+        resume_doc_data = ResumeDB(
+            _id=resume_db_id,
+            jd_id=jd_db_id,
+            session_id=session_id,
+            filename=resume_item_data["filename"],
+            parsed_text=resume_item_data["parsed_text"],
+            content_hash=resume_item_data.get("content_hash"),
+            parse_status=resume_item_data.get("parse_status"),
+        )
+        resume_docs.append(resume_doc_data.model_dump(by_alias=True, exclude_none=True))
+        resumes_for_matching_engine.append({
+            "filename": resume_item_data["filename"],
+            "parsed_text": resume_item_data["parsed_text"],
+            "embedding": resume_item_data.get("embedding"),
+            "skills": resume_item_data.get("skills", []),
+            "person_entities": resume_item_data.get("person_entities"),
+            "parse_status": resume_item_data.get("parse_status"),
+            "parse_error": resume_item_data.get("parse_error"),
+            "db_id": resume_db_id,
+            "resume_key": resume_db_id,
+        })
+
+    failed_ids = await bulk_insert_documents(resumes_collection, resume_docs)
+    for r_data in resumes_for_matching_engine:
+        if r_data["db_id"] in failed_ids:
+            # Still scored, but its match result will not be saved (it would point at a missing resume)
+            r_data["db_id"] = r_data["resume_key"] = None
+    logger.info(f"Saved {len(resume_docs) - len(failed_ids)}/{len(resume_docs)} resumes to DB for session {session_id}")
+    return resumes_for_matching_engine
+
+
+async def save_match_results(
+    match_results_from_engine: List[Dict[str, Any]],
+    jd_db_id: ObjectId,
+    session_id: str
+) -> List[Dict[str, Any]]:
+    """Bulk-stores engine results and returns the response items (with match/resume/JD IDs) in engine order."""
+    _, _, matches_collection = _match_collections()
+    match_docs = []
+    final_match_results_for_response = []
+    for match_item_from_engine in match_results_from_engine:
+        response_item = {**match_item_from_engine}
+        resume_db_id_for_match = response_item.pop("resume_key", None)
+        final_match_results_for_response.append(response_item)
+        if resume_db_id_for_match is None:
+            logger.warning(f"No DB ID for matched resume: {match_item_from_engine.get('original_filename')}. Skipping DB save for this specific match result, but including in response.")
+            continue
+
+        match_db_id = ObjectId()
+        match_doc_data = MatchResultDB(
+            _id=match_db_id,
+            resume_id=resume_db_id_for_match,
+            jd_id=jd_db_id,
+            session_id=session_id,
+            candidate_name=match_item_from_engine.get("name", "Unknown Candidate"),
+            jd_fit_score=match_item_from_engine.get("jdFit", 0),
+            interview_score=match_item_from_engine.get("interviewScore", 0.0),
+            red_flags=match_item_from_engine.get("redFlags", []),
+            experience_summary=match_item_from_engine.get("experienceSummary", "N/A"),
+            original_filename=match_item_from_engine.get("original_filename"),
+        )
+        match_docs.append(match_doc_data.model_dump(by_alias=True, exclude_none=True))
+
+        response_item["match_db_id"] = str(match_db_id)
+        response_item["resume_db_id"] = str(resume_db_id_for_match)
+        response_item["jd_db_id"] = str(jd_db_id)
+        # Add candidate email and phone to response if extracted by match_engine
+        response_item["email"] = match_item_from_engine.get("email")
+        response_item["phone"] = match_item_from_engine.get("phone")
+
+    failed_ids = {str(failed_id) for failed_id in await bulk_insert_documents(matches_collection, match_docs)}
+    await record_match_results([doc for doc in match_docs if str(doc["_id"]) not in failed_ids])
+    for response_item in final_match_results_for_response:
+        if response_item.get("match_db_id") in failed_ids:
+            response_item.pop("match_db_id") # Not persisted; keep the candidate in the response
+    logger.info(f"Saved {len(match_docs) - len(failed_ids)}/{len(match_docs)} match results to DB for session {session_id}")
+    return final_match_results_for_response
+
+
+def rank_match_results(match_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    ranked = sorted(match_results, key=lambda x: x.get("jdFit", 0), reverse=True)
+    return [
+        {"rank": position, "match_db_id": item.get("match_db_id"), "id": item.get("id"), "name": item.get("name"), "jdFit": item.get("jdFit", 0)}
+        for position, item in enumerate(ranked, start=1)
+    ]
+
+
+async def iter_match_session(
+    jd_filename: str,
+    parsed_jd: ParsedJD,
+    resume_documents: List[Tuple[str, bytes]],
+    chunk_size: int = MATCH_STREAM_CHUNK_SIZE
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Runs a match session chunk by chunk: parse, score, persist, then yield one "candidate" event
+    per resume, plus a "progress" event as each chunk is parsed. The next chunk is parsed while
+    the current one is scored and saved.
+    Ends with a "summary" event carrying the full ranking and the report links (built on first download).
+    """
+    parsed_jd_text, jd_categorized_keywords, jd_sections_text, jd_embeddings = parsed_jd
+    session_id = str(uuid.uuid4())
+    jd_db_id = await save_job_description(jd_filename, parsed_jd_text, jd_categorized_keywords)
+    jd_context = build_jd_match_context(parsed_jd_text, jd_categorized_keywords, jd_embeddings)
+    yield {"event": "session", "session_id": session_id, "jd_db_id": str(jd_db_id), "total_resumes": len(resume_documents)}
+
+    chunk_size = max(1, chunk_size)
+    chunks = [resume_documents[i:i + chunk_size] for i in range(0, len(resume_documents), chunk_size)]
+    all_results: List[Dict[str, Any]] = []
+    processed_count = parsed_count = 0
+    next_parse = asyncio.ensure_future(parse_resume_documents(chunks[0])) if chunks else None
+    try:
+        for chunk_index in range(len(chunks)):
+            parsed_chunk = await next_parse
+            next_parse = asyncio.ensure_future(parse_resume_documents(chunks[chunk_index + 1])) if chunk_index + 1 < len(chunks) else None
+            processed_count += len(chunks[chunk_index])
+            parsed_count += len(parsed_chunk)
+            yield {"event": "progress", "processed_resumes": processed_count, "parsed_resumes": parsed_count, "total_resumes": len(resume_documents)}
+            if not parsed_chunk:
+                continue
+
+            resumes_for_matching_engine = await save_resumes(parsed_chunk, jd_db_id, session_id)
+            # Scoring is synchronous NumPy/regex work; run it on a thread so other requests keep being served
+            match_results_from_engine = await asyncio.get_running_loop().run_in_executor(
+                None, match_resumes_to_jd,
+                parsed_jd_text, jd_categorized_keywords, jd_sections_text, jd_embeddings,
+                resumes_for_matching_engine, jd_context
+            )
+            chunk_results = await save_match_results(match_results_from_engine, jd_db_id, session_id)
+            for response_item in chunk_results:
+                all_results.append(response_item)
+                yield {"event": "candidate", "candidate": response_item}
+    finally:
+        if next_parse is not None and not next_parse.done():
+            next_parse.cancel() # Client went away mid-stream
+
+    all_results.sort(key=lambda x: x.get("jdFit", 0), reverse=True)
+    yield {
+        "event": "summary",
+        "session_id": session_id,
+        "jd_db_id": str(jd_db_id),
+        "ranking": rank_match_results(all_results),
+        "excelUrl": report_url(session_id, "xlsx") if all_results else None,
+        "csvUrl": report_url(session_id, "csv") if all_results else None,
+        "message": f"Successfully processed and matched {len(all_results)} candidates." if all_results else "No resume content could be processed.",
+    }
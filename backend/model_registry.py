@@ -0,0 +1,180 @@
+# model_registry.py
+import asyncio
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Any, Callable, List, Optional
+
+from database import logger, EMBEDDING_MODEL_NAME, EMBEDDING_BACKEND
+
+SPACY_MODEL_NAME = os.getenv("SPACY_MODEL_NAME", "en_core_web_sm")
+SPACY_AUTO_DOWNLOAD = os.getenv("SPACY_AUTO_DOWNLOAD", "true").lower() in ("1", "true", "yes")
+MODEL_WARMUP_ON_STARTUP = os.getenv("MODEL_WARMUP_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+
+MODEL_NOT_LOADED = "not_loaded"
+MODEL_LOADING = "loading"
+MODEL_LOADED = "loaded" # Loaded but not yet warmed up
+MODEL_READY = "ready"
+MODEL_DEGRADED = "degraded" # Loaded and usable, but warm-up failed; counts as ready so /ready does not fail forever
+MODEL_FAILED = "failed"
+_USABLE_STATES = (MODEL_LOADED, MODEL_READY, MODEL_DEGRADED)
+
+_WARMUP_TEXT = "Senior Python engineer with FastAPI, MongoDB and machine learning experience. Jane Doe, Bangalore."
+
+
+@dataclass
+class ModelEntry:
+    name: str
+    loader: Callable[[], Any]
+    warmup: Optional[Callable[[Any], None]] = None
+    state: str = MODEL_NOT_LOADED
+    instance: Any = None
+    error: Optional[str] = None
+    load_seconds: Optional[float] = None
+    warmup_seconds: Optional[float] = None
+    loaded_at: Optional[float] = None
+    loaded_on_request_path: bool = False # True when the first caller paid the cold load instead of startup
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def status_view(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "load_seconds": round(self.load_seconds, 3) if self.load_seconds is not None else None,
+            "warmup_seconds": round(self.warmup_seconds, 3) if self.warmup_seconds is not None else None,
+            "loaded_at": self.loaded_at,
+            "loaded_on_request_path": self.loaded_on_request_path,
+            "error": self.error,
+        }
+
+
+def _on_event_loop_thread() -> bool:
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+class ModelRegistry:
+    """
+    Loads models on first use (or from warm_up_all at startup) exactly once per process.
+    A failed load is not retried; callers get None and fall back the way they did when a model was missing.
+    A failed warm-up leaves the model usable and marks it MODEL_DEGRADED.
+    """
+    def __init__(self):
+        self._entries: Dict[str, ModelEntry] = {}
+
+    def register(self, name: str, loader: Callable[[], Any], warmup: Optional[Callable[[Any], None]] = None):
+        self._entries[name] = ModelEntry(name=name, loader=loader, warmup=warmup)
+
+    def _load(self, entry: ModelEntry, warm_up: bool, on_request_path: bool):
+        with entry.lock:
+            if entry.state == MODEL_NOT_LOADED:
+                entry.state = MODEL_LOADING
+                started = time.perf_counter()
+                try:
+                    entry.instance = entry.loader()
+                    entry.load_seconds = time.perf_counter() - started
+                    entry.loaded_at = time.time()
+                    entry.loaded_on_request_path = on_request_path
+                    entry.state = MODEL_LOADED
+                    logger.info(f"Model '{entry.name}' loaded in {entry.load_seconds:.2f}s" + (" (cold load on request path)" if on_request_path else ""))
+                except Exception as e:
+                    entry.state, entry.error = MODEL_FAILED, str(e)
+                    logger.error(f"Failed to load model '{entry.name}': {e}", exc_info=True)
+                    return
+            if warm_up and entry.state == MODEL_LOADED:
+                started = time.perf_counter()
+                try:
+                    if entry.warmup is not None:
+                        entry.warmup(entry.instance)
+                    entry.warmup_seconds = time.perf_counter() - started
+                    entry.state = MODEL_READY
+                    logger.info(f"Model '{entry.name}' warmed up in {entry.warmup_seconds:.2f}s")
+                except Exception as e:
+                    entry.state, entry.error = MODEL_DEGRADED, f"Warm-up failed: {e}" # Still usable, just not hot
+                    logger.warning(f"Warm-up of model '{entry.name}' failed; serving it cold: {e}")
+
+    def get(self, name: str) -> Any:
+        entry = self._entries[name]
+        if entry.state in _USABLE_STATES:
+            return entry.instance
+        if entry.state == MODEL_FAILED:
+            return None
+        if _on_event_loop_thread():
+            # Never wait on entry.lock (or pay a cold load) on the event loop: the whole server would stall.
+            # The load goes to a thread; this caller falls back as if the model were missing. Request handlers
+            # check loading_models() first and answer 503 instead, so results are never scored degraded.
+            self._load_in_background(entry)
+            logger.warning(f"Model '{entry.name}' requested on the event loop while {entry.state}; not waiting for it.")
+            return None
+        self._load(entry, warm_up=False, on_request_path=True)
+        return entry.instance
+
+    def _load_in_background(self, entry: ModelEntry):
+        if entry.state == MODEL_NOT_LOADED:
+            asyncio.get_running_loop().run_in_executor(None, self._load, entry, False, True)
+
+    def loading_models(self, names: Optional[List[str]] = None) -> List[str]:
+        """
+        Models that are neither usable nor failed, i.e. still to be loaded. Must be called on the event loop;
+        any that nobody is loading yet start loading in the background.
+        """
+        loading = []
+        for name in names or self._entries:
+            entry = self._entries[name]
+            if entry.state in (MODEL_NOT_LOADED, MODEL_LOADING):
+                self._load_in_background(entry)
+                loading.append(name)
+        return loading
+
+    def load_all(self, warm_up: bool = True, names: Optional[List[str]] = None):
+        for name in names or self._entries:
+            self._load(self._entries[name], warm_up=warm_up, on_request_path=False)
+
+    async def warm_up_all(self):
+        # Loading and warm-up are blocking (torch/spaCy); keep the event loop free so /ready can answer meanwhile
+        started = time.perf_counter()
+        await asyncio.get_running_loop().run_in_executor(None, self.load_all, True)
+        logger.info(f"Model warm-up finished in {time.perf_counter() - started:.2f}s: {self.status()}")
+
+    def is_ready(self, names: Optional[List[str]] = None) -> bool:
+        return all(self._entries[name].state in (MODEL_READY, MODEL_DEGRADED) for name in (names or self._entries))
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        return {name: entry.status_view() for name, entry in self._entries.items()}
+
+
+def _load_spacy_model():
+    import spacy
+    try:
+        return spacy.load(SPACY_MODEL_NAME)
+    except OSError:
+        if not SPACY_AUTO_DOWNLOAD:
+            raise
+        logger.warning(f"Spacy '{SPACY_MODEL_NAME}' model not found. Attempting to download...")
+        spacy.cli.download(SPACY_MODEL_NAME)
+        return spacy.load(SPACY_MODEL_NAME)
+
+def _warm_up_spacy_model(nlp_model):
+    list(nlp_model.pipe([_WARMUP_TEXT, _WARMUP_TEXT.lower()]))
+
+def _load_sentence_model():
+    from embedding_backend import load_embedding_model
+    return load_embedding_model(EMBEDDING_BACKEND, EMBEDDING_MODEL_NAME)
+
+def _warm_up_sentence_model(sentence_model):
+    # First encode pays torch's lazy kernel/thread-pool initialization; do it here instead of in a request
+    sentence_model.encode([_WARMUP_TEXT, _WARMUP_TEXT[:40]], batch_size=2, show_progress_bar=False)
+
+
+model_registry = ModelRegistry()
+model_registry.register("spacy", _load_spacy_model, _warm_up_spacy_model)
+model_registry.register("sentence_model", _load_sentence_model, _warm_up_sentence_model)
+
+def get_nlp():
+    return model_registry.get("spacy")
+
+def get_sentence_model():
+    return model_registry.get("sentence_model")
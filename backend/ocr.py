@@ -0,0 +1,148 @@
+# ocr.py
+import asyncio
+import hashlib
+import io
+import multiprocessing
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Tuple
+
+from database import logger
+from text_extraction import ContentBuffer, file_format_for
+
+# OCR fallback for image-only PDFs. Runs in its own small process pool so scanned resumes never take the
+# CPU that text-based resumes in the same batch need; pages are capped, timed out and cached by image hash.
+OCR_ENABLED = os.getenv("OCR_ENABLED", "true").lower() in ("1", "true", "yes")
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "2"))
+OCR_MAX_PAGES = int(os.getenv("OCR_MAX_PAGES", "4")) # Resumes rarely need more; bounds the cost of one scanned file
+OCR_PAGE_TIMEOUT_SECONDS = float(os.getenv("OCR_PAGE_TIMEOUT_SECONDS", "20"))
+OCR_MIN_TEXT_CHARS = int(os.getenv("OCR_MIN_TEXT_CHARS", "100")) # PDFs with less extracted text than this are OCR candidates
+OCR_LANGUAGE = os.getenv("OCR_LANGUAGE", "eng")
+OCR_CACHE_SIZE = int(os.getenv("OCR_CACHE_SIZE", "512")) # Pages
+
+_ocr_process_pool: Optional[ProcessPoolExecutor] = None
+_ocr_slots: Optional[asyncio.Semaphore] = None
+_ocr_page_cache: "OrderedDict[str, str]" = OrderedDict()
+
+
+def needs_ocr(filename: str, extracted_text: str) -> bool:
+    return OCR_ENABLED and file_format_for(filename) == "pdf" and len((extracted_text or "").strip()) < OCR_MIN_TEXT_CHARS
+
+
+def _pdf_page_images(content: ContentBuffer, max_pages: int) -> List[List[bytes]]:
+    """Encoded image bytes embedded in each of the first max_pages pages (scanned PDFs hold one image per page)."""
+    import PyPDF2
+    reader = PyPDF2.PdfReader(io.BytesIO(content), strict=False)
+    if reader.is_encrypted:
+        reader.decrypt('')
+    pages = []
+    for page in reader.pages[:max_pages]:
+        page_images = []
+        try:
+            for image in page.images:
+                page_images.append(image.data)
+        except Exception as e:
+            logger.warning(f"Could not read images of a PDF page for OCR: {e}")
+        pages.append(page_images)
+    return pages
+
+
+def _ocr_page_worker(page_images: List[bytes], language: str, timeout_seconds: float) -> str:
+    # Runs in an OCR pool process. pytesseract kills tesseract when the timeout expires (RuntimeError).
+    from PIL import Image
+    import pytesseract
+    texts = []
+    for image_bytes in page_images:
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            image = image.convert("L") # Grayscale: faster and usually more accurate for documents
+            texts.append(pytesseract.image_to_string(image, lang=language, timeout=timeout_seconds))
+    return "\n".join(text for text in texts if text.strip())
+
+
+def get_ocr_process_pool() -> ProcessPoolExecutor:
+    global _ocr_process_pool
+    if _ocr_process_pool is None:
+        _ocr_process_pool = ProcessPoolExecutor(max_workers=max(1, OCR_WORKERS), mp_context=multiprocessing.get_context("spawn"))
+        logger.info(f"Started OCR process pool with {OCR_WORKERS} workers.")
+    return _ocr_process_pool
+
+def shutdown_ocr_pool():
+    global _ocr_process_pool
+    if _ocr_process_pool is not None:
+        _ocr_process_pool.shutdown(wait=False, cancel_futures=True)
+        _ocr_process_pool = None
+        logger.info("OCR process pool shut down.")
+
+def _get_ocr_slots() -> asyncio.Semaphore:
+    # Pages in flight never exceed the pool size, so a big scanned batch cannot queue unbounded work
+    global _ocr_slots
+    if _ocr_slots is None:
+        _ocr_slots = asyncio.Semaphore(max(1, OCR_WORKERS))
+    return _ocr_slots
+
+
+def _page_hash(page_images: List[bytes]) -> str:
+    digest = hashlib.sha256(OCR_LANGUAGE.encode())
+    for image_bytes in page_images:
+        digest.update(hashlib.sha256(image_bytes).digest())
+    return digest.hexdigest()
+
+def _remember_page_text(page_key: str, text: str):
+    _ocr_page_cache[page_key] = text
+    _ocr_page_cache.move_to_end(page_key)
+    while len(_ocr_page_cache) > max(0, OCR_CACHE_SIZE):
+        _ocr_page_cache.popitem(last=False)
+
+
+async def _ocr_page(page_images: List[bytes], filename: str, page_number: int) -> str:
+    page_key = _page_hash(page_images)
+    cached_text = _ocr_page_cache.get(page_key)
+    if cached_text is not None:
+        _ocr_page_cache.move_to_end(page_key)
+        return cached_text
+
+    loop = asyncio.get_running_loop()
+    async with _get_ocr_slots():
+        try:
+            text = await asyncio.wait_for(
+                loop.run_in_executor(get_ocr_process_pool(), _ocr_page_worker, page_images, OCR_LANGUAGE, OCR_PAGE_TIMEOUT_SECONDS),
+                timeout=OCR_PAGE_TIMEOUT_SECONDS * max(1, len(page_images)) + 5 # Backstop if tesseract's own timeout fails
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"OCR timed out on page {page_number} of {filename}")
+            return ""
+        except BrokenProcessPool as e:
+            logger.error(f"OCR process pool broke on page {page_number} of {filename} ({e}); restarting it.")
+            shutdown_ocr_pool()
+            return ""
+        except Exception as e:
+            logger.warning(f"OCR failed on page {page_number} of {filename}: {e}")
+            return ""
+    _remember_page_text(page_key, text)
+    return text
+
+
+async def ocr_pdf(filename: str, content: ContentBuffer) -> str:
+    """OCR text of the first OCR_MAX_PAGES pages of an image-only PDF ("" if OCR is disabled or finds nothing)."""
+    if not OCR_ENABLED:
+        return ""
+    try:
+        pages = await asyncio.get_running_loop().run_in_executor(None, _pdf_page_images, content, OCR_MAX_PAGES)
+    except Exception as e:
+        logger.warning(f"Could not read page images of {filename} for OCR: {e}")
+        return ""
+    pages_with_images = [(page_number, images) for page_number, images in enumerate(pages, start=1) if images]
+    if not pages_with_images:
+        logger.info(f"No page images found for OCR in {filename}")
+        return ""
+
+    page_texts = await asyncio.gather(*[_ocr_page(images, filename, page_number) for page_number, images in pages_with_images])
+    text = "\n".join(page_text for page_text in page_texts if page_text.strip())
+    logger.info(f"OCR extracted {len(text)} chars from {len(pages_with_images)} page(s) of {filename}")
+    return text
+
+
+async def ocr_pdfs(documents: List[Tuple[str, ContentBuffer]]) -> List[str]:
+    return await asyncio.gather(*[ocr_pdf(filename, content) for filename, content in documents])
@@ -0,0 +1,173 @@
+# parse_cache.py
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+import numpy as np
+from pydantic import ValidationError
+
+from database import db_manager, ParsedResumeCacheDB, ParsedJDCacheDB, logger, EMBEDDING_CACHE_MODEL_KEY
+
+# Bump whenever extraction, cleaning, skill/keyword extraction or embedding changes so stale entries stop matching.
+RESUME_PARSER_VERSION = "resume-parser-2"
+JD_PARSER_VERSION = "jd-parser-2"
+
+PARSED_RESUME_CACHE_COLLECTION = "parsed_resume_cache"
+PARSED_JD_CACHE_COLLECTION = "parsed_jd_cache"
+PARSE_CACHE_ENABLED = os.getenv("PARSE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+JD_CACHE_MEMORY_SIZE = int(os.getenv("JD_CACHE_MEMORY_SIZE", "64"))
+
+ParsedJD = Tuple[str, Dict[str, List[str]], Dict[str, str], Dict[str, Any]]
+
+_jd_memory_cache: "OrderedDict[str, ParsedJD]" = OrderedDict()
+
+
+def content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+def resume_cache_key(resume_content_hash: str) -> str:
+    return f"{resume_content_hash}:{RESUME_PARSER_VERSION}:{EMBEDDING_CACHE_MODEL_KEY}"
+
+def jd_cache_key(jd_content_hash: str) -> str:
+    return f"{jd_content_hash}:{JD_PARSER_VERSION}:{EMBEDDING_CACHE_MODEL_KEY}"
+
+
+async def get_cached_parsed_resumes(content_hashes: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Looks up parsed resumes by content hash in one query.
+    Returns {content_hash: {"parsed_text", "skills", "person_entities", "embedding"}} for hits only.
+    """
+    cache_collection = db_manager.get_collection(PARSED_RESUME_CACHE_COLLECTION) if PARSE_CACHE_ENABLED else None
+    unique_hashes = set(content_hashes)
+    if cache_collection is None or not unique_hashes:
+        return {}
+
+    hits: Dict[str, Dict[str, Any]] = {}
+    try:
+        cursor = cache_collection.find({"_id": {"$in": [resume_cache_key(h) for h in unique_hashes]}})
+        async for cached_doc in cursor:
+            try:
+                cached = ParsedResumeCacheDB(**cached_doc)
+            except ValidationError as e:
+                logger.warning(f"Ignoring malformed parsed resume cache entry {cached_doc.get('_id')}: {e}")
+                continue
+            hits[cached.content_hash] = {
+                "parsed_text": cached.parsed_text,
+                "raw_content": cached.parsed_text,
+                "skills": cached.skills,
+                "person_entities": [tuple(ent) for ent in cached.person_entities] if cached.person_entities is not None else None,
+                "embedding": np.asarray(cached.embedding, dtype=np.float32) if cached.embedding else None,
+            }
+    except Exception as e:
+        logger.error(f"Parsed resume cache lookup failed; parsing everything: {e}", exc_info=True)
+        return {}
+
+    logger.info(f"Parsed resume cache: {len(hits)}/{len(unique_hashes)} hits")
+    return hits
+
+
+async def store_parsed_resumes(parsed_resumes: List[Tuple[str, Dict[str, Any]]]):
+    """Writes (content_hash, parsed resume) pairs to the cache; existing entries are left as they are."""
+    cache_collection = db_manager.get_collection(PARSED_RESUME_CACHE_COLLECTION) if PARSE_CACHE_ENABLED else None
+    if cache_collection is None or not parsed_resumes:
+        return
+
+    cache_docs = {}
+    for resume_content_hash, parsed_info in parsed_resumes:
+        embedding = parsed_info.get("embedding")
+        cache_entry = ParsedResumeCacheDB(
+            _id=resume_cache_key(resume_content_hash),
+            content_hash=resume_content_hash,
+            parser_version=RESUME_PARSER_VERSION,
+            embedding_model=EMBEDDING_CACHE_MODEL_KEY,
+            parsed_text=parsed_info.get("parsed_text", ""),
+            skills=parsed_info.get("skills", []),
+            person_entities=parsed_info.get("person_entities"),
+            embedding=np.asarray(embedding, dtype=np.float32).tolist() if embedding is not None else None,
+        )
+        cache_docs[cache_entry.id] = cache_entry.model_dump(by_alias=True, exclude_none=True)
+
+    try:
+        # ordered=False: a duplicate key (concurrent request cached it first) must not stop the rest
+        await cache_collection.insert_many(list(cache_docs.values()), ordered=False)
+        logger.info(f"Cached {len(cache_docs)} parsed resumes.")
+    except Exception as e:
+        if "E11000" in str(e):
+            logger.debug(f"Some parsed resumes were already cached: {e}")
+        else:
+            logger.error(f"Failed to write parsed resume cache: {e}", exc_info=True)
+
+
+def _copy_parsed_jd(parsed_jd: ParsedJD) -> ParsedJD:
+    # Callers get their own containers so nothing they do can alter the cached entry
+    parsed_text, categorized_keywords, sections, embeddings = parsed_jd
+    return parsed_text, {k: list(v) for k, v in categorized_keywords.items()}, dict(sections), dict(embeddings)
+
+def _remember_parsed_jd(cache_key: str, parsed_jd: ParsedJD):
+    _jd_memory_cache[cache_key] = parsed_jd
+    _jd_memory_cache.move_to_end(cache_key)
+    while len(_jd_memory_cache) > max(0, JD_CACHE_MEMORY_SIZE):
+        _jd_memory_cache.popitem(last=False)
+
+
+async def get_cached_parsed_jd(jd_content_hash: str) -> Optional[ParsedJD]:
+    """Returns the cached (parsed_text, categorized_keywords, sections, embeddings) for a JD, memory tier first."""
+    if not PARSE_CACHE_ENABLED:
+        return None
+    cache_key = jd_cache_key(jd_content_hash)
+
+    parsed_jd = _jd_memory_cache.get(cache_key)
+    if parsed_jd is not None:
+        _jd_memory_cache.move_to_end(cache_key)
+        logger.info(f"Parsed JD cache hit (memory) for {jd_content_hash[:12]}")
+        return _copy_parsed_jd(parsed_jd)
+
+    cache_collection = db_manager.get_collection(PARSED_JD_CACHE_COLLECTION)
+    if cache_collection is None:
+        return None
+    try:
+        cached_doc = await cache_collection.find_one({"_id": cache_key})
+        if not cached_doc:
+            return None
+        cached = ParsedJDCacheDB(**cached_doc)
+    except Exception as e:
+        logger.error(f"Parsed JD cache lookup failed for {jd_content_hash[:12]}: {e}", exc_info=True)
+        return None
+
+    parsed_jd = (
+        cached.parsed_text,
+        cached.categorized_keywords,
+        cached.sections,
+        {key: np.asarray(emb, dtype=np.float32) for key, emb in cached.embeddings.items() if emb},
+    )
+    _remember_parsed_jd(cache_key, parsed_jd)
+    logger.info(f"Parsed JD cache hit (mongo) for {jd_content_hash[:12]}")
+    return _copy_parsed_jd(parsed_jd)
+
+
+async def store_parsed_jd(jd_content_hash: str, parsed_jd: ParsedJD):
+    if not PARSE_CACHE_ENABLED or not parsed_jd[0]:
+        return
+    cache_key = jd_cache_key(jd_content_hash)
+    _remember_parsed_jd(cache_key, _copy_parsed_jd(parsed_jd))
+
+    cache_collection = db_manager.get_collection(PARSED_JD_CACHE_COLLECTION)
+    if cache_collection is None:
+        return
+    parsed_text, categorized_keywords, sections, embeddings = parsed_jd
+    cache_entry = ParsedJDCacheDB(
+        _id=cache_key,
+        content_hash=jd_content_hash,
+        parser_version=JD_PARSER_VERSION,
+        embedding_model=EMBEDDING_CACHE_MODEL_KEY,
+        parsed_text=parsed_text,
+        categorized_keywords=categorized_keywords,
+        sections=sections,
+        embeddings={key: np.asarray(emb, dtype=np.float32).tolist() for key, emb in embeddings.items() if emb is not None},
+    )
+    try:
+        await cache_collection.replace_one({"_id": cache_key}, cache_entry.model_dump(by_alias=True), upsert=True)
+        logger.info(f"Cached parsed JD {jd_content_hash[:12]}.")
+    except Exception as e:
+        logger.error(f"Failed to write parsed JD cache for {jd_content_hash[:12]}: {e}", exc_info=True)
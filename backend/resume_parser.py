@@ -1,236 +1,170 @@
 # resume_parser.py
-import tempfile
 import os
-import shutil
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from fastapi import UploadFile
 import asyncio
 import re
-
-# --- New Imports for Text Extraction ---
-import docx # For .docx files (from python-docx)
-import PyPDF2 # For .pdf files
-# --- End New Imports ---
+from concurrent.futures.process import BrokenProcessPool
 
 from database import logger
+from parse_cache import content_hash, get_cached_parsed_resumes, store_parsed_resumes
+from model_registry import get_nlp
+from document_parsing import (
+    PARSE_OK, PARSE_TIMED_OUT, RESUME_PARSE_MODE, RESUME_PARSE_WORKERS,
+    clean_extracted_text, unparsed_document, parse_document_content, parse_documents,
+    get_parse_process_pool, shutdown_parse_pool
+)
+from ocr import needs_ocr, ocr_pdfs
 # Ensure correct imports from jd_parser for shared resources
-from jd_parser import clean_extracted_text, sentence_model, nlp, COMMON_TECH_DOMAINS, JD_RESUME_STOPWORDS # Assuming _extract_text_from_file will be here or imported
-
-# --- DUPLICATED HELPER FUNCTION (Ideally move to a shared utils.py) ---
-async def _extract_text_from_file(filepath: str, original_filename: str) -> str:
-    """Helper function to extract text based on file extension."""
-    _, file_extension = os.path.splitext(original_filename)
-    file_extension = file_extension.lower()
-    raw_text = ""
-
-    try:
-        logger.info(f"Attempting to extract text from: {original_filename} (extension: {file_extension})")
-        if file_extension == ".pdf":
-            with open(filepath, 'rb') as f:
-                reader = PyPDF2.PdfReader(f, strict=False) # MODIFIED: Added strict=False
-                if reader.is_encrypted:
-                    try:
-                        reader.decrypt('') # Try with empty password
-                        logger.info(f"Decrypted PDF: {original_filename}")
-                    except Exception as decrypt_err:
-                        logger.warning(f"Could not decrypt PDF {original_filename}: {decrypt_err}. Text extraction may fail or be incomplete.")
-
-                text_parts = []
-                for i, page in enumerate(reader.pages):
-                    try:
-                        page_text = page.extract_text()
-                        if page_text:
-                            text_parts.append(page_text)
-                    except Exception as page_err:
-                        logger.warning(f"Error extracting text from page {i+1} of {original_filename}: {page_err}")
-                raw_text = "\n".join(text_parts)
-                if not raw_text.strip() and len(reader.pages) > 0:
-                    logger.warning(f"PyPDF2 extracted no text from {original_filename}, though it has pages. PDF might be image-based or have complex encoding.")
-
-        elif file_extension == ".docx":
-            doc_obj = docx.Document(filepath) # Renamed to doc_obj to avoid conflict with spacy's doc
-            raw_text = "\n".join([para.text for para in doc_obj.paragraphs])
-        elif file_extension == ".txt":
-            with open(filepath, 'r', encoding='utf-8', errors='replace') as f:
-                raw_text = f.read()
-        elif file_extension == ".doc":
-            logger.warning(f".doc format ({original_filename}) has limited support. Trying basic text decode. For best results, convert to .docx or .pdf.")
-            try:
-                with open(filepath, 'rb') as f_doc:
-                    content_bytes = f_doc.read()
-                raw_text = content_bytes.decode('utf-8', errors='replace')
-            except UnicodeDecodeError:
-                with open(filepath, 'rb') as f_doc_latin:
-                    content_bytes = f_doc_latin.read()
-                raw_text = content_bytes.decode('latin-1', errors='replace')
-        else:
-            logger.warning(f"Unsupported file extension '{file_extension}' for {original_filename}. Attempting to read as plain text.")
-            try:
-                with open(filepath, 'rb') as f_unknown:
-                    content_bytes = f_unknown.read()
-                raw_text = content_bytes.decode('utf-8', errors='replace')
-            except UnicodeDecodeError:
-                 with open(filepath, 'rb') as f_unknown_latin:
-                    content_bytes = f_unknown_latin.read()
-                 raw_text = content_bytes.decode('latin-1', errors='replace')
+from jd_parser import COMMON_TECH_DOMAINS, JD_RESUME_STOPWORDS, embed_texts, EMBEDDING_BATCH_SIZE
+
+# --- Batched NLP stage ---
+# One nlp.pipe pass per batch feeds both consumers of the resume doc: skill extraction needs
+# noun chunks, POS, lemmas and entities; name extraction (match_engine) only needs PERSON entities.
+RESUME_NLP_BATCH_SIZE = int(os.getenv("RESUME_NLP_BATCH_SIZE", "16"))
+RESUME_NLP_COMPONENTS = {
+    "skills": {"tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer", "ner"},
+    "names": {"tok2vec", "ner"},
+}
+NAME_ENTITY_MAX_START_CHAR = 600 # PERSON entities further into the resume are not name candidates
+RESUME_NLP_MAX_CHARS = int(os.getenv("RESUME_NLP_MAX_CHARS", "100000")) # spaCy input cap; real resumes are far shorter
+
+def _resume_nlp_disabled_components(nlp) -> List[str]:
+    needed = set().union(*RESUME_NLP_COMPONENTS.values())
+    return [name for name in nlp.pipe_names if name not in needed] if nlp else []
+
+def _skills_from_text_regex(parsed_text: str) -> List[str]:
+    return list(set(ts.lower() for ts in COMMON_TECH_DOMAINS if re.search(r'\b' + re.escape(ts.lower()) + r'\b', parsed_text.lower())))
+
+def _person_entities_from_doc(doc) -> List[Tuple[str, int]]:
+    return [(ent.text, ent.start_char) for ent in doc.ents if ent.label_ == "PERSON" and ent.start_char < NAME_ENTITY_MAX_START_CHAR]
+
+def _skills_from_doc(doc, parsed_text: str) -> List[str]:
+    potential_skills = set()
+
+    for chunk in doc.noun_chunks:
+        chunk_text = chunk.text.lower().strip()
+        if 2 < len(chunk_text) < 50 and not chunk_text.isnumeric() and \
+           not all(t.is_stop or t.is_punct or t.is_space for t in chunk):
+            cleaned_chunk = re.sub(r"^(?:proficiency|experience|knowledge|expertise)\s+(?:in|of|with|on|using)\s+", "", chunk_text)
+            cleaned_chunk = re.sub(r"\s+(?:tools|technologies|platforms|systems|frameworks|libraries)$", "", cleaned_chunk)
+            if cleaned_chunk and len(cleaned_chunk) > 2 and cleaned_chunk not in JD_RESUME_STOPWORDS:
+                potential_skills.add(cleaned_chunk)
+
+    for ent in doc.ents:
+        if ent.label_ in ["ORG", "PRODUCT", "WORK_OF_ART", "LANGUAGE", "NORP", "TECH", "SKILL"] and len(ent.text.strip()) > 2: # Add more relevant ENT labels if needed
+            ent_text_lower = ent.text.lower().strip()
+            if ent_text_lower not in JD_RESUME_STOPWORDS and not ent_text_lower.isnumeric():
+                potential_skills.add(ent_text_lower)
+
+    for token in doc:
+        if token.pos_ in ["NOUN", "PROPN"] and not token.is_stop and not token.is_punct and len(token.lemma_) > 1: # Allow 2 char skills like AI, ML
+            lemma = token.lemma_.lower()
+            if lemma not in JD_RESUME_STOPWORDS and not lemma.isnumeric():
+                if lemma in COMMON_TECH_DOMAINS or (not token.is_stop and len(lemma) > 2): # Keep 3+ for general nouns
+                    potential_skills.add(lemma)
+                if token.i > 0 and doc[token.i-1].pos_ == "ADJ" and not doc[token.i-1].is_stop:
+                    compound_skill = f"{doc[token.i-1].lemma_.lower()} {lemma}"
+                    if compound_skill not in JD_RESUME_STOPWORDS and len(compound_skill.split()) > 1: # Ensure it's actually a compound
+                        potential_skills.add(compound_skill)
+
+    text_lower_for_regex = parsed_text.lower()
+    for tech_skill in COMMON_TECH_DOMAINS:
+        if re.search(r'\b' + re.escape(tech_skill.lower()) + r'\b', text_lower_for_regex):
+            potential_skills.add(tech_skill.lower())
+
+    # Filter out too-short skills unless they are known acronyms/tech
+    known_short_skills = {'c', 'r', 'ai', 'ml', 'dl', 'cv', 'nlp', 'ui', 'ux', 'qa', 'bi', 'db', 'os', 'k8s', 'api'}
+    potential_skills = {
+        skill for skill in potential_skills 
+        if (len(skill) > 2 or skill in known_short_skills) and not skill.isnumeric()
+    }
 
-        logger.info(f"Successfully extracted raw text (length: {len(raw_text)}) from {original_filename}")
-        return raw_text.strip()
 
-    except Exception as e:
-        logger.error(f"Error during text extraction for {original_filename} (path: {filepath}): {e}", exc_info=True)
+    sorted_skills = sorted(list(s for s in potential_skills if s), key=len, reverse=True)
+
+    final_resume_skills = []
+    temp_skill_set_for_dedupe = set()
+    for skill_cand in sorted_skills:
+        if skill_cand not in JD_RESUME_STOPWORDS and skill_cand not in temp_skill_set_for_dedupe:
+            final_resume_skills.append(skill_cand)
+            temp_skill_set_for_dedupe.add(skill_cand)
+
+    return final_resume_skills[:300] # Increased limit slightly
+
+def annotate_resumes(parsed_texts: List[str], batch_size: int = RESUME_NLP_BATCH_SIZE) -> List[Dict[str, Any]]:
+    """
+    Runs every resume text through spaCy once (nlp.pipe) and returns, per text,
+    the extracted skills and the PERSON entities used for name extraction.
+    Texts whose skills came from the regex fallback are marked "degraded" so they are not cached.
+    """
+    annotations: List[Dict[str, Any]] = [{"skills": [], "person_entities": None} for _ in parsed_texts]
+    indices_to_annotate = [i for i, text in enumerate(parsed_texts) if text]
+    if not indices_to_annotate:
+        return annotations
+
+    nlp = get_nlp()
+    if not nlp: # Basic fallback if no NLP but text exists
+        for i in indices_to_annotate:
+            annotations[i].update(skills=_skills_from_text_regex(parsed_texts[i]), degraded=True)
+        return annotations
+
+    max_len = min(nlp.max_length, RESUME_NLP_MAX_CHARS)
+    docs = nlp.pipe(
+        (parsed_texts[i][:max_len] for i in indices_to_annotate), # Use potentially long text for NLP
+        batch_size=max(1, batch_size),
+        disable=_resume_nlp_disabled_components(nlp)
+    )
+    for i, doc in zip(indices_to_annotate, docs):
         try:
-            logger.info(f"Fallback extraction attempt for {original_filename}")
-            with open(filepath, 'rb') as f_fallback:
-                content_bytes = f_fallback.read()
-            return content_bytes.decode('utf-8', errors='replace').strip()
-        except Exception as e_fallback:
-            logger.error(f"Final fallback text extraction also failed for {original_filename}: {e_fallback}")
-            return ""
-# --- END DUPLICATED HELPER FUNCTION ---
-
-
-async def parse_resume_file(resume_file: UploadFile) -> Dict[str, Any]:
-    parsed_info: Dict[str, Any] = {
-        "filename": resume_file.filename, "parsed_text": "",
-        "raw_content": "", "embedding": None, "skills": []
-    }
-    temp_file_path = None
+            annotations[i]["skills"] = _skills_from_doc(doc, parsed_texts[i])
+            annotations[i]["person_entities"] = _person_entities_from_doc(doc)
+        except Exception as e:
+            logger.error(f"Error extracting skills from annotated resume #{i}: {e}", exc_info=True)
+            annotations[i].update(skills=_skills_from_text_regex(parsed_texts[i]), degraded=True)
+    return annotations
+# --- End Batched NLP stage ---
 
-    try:
-        suffix = os.path.splitext(resume_file.filename)[1] if resume_file.filename else '.tmp'
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            shutil.copyfileobj(resume_file.file, tmp)
-            temp_file_path = tmp.name
 
-        # --- MODIFIED: Use new text extraction helper ---
-        raw_parsed_text = await _extract_text_from_file(temp_file_path, resume_file.filename)
-        # --- END MODIFICATION ---
+def _unparsed_resume(filename: str, parse_status: str = PARSE_OK, parse_error: Optional[str] = None) -> Dict[str, Any]:
+    return {**unparsed_document(filename, parse_status, parse_error), "embedding": None, "skills": [], "person_entities": None}
 
-        parsed_text = clean_extracted_text(raw_parsed_text)
-        if not parsed_text.strip():
-            logger.warning(f"No text could be extracted or cleaned from resume: {resume_file.filename}")
-            # Return early if no text
-            return parsed_info # Will have empty parsed_text, skills, etc.
 
-        parsed_info["parsed_text"] = parsed_text
-        parsed_info["raw_content"] = raw_parsed_text # Store the version before heavy cleaning
+def parse_resume_content(filename: str, content: bytes, embed: bool = True, annotate: bool = True) -> Dict[str, Any]:
+    """
+    Synchronous parsing core: text extraction and cleaning (document_parsing), then, optionally, NLP annotation and embedding.
+    parse_resumes runs annotation and embedding as batched stages over all resumes instead.
+    """
+    parsed_info = {**_unparsed_resume(filename), **parse_document_content(filename, content)}
+    parsed_text = parsed_info["parsed_text"]
+    if not parsed_text:
+        return parsed_info # Will have empty parsed_text, skills, etc.
 
-        # Log the quality of text extracted by new logic
-        logger.debug(f"Resume '{resume_file.filename}' - Cleaned Parsed Text (first 300 chars): {parsed_text[:300]}")
+    try:
+        if embed:
+            parsed_info["embedding"] = embed_texts([parsed_text])[0]
+            logger.debug(f"Embedded resume '{filename}' (text length: {len(parsed_text)})")
+
+        if annotate and parsed_info.get("degraded"):
+            parsed_info["skills"] = _skills_from_text_regex(parsed_text) # Text from the plain-text fallback gets regex skills only
+        elif annotate:
+            parsed_info.update(annotate_resumes([parsed_text])[0])
+            logger.info(f"--- Resume Skills for '{filename}' ({len(parsed_info['skills'])}) ---")
+            logger.info(f"Skills (first 50): {parsed_info['skills'][:50]}")
+        logger.info(f"Parsed resume: {filename}, Text Length: {len(parsed_text)}, Skills Extracted: {len(parsed_info['skills'])}")
+    except Exception as e:
+        logger.error(f"Error annotating resume {filename}: {e}", exc_info=True)
+        parsed_info["degraded"] = True # A later attempt may annotate it properly
+        if annotate:
+            parsed_info["skills"] = _skills_from_text_regex(parsed_text)
 
-        if parsed_text and sentence_model:
-            try:
-                # Limit length of text for embedding to avoid excessive processing time/memory
-                max_embed_len_resume = 10000 
-                text_to_embed_resume = parsed_text[:max_embed_len_resume]
-                parsed_info["embedding"] = sentence_model.encode(text_to_embed_resume)
-                logger.debug(f"Embedded resume '{resume_file.filename}' (text length: {len(text_to_embed_resume)})")
-            except Exception as emb_ex:
-                 logger.error(f"Error embedding resume {resume_file.filename}: {emb_ex}")
-
-        if parsed_text and nlp:
-            max_len = nlp.max_length
-            doc_text_for_nlp = parsed_text[:max_len] # Use potentially long text for NLP
-            doc = nlp(doc_text_for_nlp) # spaCy doc object
-
-            potential_skills = set()
-
-            for chunk in doc.noun_chunks:
-                chunk_text = chunk.text.lower().strip()
-                if 2 < len(chunk_text) < 50 and not chunk_text.isnumeric() and \
-                   not all(t.is_stop or t.is_punct or t.is_space for t in chunk):
-                    cleaned_chunk = re.sub(r"^(?:proficiency|experience|knowledge|expertise)\s+(?:in|of|with|on|using)\s+", "", chunk_text)
-                    cleaned_chunk = re.sub(r"\s+(?:tools|technologies|platforms|systems|frameworks|libraries)$", "", cleaned_chunk)
-                    if cleaned_chunk and len(cleaned_chunk) > 2 and cleaned_chunk not in JD_RESUME_STOPWORDS:
-                        potential_skills.add(cleaned_chunk)
-
-            for ent in doc.ents:
-                if ent.label_ in ["ORG", "PRODUCT", "WORK_OF_ART", "LANGUAGE", "NORP", "TECH", "SKILL"] and len(ent.text.strip()) > 2: # Add more relevant ENT labels if needed
-                    ent_text_lower = ent.text.lower().strip()
-                    if ent_text_lower not in JD_RESUME_STOPWORDS and not ent_text_lower.isnumeric():
-                        potential_skills.add(ent_text_lower)
-
-            for token in doc:
-                if token.pos_ in ["NOUN", "PROPN"] and not token.is_stop and not token.is_punct and len(token.lemma_) > 1: # Allow 2 char skills like AI, ML
-                    lemma = token.lemma_.lower()
-                    if lemma not in JD_RESUME_STOPWORDS and not lemma.isnumeric():
-                        if lemma in COMMON_TECH_DOMAINS or (not token.is_stop and len(lemma) > 2): # Keep 3+ for general nouns
-                            potential_skills.add(lemma)
-                        if token.i > 0 and doc[token.i-1].pos_ == "ADJ" and not doc[token.i-1].is_stop:
-                            compound_skill = f"{doc[token.i-1].lemma_.lower()} {lemma}"
-                            if compound_skill not in JD_RESUME_STOPWORDS and len(compound_skill.split()) > 1: # Ensure it's actually a compound
-                                potential_skills.add(compound_skill)
-
-            text_lower_for_regex = parsed_text.lower()
-            for tech_skill in COMMON_TECH_DOMAINS:
-                if re.search(r'\b' + re.escape(tech_skill.lower()) + r'\b', text_lower_for_regex):
-                    potential_skills.add(tech_skill.lower())
-
-            # Filter out too-short skills unless they are known acronyms/tech
-            known_short_skills = {'c', 'r', 'ai', 'ml', 'dl', 'cv', 'nlp', 'ui', 'ux', 'qa', 'bi', 'db', 'os', 'k8s', 'api'}
-            potential_skills = {
-                skill for skill in potential_skills 
-                if (len(skill) > 2 or skill in known_short_skills) and not skill.isnumeric()
-            }
-
-
-            sorted_skills = sorted(list(s for s in potential_skills if s), key=len, reverse=True)
-
-            final_resume_skills = []
-            temp_skill_set_for_dedupe = set()
-            for skill_cand in sorted_skills:
-                if skill_cand not in JD_RESUME_STOPWORDS and skill_cand not in temp_skill_set_for_dedupe:
-                    final_resume_skills.append(skill_cand)
-                    temp_skill_set_for_dedupe.add(skill_cand)
-
-            parsed_info["skills"] = final_resume_skills[:300] # Increased limit slightly
-
-        elif parsed_text: # Basic fallback if no NLP but text exists
-            found_skills = set(ts.lower() for ts in COMMON_TECH_DOMAINS if re.search(r'\b' + re.escape(ts.lower()) + r'\b', parsed_text.lower()))
-            parsed_info["skills"] = list(found_skills)
-
-        logger.info(f"--- Resume Skills for '{resume_file.filename}' ({len(parsed_info['skills'])}) ---")
-        logger.info(f"Skills (first 50): {parsed_info['skills'][:50]}")
-        logger.info(f"Parsed resume: {resume_file.filename}, Text Length: {len(parsed_text)}, Skills Extracted: {len(parsed_info['skills'])}")
+    return parsed_info
 
 
-    except Exception as e:
-        logger.error(f"Error parsing resume {resume_file.filename}: {e}", exc_info=True)
-        # Fallback logic if the main try block fails (e.g. before text extraction)
-        try:
-            if resume_file and hasattr(resume_file, 'read') and hasattr(resume_file, 'seek'):
-                await resume_file.seek(0) # Needs await if UploadFile.seek becomes async
-                content_bytes = await resume_file.read() # Needs await if UploadFile.read becomes async
-                raw_parsed_text_fallback = content_bytes.decode('utf-8', errors='replace').strip()
-                parsed_text_fallback = clean_extracted_text(raw_parsed_text_fallback)
-
-                parsed_info["parsed_text"] = parsed_text_fallback
-                parsed_info["raw_content"] = raw_parsed_text_fallback
-
-                if parsed_text_fallback and sentence_model:
-                    try: parsed_info["embedding"] = sentence_model.encode(parsed_text_fallback[:10000])
-                    except: pass # nosec
-                if parsed_text_fallback:
-                    found_skills = set(ts.lower() for ts in COMMON_TECH_DOMAINS if re.search(r'\b' + re.escape(ts.lower()) + r'\b', parsed_text_fallback.lower()))
-                    parsed_info["skills"] = list(found_skills)
-                logger.info(f"Fallback: Read resume {resume_file.filename} as plain text. Skills: {len(parsed_info['skills'])}")
-            else:
-                logger.error(f"Resume file object was not valid for fallback parsing: {resume_file.filename}")
-
-        except Exception as e_fallback:
-            logger.error(f"Plain text fallback also failed for resume {resume_file.filename}: {e_fallback}")
-            # Ensure keys exist even on total failure
-            parsed_info["parsed_text"] = ""
-            parsed_info["raw_content"] = ""
-            parsed_info["embedding"] = None
-            parsed_info["skills"] = []
+async def _read_upload(resume_file: UploadFile) -> bytes:
+    try:
+        return await resume_file.read()
     finally:
-        if temp_file_path and os.path.exists(temp_file_path):
-            try:
-                os.remove(temp_file_path)
-            except Exception as e_remove:
-                 logger.warning(f"Could not remove temp file {temp_file_path}: {e_remove}")
         if resume_file and hasattr(resume_file, 'file') and resume_file.file and not resume_file.file.closed:
             try:
                 # FastAPI UploadFile.close() is synchronous.
@@ -239,10 +173,138 @@ async def parse_resume_file(resume_file: UploadFile) -> Dict[str, Any]:
             except Exception as e_close:
                 logger.warning(f"Error closing UploadFile {resume_file.filename}: {e_close}")
 
-    return parsed_info
 
-async def parse_resumes(resume_files: List[UploadFile]) -> List[Dict[str, Any]]:
-    tasks = [parse_resume_file(resume) for resume in resume_files]
-    parsed_resumes_data = await asyncio.gather(*tasks)
+async def parse_resume_file(resume_file: UploadFile, embed: bool = True) -> Dict[str, Any]:
+    # embed=False skips the per-resume encode; parse_resumes embeds all resumes in one batched stage instead
+    try:
+        content = await _read_upload(resume_file)
+    except Exception as e:
+        logger.error(f"Could not read uploaded resume {resume_file.filename}: {e}", exc_info=True)
+        return _unparsed_resume(resume_file.filename)
+    return parse_resume_content(resume_file.filename, content, embed=embed)
+
+
+# --- Parsing stages in worker processes (document_parsing runs extraction; annotation shares its parse pool) ---
+def _split_into_chunks(items: List[Any], chunk_count: int) -> List[List[Any]]:
+    chunk_size = max(1, -(-len(items) // max(1, chunk_count)))
+    return [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+
+async def _parse_contents(documents: List[Tuple[str, bytes]]) -> List[Dict[str, Any]]:
+    return [{**_unparsed_resume(parsed_info["filename"]), **parsed_info} for parsed_info in await parse_documents(documents)]
+
+async def _annotate_texts(parsed_texts: List[str]) -> List[Dict[str, Any]]:
+    loop = asyncio.get_running_loop()
+    if RESUME_PARSE_MODE == "process" and len(parsed_texts) > 1:
+        # Each worker streams its share of the batch through nlp.pipe
+        try:
+            pool = get_parse_process_pool()
+            chunked_annotations = await asyncio.gather(*[
+                loop.run_in_executor(pool, annotate_resumes, chunk)
+                for chunk in _split_into_chunks(parsed_texts, RESUME_PARSE_WORKERS)
+            ])
+            return [annotation for chunk in chunked_annotations for annotation in chunk]
+        except BrokenProcessPool as e:
+            logger.error(f"Resume parse process pool broke during NLP ({e}); restarting it and annotating this batch inline.")
+            shutdown_parse_pool()
+    # On a thread, like the embedding stage, so the event loop keeps serving while spaCy works through the batch
+    return await loop.run_in_executor(None, annotate_resumes, parsed_texts)
+# --- End worker-process parsing stages ---
+
+
+def _meaningful_resumes(parsed: List[Tuple[str, Dict[str, Any]]]) -> List[Tuple[str, Dict[str, Any]]]:
     # Filter out resumes that couldn't be parsed meaningfully (e.g., too short or no text extracted)
-    return [data for data in parsed_resumes_data if data.get("parsed_text", "").strip() and len(data.get("parsed_text", "").split()) > 25] # Reduced min words slightly
\ No newline at end of file
+    return [
+        (resume_hash, data) for resume_hash, data in parsed
+        if data.get("parsed_text", "").strip() and len(data.get("parsed_text", "").split()) > 25 # Reduced min words slightly
+    ]
+
+async def _annotate_and_embed(parsed: List[Tuple[str, Dict[str, Any]]], embedding_batch_size: int) -> List[Tuple[str, Dict[str, Any]]]:
+    if not parsed:
+        return []
+    # Batched NLP stage: one spaCy pass per resume, shared by skill and name extraction
+    resume_annotations = await _annotate_texts([data["parsed_text"] for _, data in parsed])
+    for (_, data), annotation in zip(parsed, resume_annotations):
+        data.update(annotation)
+        logger.info(f"Parsed resume: {data['filename']}, Skills Extracted: {len(data['skills'])}, Skills (first 50): {data['skills'][:50]}")
+
+    # Batched embedding stage: encode every kept resume together instead of one forward pass per file.
+    # Runs on a thread so the event loop keeps serving while torch works (it releases the GIL).
+    resume_embeddings = await asyncio.get_running_loop().run_in_executor(
+        None, embed_texts, [data["parsed_text"] for _, data in parsed], embedding_batch_size
+    )
+    for (_, data), embedding in zip(parsed, resume_embeddings):
+        data["embedding"] = embedding
+    logger.info(f"Embedded {sum(1 for e in resume_embeddings if e is not None)}/{len(parsed)} resumes in batches of {embedding_batch_size}")
+    return list(parsed)
+
+
+async def parse_resume_documents(documents: List[Tuple[str, bytes]], embedding_batch_size: int = EMBEDDING_BATCH_SIZE) -> List[Dict[str, Any]]:
+    """
+    Parses (filename, content) pairs. Resumes whose bytes were parsed before are served from the
+    content-addressed cache; identical files within the batch are parsed once.
+    """
+    hashes = [content_hash(content) for _, content in documents]
+    cached_resumes = await get_cached_parsed_resumes(hashes)
+
+    documents_to_parse: Dict[str, Tuple[str, bytes]] = {}
+    for (filename, content), resume_hash in zip(documents, hashes):
+        if resume_hash not in cached_resumes and resume_hash not in documents_to_parse:
+            documents_to_parse[resume_hash] = (filename, content)
+
+    parsed_by_hash: Dict[str, Dict[str, Any]] = {}
+    if documents_to_parse:
+        freshly_parsed = list(zip(documents_to_parse.keys(), await _parse_contents(list(documents_to_parse.values()))))
+
+        # Image-only PDFs go to the bounded OCR pool in the background; text-based resumes are annotated
+        # and embedded meanwhile, so a batch is never held up by its scanned files beyond their own OCR time.
+        timed_out_resumes = [(resume_hash, data) for resume_hash, data in freshly_parsed if data.get("parse_status") == PARSE_TIMED_OUT]
+        ocr_candidates = [
+            (resume_hash, data) for resume_hash, data in freshly_parsed
+            if data.get("parse_status") != PARSE_TIMED_OUT and needs_ocr(data["filename"], data.get("parsed_text", ""))
+        ]
+        ocr_task = asyncio.create_task(ocr_pdfs([documents_to_parse[resume_hash] for resume_hash, _ in ocr_candidates])) if ocr_candidates else None
+        if ocr_candidates:
+            logger.info(f"Running OCR on {len(ocr_candidates)} image-only resume(s) in the background")
+
+        try:
+            ocr_hashes = {resume_hash for resume_hash, _ in ocr_candidates}
+            text_resumes = [(resume_hash, data) for resume_hash, data in freshly_parsed if resume_hash not in ocr_hashes]
+            kept_resumes = await _annotate_and_embed(_meaningful_resumes(text_resumes), embedding_batch_size)
+            if ocr_task is not None:
+                for (_, data), ocr_text in zip(ocr_candidates, await ocr_task):
+                    ocr_parsed_text = clean_extracted_text(ocr_text)
+                    if len(ocr_parsed_text) > len(data.get("parsed_text", "")):
+                        data["raw_content"] = ocr_text.strip()
+                        data["parsed_text"] = ocr_parsed_text
+                kept_resumes += await _annotate_and_embed(_meaningful_resumes(ocr_candidates), embedding_batch_size)
+        finally:
+            if ocr_task is not None and not ocr_task.done():
+                ocr_task.cancel()
+
+        # Timed-out resumes are reported (with a red flag) but never cached: a later upload gets a fresh attempt.
+        # Neither are degraded parses (no embedding, regex-only skills, plain-text fallback): the cache key does
+        # not change when the models come back, so caching them would pin the degraded result.
+        parsed_by_hash = dict(kept_resumes + timed_out_resumes)
+        cacheable_resumes = [(resume_hash, data) for resume_hash, data in kept_resumes if data.get("embedding") is not None and not data.get("degraded")]
+        if len(cacheable_resumes) < len(kept_resumes):
+            logger.warning(f"Not caching {len(kept_resumes) - len(cacheable_resumes)} resume(s) parsed without the NLP or embedding models.")
+        await store_parsed_resumes(cacheable_resumes)
+
+    parsed_resumes_data = []
+    for (filename, _), resume_hash in zip(documents, hashes):
+        parsed = cached_resumes.get(resume_hash) or parsed_by_hash.get(resume_hash)
+        if parsed is None:
+            continue
+        parsed_resumes_data.append({**parsed, "filename": filename, "content_hash": resume_hash})
+    logger.info(f"Parsed {len(parsed_resumes_data)}/{len(documents)} resumes ({len(cached_resumes)} served from cache, {len(documents_to_parse)} parsed).")
+    return parsed_resumes_data
+
+
+async def parse_resumes(resume_files: List[UploadFile], embedding_batch_size: int = EMBEDDING_BATCH_SIZE) -> List[Dict[str, Any]]:
+    documents: List[Tuple[str, bytes]] = []
+    for resume in resume_files:
+        try:
+            documents.append((resume.filename, await _read_upload(resume)))
+        except Exception as e:
+            logger.error(f"Could not read uploaded resume {resume.filename}: {e}", exc_info=True)
+    return await parse_resume_documents(documents, embedding_batch_size=embedding_batch_size)
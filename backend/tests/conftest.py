@@ -0,0 +1,6 @@
+# tests/conftest.py
+import os
+import sys
+
+# The backend is a flat set of modules imported by name (as uvicorn runs main.py from backend/)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
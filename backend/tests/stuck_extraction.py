@@ -0,0 +1,9 @@
+# tests/stuck_extraction.py
+import signal
+import time
+
+
+def parse_ignoring_budget(filename, content, cpu_seconds, wall_seconds):
+    # Stands in for a parser stuck in C code: the budget signals never get through
+    signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGALRM, signal.SIGXCPU})
+    time.sleep(60)
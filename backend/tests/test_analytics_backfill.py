@@ -0,0 +1,154 @@
+# tests/test_analytics_backfill.py
+import asyncio
+from datetime import datetime
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+import analytics
+
+
+def _matches(doc, query):
+    for field, condition in query.items():
+        if isinstance(condition, dict) and "$exists" in condition:
+            if (field in doc) != condition["$exists"]:
+                return False
+        elif doc.get(field) != condition:
+            return False
+    return True
+
+
+class _FakeRollups:
+    """Just enough of a Mongo collection for the backfill: _id-unique upserts, $set/$inc/$min/$unset."""
+    def __init__(self):
+        self.docs = {}
+
+    async def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        await asyncio.sleep(0)
+        doc = self.docs.get(query["_id"])
+        if doc is not None and _matches(doc, query):
+            doc.update(update.get("$set", {}))
+            return dict(doc)
+        if not upsert:
+            return None
+        if doc is not None:
+            raise DuplicateKeyError("E11000 duplicate key error")
+        doc = self.docs[query["_id"]] = {"_id": query["_id"], **update.get("$set", {}), **update.get("$setOnInsert", {})}
+        return dict(doc)
+
+    async def update_one(self, query, update, upsert=False):
+        await asyncio.sleep(0)
+        doc = self.docs.get(query["_id"])
+        if doc is None:
+            if not upsert:
+                return
+            doc = self.docs[query["_id"]] = {"_id": query["_id"], **update.get("$setOnInsert", {})}
+        doc.update(update.get("$set", {}))
+        for field in update.get("$unset", {}):
+            doc.pop(field, None)
+
+    async def bulk_write(self, operations, ordered=True):
+        for operation in operations:
+            document = operation._doc
+            doc = self.docs.setdefault(operation._filter["_id"], {"_id": operation._filter["_id"], **document.get("$setOnInsert", {})})
+            for field, value in document.get("$inc", {}).items():
+                doc[field] = doc.get(field, 0) + value
+            for field, value in document.get("$min", {}).items():
+                doc[field] = min(doc.get(field, value), value)
+
+
+class _FakeHistory:
+    """Documents with a timestamp and a month; aggregate() groups those before the pipeline's cutoff."""
+    def __init__(self, field, timestamps, fail=False):
+        self.field = field
+        self.timestamps = list(timestamps)
+        self.fail = fail
+
+    def aggregate(self, pipeline, **kwargs):
+        if self.fail:
+            raise RuntimeError("aggregation failed")
+        cutoff = pipeline[0]["$match"][self.field]["$lt"]
+        return self._iterate([timestamp for timestamp in self.timestamps if timestamp < cutoff])
+
+    async def _iterate(self, timestamps):
+        for timestamp in timestamps:
+            await asyncio.sleep(0)
+            month = timestamp.strftime("%Y-%m")
+            if self.field == "matched_at":
+                yield {"_id": {"jd_id": None, "score": 80, "month": month, "red_flags": []}, "count": 1}
+            else:
+                yield {"_id": month, "count": 1}
+
+
+CUTOFF = datetime(2026, 1, 1)
+HISTORY = [datetime(2025, 12, 1), datetime(2025, 12, 2)] # Saved before any worker counted incrementally
+
+@pytest.fixture
+def collections(monkeypatch):
+    collections = {
+        analytics.ANALYTICS_COLLECTION: _FakeRollups(),
+        "match_results": _FakeHistory("matched_at", HISTORY + [datetime(2025, 12, 3)]),
+        "scheduled_interviews": _FakeHistory("created_at", HISTORY),
+    }
+    monkeypatch.setattr(analytics.db_manager, "get_collection", collections.get)
+    return collections
+
+
+def test_concurrent_backfills_count_history_once(collections):
+    async def run():
+        await asyncio.gather(*(analytics.backfill_analytics_rollups(CUTOFF) for _ in range(4)))
+    asyncio.run(run())
+
+    global_rollup = collections[analytics.ANALYTICS_COLLECTION].docs[analytics.GLOBAL_ROLLUP_ID]
+    assert global_rollup["interviews_scheduled"] == 2
+    assert global_rollup["backfilled_through"] == CUTOFF
+
+def test_existing_rollups_are_claimed_and_later_startups_skip(collections):
+    rollups = collections[analytics.ANALYTICS_COLLECTION]
+    # Incremental updates may create the global rollup before the backfill gets to it
+    rollups.docs[analytics.GLOBAL_ROLLUP_ID] = {"_id": analytics.GLOBAL_ROLLUP_ID, "kind": "global", "interviews_scheduled": 1}
+    asyncio.run(analytics.backfill_analytics_rollups(CUTOFF))
+    asyncio.run(analytics.backfill_analytics_rollups(datetime(2026, 2, 1)))
+    assert rollups.docs[analytics.GLOBAL_ROLLUP_ID]["interviews_scheduled"] == 3
+
+    # Rollups backfilled before the claim existed are left alone
+    rollups.docs[analytics.GLOBAL_ROLLUP_ID] = {"_id": analytics.GLOBAL_ROLLUP_ID, "backfilled_through": CUTOFF, "interviews_scheduled": 5}
+    asyncio.run(analytics.backfill_analytics_rollups(CUTOFF))
+    assert rollups.docs[analytics.GLOBAL_ROLLUP_ID]["interviews_scheduled"] == 5
+
+def test_failed_aggregation_releases_the_claim(collections):
+    collections["match_results"].fail = True
+    asyncio.run(analytics.backfill_analytics_rollups(CUTOFF))
+    assert "backfill_claimed" not in collections[analytics.ANALYTICS_COLLECTION].docs[analytics.GLOBAL_ROLLUP_ID]
+
+    collections["match_results"].fail = False
+    asyncio.run(analytics.backfill_analytics_rollups(CUTOFF))
+    assert collections[analytics.ANALYTICS_COLLECTION].docs[analytics.GLOBAL_ROLLUP_ID]["interviews_scheduled"] == 2
+
+
+def _save_and_count(collections, saved_at):
+    # A request served after deployment: documents saved, then counted incrementally
+    collections["match_results"].timestamps.append(saved_at)
+    collections["scheduled_interviews"].timestamps.append(saved_at)
+    asyncio.run(analytics.record_match_results([{"jd_id": None, "jd_fit_score": 80, "red_flags": [], "matched_at": saved_at}]))
+    asyncio.run(analytics.record_scheduled_interviews([{"start_time": saved_at, "created_at": saved_at}]))
+
+def _assert_counted_once(collections):
+    global_rollup = collections[analytics.ANALYTICS_COLLECTION].docs[analytics.GLOBAL_ROLLUP_ID]
+    assert global_rollup["candidates"] == len(collections["match_results"].timestamps)
+    assert global_rollup["interviews_scheduled"] == len(collections["scheduled_interviews"].timestamps)
+
+def test_retried_backfill_skips_documents_already_counted(collections):
+    collections["match_results"].fail = True
+    asyncio.run(analytics.backfill_analytics_rollups(CUTOFF))
+    collections["match_results"].fail = False
+    _save_and_count(collections, datetime(2026, 1, 5))
+
+    asyncio.run(analytics.backfill_analytics_rollups(datetime(2026, 2, 1))) # The next deployment's startup
+    _assert_counted_once(collections)
+    assert collections[analytics.ANALYTICS_COLLECTION].docs[analytics.GLOBAL_ROLLUP_ID]["backfilled_through"] == datetime(2026, 1, 5)
+
+def test_worker_serving_before_the_claimant_started_is_not_double_counted(collections):
+    _save_and_count(collections, datetime(2026, 1, 5)) # Worker A, started at CUTOFF, has served a request
+    asyncio.run(analytics.backfill_analytics_rollups(datetime(2026, 1, 10))) # Worker B starts later and wins the claim
+    _assert_counted_once(collections)
@@ -0,0 +1,94 @@
+# tests/test_database.py
+import asyncio
+
+from pymongo.errors import BulkWriteError
+
+import database
+from database import MongoDBManager, MANAGED_INDEXES, bulk_insert_documents
+
+
+class _FakeIndexedCollection:
+    def __init__(self, index_names):
+        self.index_names = set(index_names) | {"_id_"}
+
+    async def index_information(self):
+        return {name: {} for name in self.index_names}
+
+    async def create_indexes(self, index_models):
+        names = [index.document["name"] for index in index_models]
+        self.index_names.update(names)
+        return names
+
+    async def drop_index(self, name):
+        self.index_names.remove(name)
+
+
+def _ensure(collections):
+    manager = MongoDBManager()
+    manager.db = collections
+    return asyncio.run(manager.ensure_indexes())
+
+
+def test_ensure_indexes_creates_missing_and_drops_retired():
+    # A deployment indexed by an earlier release, plus one index an operator added by hand
+    collections = {
+        "scheduled_interviews": _FakeIndexedCollection(["start_time_1"]),
+        "resumes": _FakeIndexedCollection(["session_id_1", "jd_id_1", "content_hash_1"]),
+        "match_results": _FakeIndexedCollection(["session_id_1", "jd_id_1_jd_fit_score_-1", "resume_id_1", "candidate_name_text"]),
+        "analytics_rollups": _FakeIndexedCollection([]),
+        "match_jobs": _FakeIndexedCollection([]),
+        "parsed_resume_cache": _FakeIndexedCollection(["content_hash_1"]),
+        "parsed_jd_cache": _FakeIndexedCollection(["content_hash_1"]),
+    }
+    report = _ensure(collections)
+
+    for collection_name, index_models in MANAGED_INDEXES.items():
+        assert {index.document["name"] for index in index_models} | {"_id_"} <= collections[collection_name].index_names
+    assert collections["scheduled_interviews"].index_names == {"_id_", "start_time_1__id_1"}
+    assert collections["resumes"].index_names == {"_id_", "session_id_1", "jd_id_1"}
+    assert collections["parsed_resume_cache"].index_names == collections["parsed_jd_cache"].index_names == {"_id_"}
+    assert report["match_results"]["dropped"] == ["session_id_1"]
+    assert report["match_results"]["created"] == ["session_id_1_jd_fit_score_-1"]
+    assert report["match_results"]["unmanaged"] == ["candidate_name_text"]
+    assert "candidate_name_text" in collections["match_results"].index_names
+
+def test_ensure_indexes_is_idempotent():
+    collections = {name: _FakeIndexedCollection([]) for name in {*MANAGED_INDEXES, *database.RETIRED_INDEXES}}
+    _ensure(collections)
+    report = _ensure(collections)
+    assert all(not collection_report["created"] and not collection_report["dropped"] for collection_report in report.values())
+
+
+class _FakeInsertCollection:
+    """insert_many(ordered=False): rejects documents listed in reject_ids, writes the rest of the chunk."""
+    name = "fake"
+
+    def __init__(self, reject_ids=(), fail_chunks=()):
+        self.reject_ids = set(reject_ids)
+        self.fail_chunks = set(fail_chunks)
+        self.chunks = []
+        self.docs = []
+
+    async def insert_many(self, documents, ordered=True):
+        assert ordered is False
+        self.chunks.append([doc["_id"] for doc in documents])
+        if len(self.chunks) - 1 in self.fail_chunks:
+            raise ConnectionError("connection reset")
+        self.docs.extend(doc for doc in documents if doc["_id"] not in self.reject_ids)
+        write_errors = [{"index": index, "code": 11000} for index, doc in enumerate(documents) if doc["_id"] in self.reject_ids]
+        if write_errors:
+            raise BulkWriteError({"writeErrors": write_errors})
+
+
+def test_bulk_insert_reports_only_the_documents_that_failed():
+    collection = _FakeInsertCollection(reject_ids={1, 5})
+    failed_ids = asyncio.run(bulk_insert_documents(collection, [{"_id": i} for i in range(7)], chunk_size=3))
+    assert collection.chunks == [[0, 1, 2], [3, 4, 5], [6]]
+    assert failed_ids == {1, 5}
+    assert [doc["_id"] for doc in collection.docs] == [0, 2, 3, 4, 6] # The rest of each chunk is still written
+
+def test_bulk_insert_fails_a_whole_chunk_on_other_errors():
+    collection = _FakeInsertCollection(fail_chunks={1})
+    failed_ids = asyncio.run(bulk_insert_documents(collection, [{"_id": i} for i in range(5)], chunk_size=2))
+    assert failed_ids == {2, 3}
+    assert [doc["_id"] for doc in collection.docs] == [0, 1, 4]
@@ -0,0 +1,98 @@
+# tests/test_excel_exporter.py
+import asyncio
+import csv
+import os
+import time
+
+import pytest
+from bson import ObjectId
+
+import excel_exporter
+
+
+class _FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, keys):
+        for field, direction in reversed(keys):
+            self.docs.sort(key=lambda doc: doc.get(field), reverse=direction < 0)
+        return self
+
+    def batch_size(self, size):
+        return self
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            await asyncio.sleep(0)
+            yield doc
+
+
+class _FakeMatchResults:
+    def __init__(self, docs):
+        self.docs = docs
+        self.finds = 0
+
+    async def count_documents(self, query):
+        return sum(1 for doc in self.docs if doc["session_id"] == query["session_id"])
+
+    def find(self, query, projection=None):
+        self.finds += 1
+        return _FakeCursor([doc for doc in self.docs if doc["session_id"] == query["session_id"]])
+
+
+@pytest.fixture
+def reports(tmp_path, monkeypatch):
+    matches = _FakeMatchResults([
+        {"_id": ObjectId(), "session_id": "s1", "candidate_name": f"Candidate {i}", "jd_fit_score": i * 10,
+         "interview_score": 3.5, "red_flags": ["None"], "experience_summary": "ok", "original_filename": f"cv{i}.pdf"}
+        for i in range(5)
+    ])
+    collections = {"match_results": matches, "resumes": None}
+    monkeypatch.setattr(excel_exporter.db_manager, "get_collection", collections.get)
+    monkeypatch.setattr(excel_exporter, "FULL_REPORTS_DIR", str(tmp_path))
+    monkeypatch.setattr(excel_exporter, "_last_cleanup", 0.0)
+    return matches
+
+
+def test_concurrent_downloads_build_once_and_release_the_lock(reports):
+    async def run():
+        return await asyncio.gather(*[excel_exporter.build_session_report("s1", "csv") for _ in range(3)])
+
+    paths = asyncio.run(run())
+    assert len(set(paths)) == 1 and reports.finds == 1
+    assert excel_exporter._report_locks == {}
+    with open(paths[0], encoding="utf-8-sig") as report:
+        rows = list(csv.reader(report))
+    assert rows[0] == excel_exporter.REPORT_COLUMNS
+    assert [row[1] for row in rows[1:]] == ["40", "30", "20", "10", "0"]
+
+
+def test_lock_is_released_when_the_build_fails(reports, monkeypatch):
+    async def failing_write(session_id, report_format, path):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(excel_exporter, "_write_session_report", failing_write)
+    with pytest.raises(RuntimeError):
+        asyncio.run(excel_exporter.build_session_report("s1", "csv"))
+    assert excel_exporter._report_locks == {}
+
+
+def test_stale_reports_are_deleted_and_downloaded_ones_kept(reports, tmp_path):
+    stale = tmp_path / "session_old_3.xlsx"
+    stale.write_bytes(b"old")
+    day_ago = time.time() - 25 * 3600
+    os.utime(stale, (day_ago, day_ago))
+
+    path = asyncio.run(excel_exporter.build_session_report("s1", "csv"))
+    assert not stale.exists()
+    assert os.path.exists(path)
+
+    os.utime(path, (day_ago, day_ago))
+    path_again = asyncio.run(excel_exporter.build_session_report("s1", "csv")) # Cache hit refreshes it before the sweep
+    assert path_again == path and reports.finds == 1
+    assert asyncio.run(excel_exporter.cleanup_stale_reports(force=True)) == 0
+    assert os.path.exists(path)
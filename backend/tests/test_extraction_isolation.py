@@ -0,0 +1,91 @@
+# tests/test_extraction_isolation.py
+import asyncio
+import os
+import signal
+import sys
+import time
+
+import pytest
+
+import document_parsing
+
+
+def _is_running(pid: int) -> bool:
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            return not any(line.startswith("State:") and "Z" in line for line in status)
+    except FileNotFoundError:
+        return False
+
+
+@pytest.fixture
+def extraction_pool(monkeypatch):
+    monkeypatch.setattr(document_parsing, "RESUME_PARSE_ISOLATION", True)
+    monkeypatch.setattr(document_parsing, "RESUME_EXTRACT_WORKERS", 2)
+    monkeypatch.setattr(document_parsing, "_extraction_slots", None)
+    yield
+    document_parsing.shutdown_extraction_pool()
+
+
+def _wait_for_pids(pool, count, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    pids = document_parsing.extraction_worker_pids(pool)
+    while len(pids) < count and time.monotonic() < deadline:
+        time.sleep(0.05)
+        pids = document_parsing.extraction_worker_pids(pool)
+    return pids
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="checks worker state through /proc")
+def test_kill_extraction_pool_kills_every_worker(extraction_pool):
+    async def run():
+        pool = await document_parsing.ready_extraction_pool()
+        pids = _wait_for_pids(pool, 2)
+        document_parsing._kill_extraction_pool(pool)
+        return pool, pids
+
+    pool, pids = asyncio.run(run())
+    assert len(pids) == 2 and os.getpid() not in pids
+    deadline = time.monotonic() + 5
+    while any(_is_running(pid) for pid in pids) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not any(_is_running(pid) for pid in pids)
+    assert document_parsing._extraction_pool is None
+    assert pool not in document_parsing._extraction_pool_workers
+
+
+def test_documents_are_extracted_in_isolated_workers(extraction_pool):
+    jd_text = "Backend engineer. Requirements: Python and MongoDB. " * 5
+
+    async def run():
+        extracted = await document_parsing.parse_document_text("jd.txt", jd_text.encode())
+        return extracted, _wait_for_pids(document_parsing._extraction_pool, 1)
+
+    extracted, pids = asyncio.run(run())
+    assert extracted["parse_status"] == document_parsing.PARSE_OK
+    assert "Requirements: Python and MongoDB" in extracted["parsed_text"]
+    assert pids and os.getpid() not in pids
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux") or not hasattr(signal, "pthread_sigmask"), reason="needs POSIX signal masks and /proc")
+def test_stuck_worker_is_killed_and_pool_replaced(extraction_pool, monkeypatch):
+    import stuck_extraction
+    monkeypatch.setattr(document_parsing, "RESUME_PARSE_TIMEOUT_SECONDS", 0.5)
+    monkeypatch.setattr(document_parsing, "RESUME_PARSE_KILL_GRACE_SECONDS", 0.5)
+
+    async def run():
+        pool = await document_parsing.ready_extraction_pool()
+        pids = _wait_for_pids(pool, 2)
+        monkeypatch.setattr(document_parsing, "_parse_with_budget", stuck_extraction.parse_ignoring_budget)
+        stuck = await document_parsing._parse_isolated("stuck.pdf", b"%PDF-1.4")
+        return pool, pids, stuck
+
+    started = time.monotonic()
+    pool, pids, stuck = asyncio.run(run())
+    assert time.monotonic() - started < 30
+    assert stuck["parse_status"] == document_parsing.PARSE_TIMED_OUT
+    assert document_parsing._extraction_pool is not pool
+    deadline = time.monotonic() + 5
+    while any(_is_running(pid) for pid in pids) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not any(_is_running(pid) for pid in pids)
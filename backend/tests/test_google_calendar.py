@@ -0,0 +1,137 @@
+# tests/test_google_calendar.py
+import asyncio
+import json
+import threading
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from google.oauth2.credentials import Credentials
+from pymongo.errors import BulkWriteError
+
+import google_calendar
+import interview_scheduling
+from database import BulkInterviewItem
+
+CONFLICT_EMAIL = "busy@example.com" # The stub answers 409 for events inviting this candidate
+
+
+class _FakeCalendarHandler(BaseHTTPRequestHandler):
+    """Google's batch endpoint: a multipart/mixed request of events.insert calls, answered part by part."""
+    def do_POST(self):
+        assert self.path == "/batch/calendar/v3", self.path
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        request = BytesParser().parsebytes(f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + body)
+        parts = request.get_payload()
+        self.server.batch_sizes.append(len(parts))
+
+        boundary = "stub_boundary"
+        response_parts = []
+        for part in parts:
+            event = json.loads(part.get_payload().split("\n\n", 1)[1]) # "POST /calendar/v3/... HTTP/1.1", headers, then the event
+            if event["attendees"][0]["email"] == CONFLICT_EMAIL:
+                status, payload = "409 Conflict", {"error": {"code": 409, "message": "The requested identifier already exists."}}
+            else:
+                event_id = f"event{len(self.server.created)}"
+                self.server.created.append(event)
+                status, payload = "200 OK", {**event, "id": event_id, "htmlLink": f"https://calendar.test/{event_id}", "hangoutLink": f"https://meet.test/{event_id}"}
+            response_parts.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\nContent-ID: <response-{part['Content-ID'][1:-1]}>\r\n\r\n"
+                f"HTTP/1.1 {status}\r\nContent-Type: application/json; charset=UTF-8\r\n\r\n{json.dumps(payload)}\r\n"
+            )
+        content = ("".join(response_parts) + f"--{boundary}--\r\n").encode()
+        self.send_response(200)
+        self.send_header("Content-Type", f"multipart/mixed; boundary={boundary}")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def calendar_server(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeCalendarHandler)
+    server.batch_sizes, server.created = [], []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    credentials_manager = google_calendar.GoogleCredentialsManager(token_file="/nonexistent/token.json")
+    credentials_manager._credentials, credentials_manager._loaded = Credentials(token="stub-token"), True
+    monkeypatch.setattr(google_calendar, "GOOGLE_API_ROOT_URL", f"http://127.0.0.1:{server.server_port}/")
+    monkeypatch.setattr(google_calendar, "google_credentials", credentials_manager)
+    monkeypatch.setattr(google_calendar, "_thread_services", threading.local())
+    monkeypatch.setattr(google_calendar, "_google_api_pool", None)
+    yield server
+    google_calendar.shutdown_google_api_pool()
+    server.shutdown()
+    server.server_close()
+
+
+def _event_body(candidate_email):
+    start = google_calendar.parse_interview_start("2026-11-02T10:00+00:00")
+    return google_calendar.interview_event_body("Candidate", candidate_email, ["lead@example.com"], start, start)
+
+
+def test_events_are_sent_in_batches_of_the_configured_size(calendar_server, monkeypatch):
+    monkeypatch.setattr(google_calendar, "GOOGLE_BATCH_SIZE", 2)
+    emails = ["a@example.com", "b@example.com", CONFLICT_EMAIL, "d@example.com", "e@example.com"]
+    outcomes = asyncio.run(google_calendar.create_calendar_events([_event_body(email) for email in emails]))
+
+    assert calendar_server.batch_sizes == [2, 2, 1]
+    assert [event is not None for event, _ in outcomes] == [True, True, False, True, True]
+    assert [event["attendees"][0]["email"] for event, _ in outcomes if event] == ["a@example.com", "b@example.com", "d@example.com", "e@example.com"]
+    assert outcomes[2][1].startswith("Google Calendar error 409")
+
+
+class _FakeInterviewsCollection:
+    name = "scheduled_interviews"
+
+    def __init__(self, reject_email):
+        self.reject_email = reject_email
+        self.docs = []
+
+    async def insert_many(self, documents, ordered=True):
+        self.docs.extend(doc for doc in documents if doc["candidate_email"] != self.reject_email)
+        write_errors = [{"index": index, "code": 11000} for index, doc in enumerate(documents) if doc["candidate_email"] == self.reject_email]
+        if write_errors:
+            raise BulkWriteError({"writeErrors": write_errors})
+
+
+class _RecordingIndex:
+    def __init__(self):
+        self.added = []
+
+    def add_interviews(self, interview_docs):
+        self.added.extend(interview_docs)
+
+
+def test_bulk_scheduling_reports_a_status_per_item(calendar_server, monkeypatch):
+    async def record_scheduled_interviews(interview_docs):
+        pass
+
+    index = _RecordingIndex()
+    monkeypatch.setattr(interview_scheduling, "interview_index", index)
+    monkeypatch.setattr(interview_scheduling, "record_scheduled_interviews", record_scheduled_interviews)
+    collection = _FakeInterviewsCollection(reject_email="unsaved@example.com")
+
+    def item(candidate_email, interviewer_emails=("lead@example.com",), start_time="2026-11-02T10:00"):
+        return BulkInterviewItem(candidate_name=candidate_email.split("@")[0], candidate_email=candidate_email,
+                                 interviewer_emails=list(interviewer_emails), start_time=start_time, duration_minutes=30)
+
+    response = asyncio.run(interview_scheduling.schedule_interviews([
+        item("ok@example.com"),
+        item(CONFLICT_EMAIL),
+        item("unsaved@example.com"),
+        item("nobody@example.com", interviewer_emails=[" "]),
+        item("when@example.com", start_time="next tuesday"),
+        item("not-an-email"),
+    ], collection))
+
+    assert [result["status"] for result in response["results"]] == ["scheduled", "failed", "scheduled_not_saved", "invalid", "invalid", "invalid"]
+    assert (response["requested"], response["scheduled"], response["scheduled_not_saved"], response["failed"], response["invalid"]) == (6, 1, 1, 1, 3)
+    scheduled = response["results"][0]
+    assert scheduled["event_link"].startswith("https://calendar.test/") and scheduled["meet_link"].startswith("https://meet.test/")
+    assert "409" in response["results"][1]["error"]
+    assert [doc["candidate_email"] for doc in collection.docs] == [doc["candidate_email"] for doc in index.added] == ["ok@example.com"]
+    assert calendar_server.batch_sizes == [3] # Only valid items reach Google, in one batch request
@@ -0,0 +1,164 @@
+# tests/test_interview_index.py
+import asyncio
+import math
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from bson import ObjectId
+
+import interview_index
+from interview_index import InterviewIndex, InterviewIndexUnavailable, _InterviewerSchedule
+
+BASE = datetime(2030, 1, 1, tzinfo=timezone.utc)
+EMAILS = [f"interviewer{k}@example.com" for k in range(5)]
+
+
+def _random_interviews(rng, count):
+    docs = []
+    for n in range(count):
+        start = BASE + timedelta(minutes=rng.randrange(0, 60 * 24 * 5, 5))
+        duration = rng.choice([15, 30, 45, 60, 90])
+        docs.append({
+            "_id": ObjectId(),
+            "start_time": start.replace(tzinfo=None), # Mongo returns naive UTC
+            "end_time": (start + timedelta(minutes=duration)).replace(tzinfo=None),
+            "interviewer_emails": rng.sample(EMAILS, rng.randint(1, 2)),
+            "candidate_name": f"Candidate {n}",
+        })
+    return docs
+
+def _utc(value):
+    return value.replace(tzinfo=timezone.utc)
+
+def _brute_conflicts(docs, emails, start, end):
+    return sorted(
+        (email, str(doc["_id"])) for doc in docs for email in doc["interviewer_emails"]
+        if email in emails and _utc(doc["start_time"]) < end and _utc(doc["end_time"]) > start
+    )
+
+def _brute_slot(docs, emails, duration_minutes, not_before, not_after):
+    granularity = interview_index.AUTO_SLOT_GRANULARITY_MINUTES * 60
+    candidate = math.ceil(not_before.timestamp() / granularity) * granularity
+    while candidate + duration_minutes * 60 <= not_after.timestamp():
+        end = candidate + duration_minutes * 60
+        if not any(
+            email in emails and _utc(doc["start_time"]).timestamp() < end and _utc(doc["end_time"]).timestamp() > candidate
+            for doc in docs for email in doc["interviewer_emails"]
+        ):
+            return candidate
+        candidate += granularity
+    return None
+
+
+class _FakeCursor:
+    def __init__(self, docs, during_load=None):
+        self.docs = docs
+        self.during_load = during_load
+
+    def batch_size(self, size):
+        return self
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for i, doc in enumerate(self.docs):
+            if i == len(self.docs) // 2 and self.during_load:
+                self.during_load()
+            await asyncio.sleep(0)
+            yield doc
+
+
+class _FakeInterviews:
+    def __init__(self, docs, during_load=None):
+        self.docs = docs
+        self.during_load = during_load
+
+    def find(self, query, projection):
+        since = query["start_time"]["$gte"]
+        return _FakeCursor([doc for doc in self.docs if _utc(doc["start_time"]) >= since], self.during_load)
+
+
+@pytest.fixture(autouse=True)
+def long_lookback(monkeypatch):
+    monkeypatch.setattr(interview_index, "INTERVIEW_INDEX_LOOKBACK_HOURS", 10 ** 6)
+
+def _load(monkeypatch, index, collection):
+    monkeypatch.setattr(interview_index.db_manager, "get_collection", {"scheduled_interviews": collection}.get)
+    asyncio.run(index.load())
+
+
+def test_busy_blocks_merge_overlapping_and_touching_intervals():
+    schedule = _InterviewerSchedule()
+    for start, end in [(10, 20), (30, 40), (20, 25), (50, 60), (35, 52), (0, 5), (70, 80), (65, 75)]:
+        schedule.add(start, end, "id", "name")
+    assert list(zip(schedule.busy_starts, schedule.busy_ends)) == [(0, 5), (10, 25), (30, 60), (65, 80)]
+    assert schedule.starts == sorted(schedule.starts)
+    assert schedule.busy_until(25, 30) is None # Back-to-back on both sides
+    assert schedule.busy_until(24, 26) == 25
+    assert schedule.busy_until(55, 100) == 60
+
+def test_busy_blocks_match_interval_union_on_random_input():
+    rng = random.Random(25)
+    for _ in range(200):
+        schedule = _InterviewerSchedule()
+        intervals = []
+        for _ in range(rng.randint(1, 30)):
+            start = rng.randrange(0, 200)
+            intervals.append((start, start + rng.randint(1, 20)))
+            schedule.add(*intervals[-1], "id", "name")
+        merged = []
+        for start, end in sorted(intervals):
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        assert list(zip(schedule.busy_starts, schedule.busy_ends)) == [tuple(block) for block in merged]
+
+def test_queries_before_load_are_unavailable():
+    with pytest.raises(InterviewIndexUnavailable):
+        InterviewIndex().find_conflicts(EMAILS, BASE, BASE + timedelta(hours=1))
+
+def test_conflicts_and_slots_match_brute_force(monkeypatch):
+    rng = random.Random(1)
+    docs = _random_interviews(rng, 300)
+    index = InterviewIndex()
+    _load(monkeypatch, index, _FakeInterviews(docs))
+
+    for _ in range(500):
+        emails = rng.sample(EMAILS, rng.randint(1, 3))
+        start = BASE + timedelta(minutes=rng.randrange(-60, 60 * 24 * 6, 5))
+        duration = rng.choice([15, 30, 60, 120])
+        end = start + timedelta(minutes=duration)
+
+        conflicts = index.find_conflicts([email.upper() for email in emails] + ["nobody@example.com"], start, end)
+        assert sorted((c["interviewer_email"], c["interview_id"]) for c in conflicts) == _brute_conflicts(docs, emails, start, end)
+
+        not_after = start + timedelta(days=3)
+        slot = index.earliest_free_slot(emails, duration, start, not_after)
+        assert (slot[0].timestamp() if slot else None) == _brute_slot(docs, emails, duration, start, not_after)
+        if slot:
+            assert slot[1] - slot[0] == timedelta(minutes=duration)
+
+def test_no_slot_inside_a_fully_booked_window(monkeypatch):
+    docs = [{"_id": ObjectId(), "start_time": BASE.replace(tzinfo=None), "end_time": (BASE + timedelta(hours=8)).replace(tzinfo=None),
+             "interviewer_emails": [EMAILS[0]], "candidate_name": "All day"}]
+    index = InterviewIndex()
+    _load(monkeypatch, index, _FakeInterviews(docs))
+    assert index.earliest_free_slot([EMAILS[0]], 30, BASE, BASE + timedelta(hours=8)) is None
+    assert index.earliest_free_slot([EMAILS[0]], 30, BASE, BASE + timedelta(hours=9))[0] == BASE + timedelta(hours=8)
+
+def test_inserts_during_load_survive_the_swap_and_duplicates_are_ignored(monkeypatch):
+    rng = random.Random(7)
+    docs = _random_interviews(rng, 60)
+    stored, inserted_later = docs[:40], docs[40:]
+    index = InterviewIndex()
+    _load(monkeypatch, index, _FakeInterviews(stored, during_load=lambda: index.add_interviews(inserted_later[:5])))
+
+    index.add_interviews(inserted_later + stored[:3]) # The first five and the stored ones are already indexed
+    assert index._interview_ids == {str(doc["_id"]) for doc in docs}
+    for doc in inserted_later[:5]:
+        start = _utc(doc["start_time"])
+        conflicts = index.find_conflicts(doc["interviewer_emails"], start, start + timedelta(minutes=1))
+        assert sum(c["interview_id"] == str(doc["_id"]) for c in conflicts) == len(doc["interviewer_emails"])
@@ -0,0 +1,41 @@
+# tests/test_jd_parser.py
+import asyncio
+
+import numpy as np
+import pytest
+
+import document_parsing
+import jd_parser
+
+JD_TEXT = b"Backend engineer. Requirements: Python, MongoDB and AWS. Nice to have: Kubernetes."
+KEYWORDS = {"essential": ["python", "mongodb"], "desirable": ["kubernetes"], "general": []}
+
+
+@pytest.fixture
+def stored(monkeypatch):
+    stored = []
+
+    async def no_cache_hit(jd_content_hash):
+        return None
+
+    async def store(jd_content_hash, parsed_jd):
+        stored.append(parsed_jd)
+
+    monkeypatch.setattr(document_parsing, "RESUME_PARSE_ISOLATION", False)
+    monkeypatch.setattr(document_parsing, "RESUME_PARSE_MODE", "inline")
+    monkeypatch.setattr(jd_parser, "get_cached_parsed_jd", no_cache_hit)
+    monkeypatch.setattr(jd_parser, "store_parsed_jd", store)
+    return stored
+
+
+def test_jd_with_embeddings_is_cached(stored, monkeypatch):
+    monkeypatch.setattr(jd_parser, "analyze_jd_text", lambda filename, text: (KEYWORDS, {"full_text": text}, {"full_text": np.ones(4)}))
+    parsed_text, keywords, _, embeddings = asyncio.run(jd_parser.parse_jd_content("jd.txt", JD_TEXT))
+    assert "Requirements" in parsed_text and keywords == KEYWORDS and "full_text" in embeddings
+    assert len(stored) == 1
+
+def test_jd_without_embeddings_is_returned_but_not_cached(stored, monkeypatch):
+    monkeypatch.setattr(jd_parser, "analyze_jd_text", lambda filename, text: (KEYWORDS, {"full_text": text}, {}))
+    parsed_text, keywords, _, embeddings = asyncio.run(jd_parser.parse_jd_content("jd.txt", JD_TEXT))
+    assert parsed_text and keywords == KEYWORDS and embeddings == {}
+    assert stored == []
@@ -0,0 +1,84 @@
+# tests/test_keyword_matcher.py
+import random
+import re
+
+import pytest
+
+from match_engine import KeywordMatcher
+
+# Keywords chosen to stress the token alignment: punctuation inside and at the ends, underscores, digits,
+# multi-word phrases, prefixes of other keywords and surrounding whitespace (regex fallback)
+KEYWORDS = [
+    "python", "java", "javascript", "c", "c++", "c#", ".net", "node.js", "ci/cd", "r", "go", "sql", "nosql",
+    "machine learning", "machine learning ops", "deep learning", "rest api", "api", "a/b testing", "_internal",
+    "python3", "3d", "e-commerce", "commerce", " go", "ml ", "data", "data science", "big data",
+]
+FILLER = ["the", "and", "with", "experience", "in", "team", "2020", "-", "(", ")", ",", ".", "/", "+", "#", "_"]
+SEPARATORS = [" ", "  ", "\n", ", ", "/", "-", ".", "(", ")", "", "_"]
+
+
+def _reference_text_hits(keywords, text_lower):
+    # What calculate_weighted_keyword_score did per keyword before the index
+    return {kw.lower() for kw in keywords if kw and re.search(r'\b' + re.escape(kw.lower()) + r'\b', text_lower)}
+
+def _reference_match_type(kw_lower, resume_text_lower, resume_skills_lower_set):
+    if kw_lower in resume_skills_lower_set:
+        return "Direct Skill"
+    if not resume_text_lower:
+        return "None"
+    if re.search(r'\b' + re.escape(kw_lower) + r'\b', resume_text_lower):
+        return "Text Exact"
+    if ' ' in kw_lower:
+        for r_skill in resume_skills_lower_set:
+            if r_skill in kw_lower and len(r_skill) >= max(3, 0.6 * len(kw_lower)):
+                return "Partial JD by RSkill"
+            if kw_lower in r_skill and len(kw_lower) >= max(3, 0.6 * len(r_skill)):
+                return "Partial RSkill by JD"
+    else:
+        for r_skill in resume_skills_lower_set:
+            if ' ' in r_skill and kw_lower in r_skill.split():
+                return "JD Word in RSkill Phrase"
+    return "None"
+
+def _random_text(rng):
+    pieces = [rng.choice(KEYWORDS + FILLER).strip() or "x" for _ in range(rng.randint(0, 25))]
+    return "".join(piece + rng.choice(SEPARATORS) for piece in pieces)
+
+
+@pytest.mark.parametrize("text", [
+    "", "c++ and c# developer", "c++11", "xc++", "built with .net core", "dotnet.net", "node.js/express",
+    "nodexjs", "ci/cd pipelines", "ci / cd", "r and r&d", "go-to-market", "golang", "_internal tools",
+    "python3 and python 3", "3d modelling", "e-commerce platforms", "machine learning ops", "machine  learning",
+    " go ", "ml engineer", "aml ", "data-science", "big data science",
+])
+def test_find_in_text_matches_word_boundary_regex(text):
+    assert KeywordMatcher(KEYWORDS).find_in_text(text) == _reference_text_hits(KEYWORDS, text)
+
+def test_find_in_text_matches_word_boundary_regex_on_random_text():
+    rng = random.Random(6)
+    matcher = KeywordMatcher(KEYWORDS)
+    for _ in range(2000):
+        text = _random_text(rng)
+        assert matcher.find_in_text(text) == _reference_text_hits(KEYWORDS, text), text
+
+def test_keywords_are_lowercased_and_deduplicated():
+    matcher = KeywordMatcher(["Python", "python", "", "Machine Learning"])
+    assert matcher.keywords == {"python", "machine learning"}
+    assert matcher.find_in_text("senior python and machine learning engineer") == {"python", "machine learning"}
+
+def test_match_types_agree_with_per_keyword_rules():
+    rng = random.Random(11)
+    skill_pool = ["python", "machine learning", "learning", "rest", "rest api design", "data", "sql server", "c++", "deep learning"]
+    matcher = KeywordMatcher(KEYWORDS)
+    for _ in range(500):
+        text = _random_text(rng)
+        skills = set(rng.sample(skill_pool, rng.randint(0, len(skill_pool))))
+        match_types = matcher.match(text, skills)
+        assert set(match_types) == matcher.keywords
+        for kw_lower, match_type in match_types.items():
+            expected = _reference_match_type(kw_lower, text, skills)
+            if expected.startswith("Partial"):
+                # Both partial rules could apply; the old loop took whichever the set yielded first
+                assert match_type.startswith("Partial"), (kw_lower, text, skills)
+            else:
+                assert match_type == expected, (kw_lower, text, skills)
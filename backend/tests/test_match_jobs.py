@@ -0,0 +1,100 @@
+# tests/test_match_jobs.py
+import asyncio
+import time
+
+import pytest
+
+import document_parsing
+import jd_parser
+import match_jobs
+import resume_parser
+
+BLOCKING_STAGE_SECONDS = 0.5
+JD_TEXT = b"Senior Python engineer. Requirements: Python, FastAPI, MongoDB. Responsibilities: build matching services."
+
+
+def _slow_analyze_jd_text(filename, parsed_text):
+    time.sleep(BLOCKING_STAGE_SECONDS) # Stands in for spaCy keyword extraction and JD embedding
+    return {"essential": ["python"], "desirable": [], "general": []}, {"full_text": parsed_text}, {}
+
+def _slow_annotate_resumes(parsed_texts, batch_size=resume_parser.RESUME_NLP_BATCH_SIZE):
+    time.sleep(BLOCKING_STAGE_SECONDS) # Stands in for the nlp.pipe batch
+    return [{"skills": ["python"], "person_entities": []} for _ in parsed_texts]
+
+async def _annotating_match_session(jd_filename, parsed_jd, resume_documents, chunk_size=4):
+    yield {"event": "session", "session_id": "session-1", "jd_db_id": "jd-1", "total_resumes": len(resume_documents)}
+    for _ in range(2):
+        await resume_parser._annotate_texts(["Python developer"] * len(resume_documents))
+        yield {"event": "progress", "processed_resumes": len(resume_documents), "parsed_resumes": len(resume_documents)}
+    yield {"event": "candidate", "candidate": {"name": "Jane Doe", "jdFit": 80}}
+    yield {"event": "summary", "excelUrl": None, "csvUrl": None, "message": "done"}
+
+
+class _FakeJobsCollection:
+    def __init__(self):
+        self.docs = {}
+
+    async def update_one(self, query, update, upsert=False):
+        self.docs.setdefault(query["_id"], {"_id": query["_id"]}).update(update["$set"])
+
+    async def find_one(self, query):
+        return self.docs.get(query["_id"])
+
+
+@pytest.fixture
+def jobs_collection(monkeypatch):
+    jobs_collection = _FakeJobsCollection()
+    monkeypatch.setattr(match_jobs.db_manager, "get_collection", lambda name: jobs_collection if name == match_jobs.MATCH_JOBS_COLLECTION else None)
+    monkeypatch.setattr(match_jobs, "_jobs", {})
+    return jobs_collection
+
+
+def test_job_status_answers_while_job_runs(monkeypatch, jobs_collection):
+    monkeypatch.setattr(jd_parser, "analyze_jd_text", _slow_analyze_jd_text)
+    monkeypatch.setattr(resume_parser, "annotate_resumes", _slow_annotate_resumes)
+    monkeypatch.setattr(resume_parser, "RESUME_PARSE_MODE", "inline")
+    monkeypatch.setattr(document_parsing, "RESUME_PARSE_MODE", "inline")
+    monkeypatch.setattr(document_parsing, "RESUME_PARSE_ISOLATION", False)
+    monkeypatch.setattr(match_jobs, "iter_match_session", _annotating_match_session)
+
+    async def run():
+        job = match_jobs.submit_match_job("jd.txt", JD_TEXT, [("cv.txt", b"Python developer")])
+        statuses, slowest_poll = set(), 0.0
+        while not job.is_finished:
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)
+            statuses.add((await match_jobs.get_match_job(job.job_id)).status_view()["status"]) # What GET /api/match/jobs/{id} returns
+            slowest_poll = max(slowest_poll, time.perf_counter() - started)
+        await job.task
+        return job, statuses, slowest_poll
+
+    job, statuses, slowest_poll = asyncio.run(run())
+    assert job.status == match_jobs.JOB_COMPLETED, job.error
+    assert match_jobs.JOB_RUNNING in statuses
+    assert job.finished_at - job.started_at >= 3 * BLOCKING_STAGE_SECONDS
+    assert slowest_poll < BLOCKING_STAGE_SECONDS / 2
+
+
+def test_jobs_are_visible_to_other_workers(monkeypatch, jobs_collection):
+    async def parsed_jd(jd_filename, jd_content):
+        return "Python engineer", {"essential": ["python"]}, {}, {}
+
+    monkeypatch.setattr(match_jobs, "parse_jd_content", parsed_jd)
+    monkeypatch.setattr(match_jobs, "iter_match_session", _annotating_match_session)
+    monkeypatch.setattr(resume_parser, "annotate_resumes", lambda parsed_texts, batch_size=None: [{"skills": [], "person_entities": []} for _ in parsed_texts])
+
+    async def run():
+        job = match_jobs.submit_match_job("jd.txt", JD_TEXT, [("cv.txt", b"Python developer")])
+        await asyncio.sleep(0)
+        match_jobs._jobs.clear() # The poll lands on a worker that never saw the submit
+        seen_running = await match_jobs.get_match_job(job.job_id)
+        await job.task
+        return job, seen_running, await match_jobs.get_match_job(job.job_id)
+
+    job, seen_running, seen_finished = asyncio.run(run())
+    assert seen_running.status in (match_jobs.JOB_QUEUED, match_jobs.JOB_RUNNING)
+    assert seen_finished is not job
+    assert seen_finished.status_view() == job.status_view()
+    assert seen_finished.results == [{"name": "Jane Doe", "jdFit": 80}]
+    assert "jd_content" not in jobs_collection.docs[job.job_id] and jobs_collection.docs[job.job_id]["expires_at"]
+    assert asyncio.run(match_jobs.get_match_job("unknown-job")) is None
@@ -0,0 +1,71 @@
+# tests/test_match_pipeline.py
+import asyncio
+
+import pytest
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+import match_pipeline
+from match_engine import match_resumes_to_jd
+
+JD_ID = ObjectId()
+JD_TEXT = "Backend engineer. Requirements: Python, MongoDB, AWS."
+JD_KEYWORDS = {"essential": ["python", "mongodb", "aws"], "desirable": [], "general": []}
+BACKEND_RESUME = "Jane Doe. Backend engineer with six years of Python, MongoDB and AWS. " * 3 # Scores well against JD_TEXT
+FRONTEND_RESUME = "John Smith. Frontend developer with four years of React and CSS. " * 3
+
+
+class _FakeCollection:
+    name = "fake"
+
+    def __init__(self, reject=lambda doc: False):
+        self.reject = reject
+        self.docs = []
+
+    async def insert_many(self, documents, ordered=True):
+        self.docs.extend(doc for doc in documents if not self.reject(doc))
+        write_errors = [{"index": index, "code": 11000} for index, doc in enumerate(documents) if self.reject(doc)]
+        if write_errors:
+            raise BulkWriteError({"writeErrors": write_errors})
+
+
+@pytest.fixture
+def collections(monkeypatch):
+    collections = {"job_descriptions": _FakeCollection(), "resumes": _FakeCollection(), "match_results": _FakeCollection()}
+
+    async def record_match_results(match_docs):
+        pass
+
+    monkeypatch.setattr(match_pipeline.db_manager, "get_collection", collections.get)
+    monkeypatch.setattr(match_pipeline, "record_match_results", record_match_results)
+    return collections
+
+
+def _match(parsed_resumes):
+    async def run():
+        resumes_for_matching_engine = await match_pipeline.save_resumes(parsed_resumes, JD_ID, "session-1")
+        match_results = match_resumes_to_jd(JD_TEXT, JD_KEYWORDS, {"full_text": JD_TEXT}, {}, resumes_for_matching_engine)
+        return await match_pipeline.save_match_results(match_results, JD_ID, "session-1")
+    return asyncio.run(run())
+
+def _parsed_resumes(filename):
+    return [{"filename": filename, "parsed_text": text, "skills": []} for text in (BACKEND_RESUME, FRONTEND_RESUME)]
+
+
+def test_duplicate_filenames_keep_distinct_resume_ids(collections):
+    response = _match(_parsed_resumes("cv.pdf")) # Two candidates both uploaded "cv.pdf"
+
+    resumes_by_id = {doc["_id"]: doc for doc in collections["resumes"].docs}
+    match_docs = sorted(collections["match_results"].docs, key=lambda doc: doc["jd_fit_score"], reverse=True)
+    assert len(resumes_by_id) == len(match_docs) == 2
+    # Each match result points at the resume it scored
+    assert [resumes_by_id[doc["resume_id"]]["parsed_text"] for doc in match_docs] == [BACKEND_RESUME, FRONTEND_RESUME]
+    assert {item["resume_db_id"] for item in response} == {str(resume_id) for resume_id in resumes_by_id}
+
+def test_resume_that_failed_to_save_is_scored_but_its_match_is_not_saved(collections):
+    collections["resumes"].reject = lambda doc: doc["parsed_text"] == FRONTEND_RESUME
+    response = _match(_parsed_resumes("cv.pdf"))
+
+    assert len(response) == 2
+    assert [doc["resume_id"] for doc in collections["match_results"].docs] == [collections["resumes"].docs[0]["_id"]]
+    assert sorted("match_db_id" in item for item in response) == [False, True]
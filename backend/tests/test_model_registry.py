@@ -0,0 +1,89 @@
+# tests/test_model_registry.py
+import asyncio
+import threading
+import time
+
+from model_registry import ModelRegistry, MODEL_DEGRADED, MODEL_LOADING, MODEL_READY
+
+
+def test_get_on_event_loop_does_not_wait_for_warm_up():
+    registry = ModelRegistry()
+    release_loader = threading.Event()
+
+    def slow_loader():
+        release_loader.wait(5)
+        return "model"
+
+    registry.register("slow", slow_loader)
+
+    async def run():
+        warm_up = asyncio.create_task(registry.warm_up_all())
+        while registry._entries["slow"].state != MODEL_LOADING:
+            await asyncio.sleep(0.01)
+        started = time.perf_counter()
+        during_warm_up = registry.get("slow") # A request arriving mid warm-up
+        waited = time.perf_counter() - started
+        release_loader.set()
+        await warm_up
+        return during_warm_up, waited, registry.get("slow")
+
+    during_warm_up, waited, after_warm_up = asyncio.run(run())
+    assert during_warm_up is None
+    assert waited < 0.5
+    assert after_warm_up == "model"
+    assert registry.is_ready()
+
+
+def test_get_off_event_loop_waits_for_the_load():
+    registry = ModelRegistry()
+    registry.register("model", lambda: time.sleep(0.2) or "model")
+    threads = [threading.Thread(target=registry.load_all) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    assert registry.get("model") == "model"
+    for thread in threads:
+        thread.join()
+
+
+def test_failed_warm_up_is_ready_but_degraded():
+    registry = ModelRegistry()
+
+    def failing_warm_up(model):
+        raise RuntimeError("no kernels")
+
+    registry.register("model", lambda: "model", failing_warm_up)
+    registry.register("healthy", lambda: "other", lambda model: None)
+    asyncio.run(registry.warm_up_all())
+
+    assert registry.is_ready()
+    status = registry.status()
+    assert status["model"]["state"] == MODEL_DEGRADED
+    assert "no kernels" in status["model"]["error"]
+    assert status["healthy"]["state"] == MODEL_READY
+    assert registry.get("model") == "model"
+
+
+def test_loading_models_starts_the_load_without_waiting():
+    registry = ModelRegistry()
+    release_loader = threading.Event()
+    registry.register("slow", lambda: release_loader.wait(5) and "model")
+    registry.register("broken", lambda: 1 / 0)
+    registry._load(registry._entries["broken"], warm_up=False, on_request_path=False)
+
+    async def run():
+        started = time.perf_counter()
+        loading = registry.loading_models()
+        waited = time.perf_counter() - started
+        while registry._entries["slow"].state != MODEL_LOADING:
+            await asyncio.sleep(0.01)
+        still_loading = registry.loading_models()
+        release_loader.set()
+        while registry.loading_models():
+            await asyncio.sleep(0.01)
+        return loading, waited, still_loading
+
+    loading, waited, still_loading = asyncio.run(run())
+    assert loading == still_loading == ["slow"] # A failed model is not "loading": callers fall back as before
+    assert waited < 0.5
+    assert registry.get("slow") == "model"
@@ -0,0 +1,151 @@
+# tests/test_parse_cache.py
+import asyncio
+
+import numpy as np
+import pytest
+from pymongo.errors import BulkWriteError
+
+import parse_cache
+
+
+class _FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+
+class _FakeCacheCollection:
+    def __init__(self):
+        self.docs = {}
+        self.find_ones = 0
+
+    def find(self, query):
+        return _FakeCursor([dict(self.docs[key]) for key in query["_id"]["$in"] if key in self.docs])
+
+    async def find_one(self, query):
+        self.find_ones += 1
+        doc = self.docs.get(query["_id"])
+        return dict(doc) if doc else None
+
+    async def insert_many(self, docs, ordered=True):
+        duplicates = []
+        for doc in docs:
+            if doc["_id"] in self.docs:
+                duplicates.append({"code": 11000, "errmsg": f"E11000 duplicate key error: {doc['_id']}"})
+            else:
+                self.docs[doc["_id"]] = doc
+        if duplicates:
+            raise BulkWriteError({"writeErrors": duplicates, "nInserted": len(docs) - len(duplicates)})
+
+    async def replace_one(self, query, doc, upsert=False):
+        self.docs[query["_id"]] = doc
+
+
+@pytest.fixture
+def collections(monkeypatch):
+    collections = {
+        parse_cache.PARSED_RESUME_CACHE_COLLECTION: _FakeCacheCollection(),
+        parse_cache.PARSED_JD_CACHE_COLLECTION: _FakeCacheCollection(),
+    }
+    monkeypatch.setattr(parse_cache.db_manager, "get_collection", collections.get)
+    monkeypatch.setattr(parse_cache, "PARSE_CACHE_ENABLED", True)
+    monkeypatch.setattr(parse_cache, "_jd_memory_cache", parse_cache.OrderedDict())
+    return collections
+
+def _parsed_jd(text="Senior Python engineer"):
+    return (
+        text,
+        {"essential": ["python"], "desirable": ["docker"], "general": []},
+        {"requirements": "python"},
+        {"full_text": np.arange(4, dtype=np.float32), "requirements": np.ones(4, dtype=np.float32)},
+    )
+
+
+def test_resume_round_trip_and_duplicate_store(collections, caplog):
+    resume_hash = parse_cache.content_hash(b"resume bytes")
+    parsed = {"parsed_text": "text", "skills": ["python"], "person_entities": [("Ada Lovelace", 0)], "embedding": np.ones(3)}
+
+    async def run():
+        await parse_cache.store_parsed_resumes([(resume_hash, parsed)])
+        await parse_cache.store_parsed_resumes([(resume_hash, parsed)]) # Duplicate key is tolerated
+        return await parse_cache.get_cached_parsed_resumes([resume_hash, resume_hash, "missing"])
+    hits = asyncio.run(run())
+
+    assert not [record for record in caplog.records if record.levelname == "ERROR"]
+    assert list(hits) == [resume_hash]
+    hit = hits[resume_hash]
+    assert hit["parsed_text"] == hit["raw_content"] == "text"
+    assert hit["skills"] == ["python"]
+    assert hit["person_entities"] == [("Ada Lovelace", 0)]
+    assert hit["embedding"].dtype == np.float32 and np.allclose(hit["embedding"], 1.0)
+
+def test_resume_entries_from_another_parser_version_miss(collections, monkeypatch):
+    resume_hash = parse_cache.content_hash(b"resume bytes")
+    asyncio.run(parse_cache.store_parsed_resumes([(resume_hash, {"parsed_text": "text"})]))
+    monkeypatch.setattr(parse_cache, "RESUME_PARSER_VERSION", "resume-parser-next")
+    assert asyncio.run(parse_cache.get_cached_parsed_resumes([resume_hash])) == {}
+
+def test_malformed_resume_entry_is_skipped(collections):
+    resume_hash = parse_cache.content_hash(b"resume bytes")
+    key = parse_cache.resume_cache_key(resume_hash)
+    collections[parse_cache.PARSED_RESUME_CACHE_COLLECTION].docs[key] = {"_id": key, "content_hash": resume_hash}
+    assert asyncio.run(parse_cache.get_cached_parsed_resumes([resume_hash])) == {}
+
+def test_jd_memory_tier_serves_copies(collections):
+    jd_hash = parse_cache.content_hash(b"jd bytes")
+    mongo = collections[parse_cache.PARSED_JD_CACHE_COLLECTION]
+    asyncio.run(parse_cache.store_parsed_jd(jd_hash, _parsed_jd()))
+
+    first = asyncio.run(parse_cache.get_cached_parsed_jd(jd_hash))
+    first[1]["essential"].append("mutated")
+    first[2]["requirements"] = "mutated"
+    second = asyncio.run(parse_cache.get_cached_parsed_jd(jd_hash))
+
+    assert mongo.find_ones == 0
+    assert second[1]["essential"] == ["python"]
+    assert second[2] == {"requirements": "python"}
+
+def test_jd_falls_back_to_mongo_and_repopulates_memory(collections):
+    jd_hash = parse_cache.content_hash(b"jd bytes")
+    mongo = collections[parse_cache.PARSED_JD_CACHE_COLLECTION]
+    asyncio.run(parse_cache.store_parsed_jd(jd_hash, _parsed_jd()))
+    parse_cache._jd_memory_cache.clear() # As after a restart
+
+    parsed_text, keywords, sections, embeddings = asyncio.run(parse_cache.get_cached_parsed_jd(jd_hash))
+    asyncio.run(parse_cache.get_cached_parsed_jd(jd_hash))
+
+    assert mongo.find_ones == 1
+    assert parsed_text == "Senior Python engineer"
+    assert keywords["desirable"] == ["docker"]
+    assert sections == {"requirements": "python"}
+    assert set(embeddings) == {"full_text", "requirements"}
+    assert embeddings["full_text"].dtype == np.float32 and np.allclose(embeddings["full_text"], np.arange(4))
+
+def test_jd_memory_tier_is_lru_bounded(collections, monkeypatch):
+    monkeypatch.setattr(parse_cache, "JD_CACHE_MEMORY_SIZE", 2)
+    hashes = [parse_cache.content_hash(bytes([i])) for i in range(3)]
+
+    async def run():
+        await parse_cache.store_parsed_jd(hashes[0], _parsed_jd("a"))
+        await parse_cache.store_parsed_jd(hashes[1], _parsed_jd("b"))
+        await parse_cache.get_cached_parsed_jd(hashes[0]) # Most recently used now
+        await parse_cache.store_parsed_jd(hashes[2], _parsed_jd("c"))
+    asyncio.run(run())
+
+    assert list(parse_cache._jd_memory_cache) == [parse_cache.jd_cache_key(hashes[0]), parse_cache.jd_cache_key(hashes[2])]
+
+def test_empty_jd_and_disabled_cache_are_not_stored(collections, monkeypatch):
+    jd_hash = parse_cache.content_hash(b"jd bytes")
+    asyncio.run(parse_cache.store_parsed_jd(jd_hash, _parsed_jd("")))
+    assert asyncio.run(parse_cache.get_cached_parsed_jd(jd_hash)) is None
+
+    monkeypatch.setattr(parse_cache, "PARSE_CACHE_ENABLED", False)
+    asyncio.run(parse_cache.store_parsed_jd(jd_hash, _parsed_jd()))
+    assert not parse_cache._jd_memory_cache
+    assert not collections[parse_cache.PARSED_JD_CACHE_COLLECTION].docs
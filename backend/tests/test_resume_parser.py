@@ -0,0 +1,71 @@
+# tests/test_resume_parser.py
+import asyncio
+
+import numpy as np
+import pytest
+
+import document_parsing
+import resume_parser
+
+RESUME_TEXT = "Jane Doe. Senior backend engineer with eight years of Python, MongoDB and AWS experience. " * 3
+
+
+@pytest.fixture
+def stored(monkeypatch):
+    stored = []
+
+    async def no_cache_hits(hashes):
+        return {}
+
+    async def store(parsed_resumes):
+        stored.extend(parsed_resumes)
+
+    monkeypatch.setattr(document_parsing, "RESUME_PARSE_ISOLATION", False)
+    monkeypatch.setattr(document_parsing, "RESUME_PARSE_MODE", "inline")
+    monkeypatch.setattr(resume_parser, "RESUME_PARSE_MODE", "inline")
+    monkeypatch.setattr(resume_parser, "get_cached_parsed_resumes", no_cache_hits)
+    monkeypatch.setattr(resume_parser, "store_parsed_resumes", store)
+    monkeypatch.setattr(resume_parser, "embed_texts", lambda texts, batch_size=None: [np.ones(4, dtype=np.float32) for _ in texts])
+    return stored
+
+def _annotate_with_nlp(parsed_texts, batch_size=None):
+    return [{"skills": ["python"], "person_entities": [("Jane Doe", 0)]} for _ in parsed_texts]
+
+def _parse(*filenames):
+    return asyncio.run(resume_parser.parse_resume_documents([(filename, f"{filename} {RESUME_TEXT}".encode()) for filename in filenames]))
+
+
+def test_fully_parsed_resumes_are_cached(stored, monkeypatch):
+    monkeypatch.setattr(resume_parser, "annotate_resumes", _annotate_with_nlp)
+    parsed = _parse("a.txt", "b.txt")
+    assert len(parsed) == 2
+    assert len(stored) == 2
+
+def test_resumes_without_embeddings_are_not_cached(stored, monkeypatch):
+    monkeypatch.setattr(resume_parser, "annotate_resumes", _annotate_with_nlp)
+    monkeypatch.setattr(resume_parser, "embed_texts", lambda texts, batch_size=None: [None for _ in texts])
+    parsed = _parse("a.txt")
+    assert len(parsed) == 1 and parsed[0]["embedding"] is None # Still returned for this request
+    assert stored == []
+
+def test_regex_fallback_skills_are_not_cached(stored, monkeypatch):
+    monkeypatch.setattr(resume_parser, "get_nlp", lambda: None)
+    parsed = _parse("a.txt")
+    assert parsed[0]["degraded"] is True
+    assert "python" in parsed[0]["skills"]
+    assert stored == []
+
+
+def test_parse_workers_load_only_spacy(monkeypatch):
+    import text_extraction
+    from model_registry import ModelRegistry, MODEL_NOT_LOADED, MODEL_READY
+
+    registry = ModelRegistry()
+    registry.register("spacy", lambda: "nlp")
+    registry.register("sentence_model", lambda: pytest.fail("parse workers must not load the sentence model"))
+    monkeypatch.setattr(document_parsing, "model_registry", registry)
+    monkeypatch.setattr(text_extraction, "_forwarded_events", None) # Restored after the initializer turns forwarding on
+
+    document_parsing._init_parse_worker()
+    assert registry.status()["spacy"]["state"] == MODEL_READY
+    assert registry.status()["sentence_model"]["state"] == MODEL_NOT_LOADED
@@ -0,0 +1,80 @@
+# tests/test_semantic_scores.py
+import asyncio
+
+import numpy as np
+import pytest
+
+from match_engine import SEMANTIC_SECTION_WEIGHTS, build_jd_match_context, calculate_semantic_scores, match_resumes_to_jd
+
+EMPTY_KEYWORDS = {"essential": [], "desirable": [], "general": []}
+
+
+def _reference_score(jd_embeddings, resume_embedding):
+    # Section-by-section scoring, as before the batched matrix product
+    weighted_sum, total_weight = 0.0, 0.0
+    for section_name, weight in SEMANTIC_SECTION_WEIGHTS.items():
+        jd_section_emb = jd_embeddings.get(section_name)
+        if not isinstance(jd_section_emb, np.ndarray) or jd_section_emb.size == 0:
+            continue
+        sim = 0.0
+        if jd_section_emb.size == resume_embedding.size:
+            sim = float(jd_section_emb @ resume_embedding / (np.linalg.norm(jd_section_emb) * np.linalg.norm(resume_embedding)))
+        if sim >= 0.60: adjusted = sim + (sim - 0.60) * 0.7
+        elif sim >= 0.45: adjusted = sim + (sim - 0.45) * 0.4
+        elif sim < 0.30: adjusted = sim * 0.9
+        else: adjusted = sim
+        weighted_sum += max(0, min(1, adjusted)) * weight
+        total_weight += weight
+    return weighted_sum / total_weight * 100 if total_weight else 0.0
+
+
+@pytest.mark.parametrize("section_sizes", [(8, 8, 8), (8, 12, 8), (12, 8, 5)])
+def test_batched_scores_match_section_by_section_scoring(section_sizes):
+    rng = np.random.default_rng(sum(section_sizes))
+    jd_embeddings = {name: rng.normal(size=size) + 0.5 for name, size in zip(SEMANTIC_SECTION_WEIGHTS, section_sizes)}
+    resume_embeddings = [rng.normal(size=size) + 0.5 for size in (8, 12, 5, 8, 12)] + [None]
+    expected = [_reference_score(jd_embeddings, emb) for emb in resume_embeddings[:-1]] + [0.0]
+
+    jd_context = build_jd_match_context("", EMPTY_KEYWORDS, jd_embeddings)
+    assert calculate_semantic_scores(jd_embeddings, resume_embeddings) == pytest.approx(expected)
+    assert calculate_semantic_scores(jd_embeddings, resume_embeddings, jd_context) == pytest.approx(expected)
+
+
+def test_mixed_size_sections_still_score():
+    jd_embeddings = {"essential_requirements": np.ones(4), "skills_semantic_document": np.ones(6)}
+    scores = calculate_semantic_scores(jd_embeddings, [np.ones(4), np.ones(6)])
+    assert all(score > 0 for score in scores)
+
+
+def test_full_text_fallback_is_clamped_similarity():
+    jd_embeddings = {"full_text": np.array([1.0, 0.0])}
+    scores = calculate_semantic_scores(jd_embeddings, [np.array([1.0, 0.0]), np.array([-1.0, 0.0]), np.array([1.0, 1.0])])
+    assert scores == pytest.approx([100.0, 0.0, 100 / np.sqrt(2)])
+
+
+RESUME_TEXT = "Jane Doe senior backend engineer building Python services on MongoDB and AWS for eight years " * 3
+
+def _match_on_event_loop(jd_embeddings, resume_embedding, monkeypatch):
+    import model_registry
+    original_get = model_registry.model_registry.get
+
+    def get(name):
+        assert name != "sentence_model", "scoring must not depend on the sentence model being loaded"
+        return original_get(name)
+
+    monkeypatch.setattr(model_registry.model_registry, "get", get)
+    resume = {"filename": "jane.txt", "parsed_text": RESUME_TEXT, "skills": ["python"], "person_entities": [("Jane Doe", 0)], "embedding": resume_embedding}
+
+    async def run(): # Where /api/match used to call it, so a registry lookup would get None mid warm-up
+        return match_resumes_to_jd("Backend engineer", {"essential": ["python"], "desirable": [], "general": []}, {}, jd_embeddings, [resume])
+    return asyncio.run(run())[0]
+
+def test_precomputed_embeddings_are_scored_without_the_model(monkeypatch):
+    embedding = np.ones(8, dtype=np.float32)
+    result = _match_on_event_loop({"full_text": embedding}, embedding, monkeypatch)
+    assert not any("Semantic analysis disabled" in flag for flag in result["redFlags"])
+    assert result["_debug_scores"]["semantic_raw"] > 0
+
+def test_missing_embeddings_fall_back_to_keyword_scoring(monkeypatch):
+    result = _match_on_event_loop({"full_text": np.ones(8, dtype=np.float32)}, None, monkeypatch)
+    assert any("Semantic analysis disabled" in flag for flag in result["redFlags"])
@@ -0,0 +1,67 @@
+# tests/test_text_extraction.py
+import asyncio
+import uuid
+
+import pytest
+
+import document_parsing
+import text_extraction
+
+
+@pytest.fixture
+def extraction_events():
+    events = []
+    text_extraction.add_extraction_hook(events.append)
+    yield events
+    text_extraction._extraction_hooks.remove(events.append)
+
+
+def _unique_document() -> bytes:
+    return f"Data engineer {uuid.uuid4()} with Spark, Airflow and Python experience.".encode()
+
+
+def test_identical_bytes_are_extracted_once(extraction_events):
+    content = _unique_document()
+    assert text_extraction.cached_text(content, "cv.txt") is None
+    first = text_extraction.extract_text(content, "cv.txt")
+    second = text_extraction.extract_text(content, "renamed.txt")
+    assert first == second == content.decode()
+    assert len(extraction_events) == 1
+    assert text_extraction.cached_text(content, "cv.txt") == first
+
+
+@pytest.mark.parametrize("isolation, parse_mode", [(True, "inline"), (False, "process")])
+def test_worker_extraction_reports_to_the_api_process(extraction_events, monkeypatch, isolation, parse_mode):
+    monkeypatch.setattr(document_parsing, "RESUME_PARSE_ISOLATION", isolation)
+    monkeypatch.setattr(document_parsing, "RESUME_PARSE_MODE", parse_mode)
+    monkeypatch.setattr(document_parsing, "RESUME_EXTRACT_WORKERS", 1)
+    monkeypatch.setattr(document_parsing, "RESUME_PARSE_WORKERS", 1)
+    monkeypatch.setattr(document_parsing, "_extraction_slots", None)
+    monkeypatch.setattr(document_parsing, "_init_parse_worker", document_parsing.forward_extraction_events) # No models needed here
+    dispatched = []
+    parse_in_workers = document_parsing._parse_contents_isolated if isolation else document_parsing._parse_contents_in_pool
+
+    async def counting_parse_in_workers(documents):
+        dispatched.extend(filename for filename, _ in documents)
+        return await parse_in_workers(documents)
+
+    monkeypatch.setattr(document_parsing, "_parse_contents_isolated" if isolation else "_parse_contents_in_pool", counting_parse_in_workers)
+    content = _unique_document()
+    documents_before = text_extraction.get_extraction_stats().get("txt/decode", {}).get("documents", 0)
+
+    async def run():
+        first = await document_parsing.parse_document_text("cv.txt", content)
+        second = await document_parsing.parse_document_text("cv-again.txt", content)
+        return first, second
+
+    try:
+        first, second = asyncio.run(run())
+    finally:
+        document_parsing.shutdown_extraction_pool()
+        document_parsing.shutdown_parse_pool()
+
+    assert first["parsed_text"] == second["parsed_text"] and "Spark, Airflow" in first["parsed_text"]
+    assert "extraction_events" not in first and "extraction_events" not in second
+    assert dispatched == ["cv.txt"] # The repeat was served from the API process's text cache
+    assert [event["filename"] for event in extraction_events] == ["cv.txt"]
+    assert text_extraction.get_extraction_stats()["txt/decode"]["documents"] == documents_before + 1
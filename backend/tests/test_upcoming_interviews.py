@@ -0,0 +1,141 @@
+# tests/test_upcoming_interviews.py
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from bson import ObjectId
+
+import upcoming_interviews
+from upcoming_interviews import InvalidInterviewQuery
+
+
+def _matches(doc, query):
+    for field, condition in query.items():
+        if field == "$and":
+            if not all(_matches(doc, part) for part in condition):
+                return False
+        elif field == "$or":
+            if not any(_matches(doc, part) for part in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = doc.get(field)
+            if "$gt" in condition and not value > condition["$gt"]:
+                return False
+            if "$gte" in condition and not value >= condition["$gte"]:
+                return False
+        elif doc.get(field) != condition:
+            return False
+    return True
+
+
+class _FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, keys):
+        self.docs.sort(key=lambda doc: tuple(doc[field] for field, _ in keys))
+        return self
+
+    def limit(self, limit):
+        self.docs = self.docs[:limit]
+        return self
+
+    async def to_list(self, length):
+        return self.docs[:length]
+
+
+class _FakeInterviews:
+    def __init__(self, docs):
+        self.docs = docs
+        self.finds = 0
+
+    def find(self, query, projection=None):
+        self.finds += 1
+        matched = [doc for doc in self.docs if _matches(doc, query)]
+        if projection:
+            matched = [{field: doc[field] for field in projection if field in doc} for doc in matched]
+        else:
+            matched = [dict(doc) for doc in matched]
+        return _FakeCursor(matched)
+
+
+@pytest.fixture
+def interviews(monkeypatch):
+    base = datetime.now(timezone.utc).replace(microsecond=0) + timedelta(days=1)
+    docs = [
+        {"_id": ObjectId(), "start_time": base + timedelta(hours=i // 3), "end_time": base + timedelta(hours=i // 3, minutes=30),
+         "candidate_name": f"Candidate {i}", "candidate_email": f"c{i}@example.com", "interviewer_emails": ["lead@example.com"]}
+        for i in range(10) # Groups of three share a start time
+    ]
+    docs.append({"_id": ObjectId(), "start_time": base - timedelta(days=2), "candidate_name": "Past"})
+    collection = _FakeInterviews(docs)
+    monkeypatch.setattr(upcoming_interviews.db_manager, "get_collection", {"scheduled_interviews": collection}.get)
+    monkeypatch.setattr(upcoming_interviews, "_page_cache", upcoming_interviews.OrderedDict())
+    monkeypatch.setattr(upcoming_interviews, "UPCOMING_INTERVIEWS_CACHE_TTL_SECONDS", 60.0)
+    return collection
+
+
+def test_cursor_round_trip():
+    start_time = datetime(2026, 3, 4, 9, 30, tzinfo=timezone.utc)
+    interview_id = ObjectId()
+    cursor = upcoming_interviews.encode_cursor(start_time, interview_id)
+    assert "=" not in cursor
+    assert upcoming_interviews.decode_cursor(cursor) == (start_time, interview_id)
+
+@pytest.mark.parametrize("cursor", ["", "not base64!", "bm8tc2VwYXJhdG9y", "MjAyNi0wMy0wNHxub3QtYW4taWQ", "bm90LWEtZGF0ZXw2NWYwMDAwMDAwMDAwMDAwMDAwMDAwMDA"])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(InvalidInterviewQuery):
+        upcoming_interviews.decode_cursor(cursor)
+
+def test_parse_fields():
+    assert upcoming_interviews.parse_fields(None) == ()
+    assert upcoming_interviews.parse_fields(" candidate_name, start_time ,candidate_name,") == ("candidate_name", "start_time")
+    with pytest.raises(InvalidInterviewQuery, match="Unknown fields: password"):
+        upcoming_interviews.parse_fields("candidate_name,password")
+
+@pytest.mark.parametrize("if_none_match,expected", [
+    (None, False), ("", False), ('"abc"', True), ('W/"abc"', True), ('"xyz", W/"abc"', True),
+    ('"xyz"', False), ("*", True), ("abc", False),
+])
+def test_etag_matches(if_none_match, expected):
+    assert upcoming_interviews.etag_matches(if_none_match, '"abc"') is expected
+
+
+def test_pages_cover_every_upcoming_interview_once(interviews):
+    async def run():
+        seen, cursor = [], None
+        while True:
+            page = await upcoming_interviews.get_upcoming_interviews_page(cursor=cursor, limit=4)
+            seen.extend(item["candidate_name"] for item in json.loads(page.body))
+            if page.next_cursor is None:
+                return seen
+            cursor = page.next_cursor
+    seen = asyncio.run(run())
+    expected = [doc["candidate_name"] for doc in sorted(interviews.docs, key=lambda doc: (doc["start_time"], doc["_id"])) if doc["candidate_name"] != "Past"]
+    assert seen == expected
+
+def test_projection_keeps_cursor_fields(interviews):
+    page = asyncio.run(upcoming_interviews.get_upcoming_interviews_page(limit=2, fields="candidate_name"))
+    items = json.loads(page.body)
+    assert set(items[0]) == {"_id", "id", "start_time", "candidate_name"}
+    assert items[0]["id"] == items[0]["_id"]
+    assert page.next_cursor is not None
+
+def test_pages_are_cached_until_invalidated(interviews):
+    async def run():
+        first = await upcoming_interviews.get_upcoming_interviews_page(limit=5)
+        again = await upcoming_interviews.get_upcoming_interviews_page(limit=5)
+        upcoming_interviews.invalidate_upcoming_interviews_cache()
+        refreshed = await upcoming_interviews.get_upcoming_interviews_page(limit=5)
+        return first, again, refreshed
+    first, again, refreshed = asyncio.run(run())
+    assert again is first
+    assert refreshed is not first and refreshed.etag == first.etag # Same content, same ETag
+    assert interviews.finds == 2
+
+def test_bad_cursor_fails_before_querying(interviews):
+    with pytest.raises(InvalidInterviewQuery):
+        asyncio.run(upcoming_interviews.get_upcoming_interviews_page(cursor="garbage"))
+    assert interviews.finds == 0
+    assert not upcoming_interviews._page_cache
@@ -0,0 +1,284 @@
+# text_extraction.py
+import argparse
+import io
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Any, Callable, Optional, Tuple, Union
+
+from database import logger
+from parse_cache import content_hash
+
+ContentBuffer = Union[bytes, bytearray, memoryview] # Anything the buffer protocol covers; never copied to disk
+Extractor = Callable[[ContentBuffer, str], str]
+
+# Per-format backend override, e.g. "pdf=pymupdf,docx=python-docx"; unset formats use DEFAULT_BACKENDS
+TEXT_EXTRACTION_BACKENDS = os.getenv("TEXT_EXTRACTION_BACKENDS", "")
+TEXT_CACHE_SIZE = int(os.getenv("TEXT_CACHE_SIZE", "256")) # Extracted texts kept in memory, keyed by content hash + backend (the API process fills it from worker results)
+
+DEFAULT_BACKENDS = {"pdf": "pypdf2", "docx": "python-docx", "txt": "decode", "doc": "decode", "other": "decode"}
+FORMAT_BY_EXTENSION = {".pdf": "pdf", ".docx": "docx", ".txt": "txt", ".doc": "doc"}
+
+_EXTRACTORS: Dict[str, Dict[str, Extractor]] = {}
+_text_cache: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+_text_cache_lock = threading.Lock()
+_extraction_stats: Dict[Tuple[str, str], Dict[str, float]] = {}
+_extraction_hooks: List[Callable[[Dict[str, Any]], None]] = []
+_forwarded_events: Optional[List[Dict[str, Any]]] = None # In extraction workers: events travel back to the API process with each result
+_unavailable_backends: Dict[Tuple[str, str], str] = {}
+
+
+def register_extractor(file_format: str, backend: str):
+    """Decorator: registers fn(content, filename) -> raw text as `backend` for `file_format`. Import heavy libraries inside fn."""
+    def decorator(fn: Extractor) -> Extractor:
+        _EXTRACTORS.setdefault(file_format, {})[backend] = fn
+        return fn
+    return decorator
+
+def available_backends() -> Dict[str, List[str]]:
+    return {file_format: sorted(backends) for file_format, backends in _EXTRACTORS.items()}
+
+def _configured_backends() -> Dict[str, str]:
+    configured = dict(DEFAULT_BACKENDS)
+    for item in filter(None, (part.strip() for part in TEXT_EXTRACTION_BACKENDS.split(","))):
+        file_format, _, backend = item.partition("=")
+        configured[file_format.strip().lower()] = backend.strip().lower()
+    return configured
+
+_CONFIGURED_BACKENDS = _configured_backends()
+
+def file_format_for(filename: str) -> str:
+    return FORMAT_BY_EXTENSION.get(os.path.splitext(filename or "")[1].lower(), "other")
+
+
+# --- Backends ---
+@register_extractor("pdf", "pypdf2")
+def _extract_pdf_pypdf2(content: ContentBuffer, original_filename: str) -> str:
+    import PyPDF2
+    reader = PyPDF2.PdfReader(io.BytesIO(content), strict=False) # strict=False for more tolerance
+    if reader.is_encrypted:
+        try:
+            reader.decrypt('') # Try with empty password
+            logger.info(f"Decrypted PDF: {original_filename}")
+        except Exception as decrypt_err:
+            logger.warning(f"Could not decrypt PDF {original_filename}: {decrypt_err}. Text extraction may fail or be incomplete.")
+
+    text_parts = []
+    for i, page in enumerate(reader.pages):
+        try:
+            page_text = page.extract_text()
+            if page_text:
+                text_parts.append(page_text)
+        except Exception as page_err: # Catch broad exceptions during page extraction
+            logger.warning(f"Error extracting text from page {i+1} of {original_filename}: {page_err}")
+    raw_text = "\n".join(text_parts)
+    if not raw_text.strip() and len(reader.pages) > 0:
+        logger.warning(f"PyPDF2 extracted no text from {original_filename}, though it has pages. PDF might be image-based or have complex encoding.")
+    return raw_text
+
+@register_extractor("pdf", "pymupdf")
+def _extract_pdf_pymupdf(content: ContentBuffer, original_filename: str) -> str:
+    import fitz # PyMuPDF, optional: pip install pymupdf
+    with fitz.open(stream=bytes(content), filetype="pdf") as pdf:
+        if pdf.needs_pass and not pdf.authenticate(""):
+            logger.warning(f"Could not decrypt PDF {original_filename}. Text extraction may fail or be incomplete.")
+        raw_text = "\n".join(page.get_text("text") for page in pdf)
+        if not raw_text.strip() and pdf.page_count > 0:
+            logger.warning(f"PyMuPDF extracted no text from {original_filename}, though it has pages. PDF might be image-based.")
+    return raw_text
+
+@register_extractor("docx", "python-docx")
+def _extract_docx_python_docx(content: ContentBuffer, original_filename: str) -> str:
+    import docx
+    doc = docx.Document(io.BytesIO(content))
+    return "\n".join([para.text for para in doc.paragraphs])
+
+@register_extractor("txt", "decode")
+@register_extractor("doc", "decode")
+@register_extractor("other", "decode")
+def _extract_by_decoding(content: ContentBuffer, original_filename: str) -> str:
+    file_format = file_format_for(original_filename)
+    if file_format == "doc":
+        logger.warning(f".doc format ({original_filename}) has limited support. Trying basic text decode. For best results, convert to .docx or .pdf.")
+    elif file_format == "other":
+        logger.warning(f"Unsupported file extension '{os.path.splitext(original_filename or '')[1]}' for {original_filename}. Attempting to read as plain text.")
+    return str(content, 'utf-8', errors='replace')
+
+
+# --- Stats and benchmark hooks ---
+def add_extraction_hook(hook: Callable[[Dict[str, Any]], None]):
+    """hook(event) is called after every uncached extraction with format, backend, filename, seconds, chars and bytes."""
+    _extraction_hooks.append(hook)
+
+def record_extraction_event(event: Dict[str, Any]):
+    """Counts one extraction in this process's stats and runs the hooks; the API process replays worker events through it."""
+    stats = _extraction_stats.setdefault((event["format"], event["backend"]), {"documents": 0, "seconds": 0.0, "chars": 0, "bytes": 0})
+    stats["documents"] += 1
+    stats["seconds"] += event["seconds"]
+    stats["chars"] += event["chars"]
+    stats["bytes"] += event["bytes"]
+    for hook in _extraction_hooks:
+        try:
+            hook(event)
+        except Exception as e:
+            logger.warning(f"Text extraction hook failed: {e}")
+
+def _record_extraction(file_format: str, backend: str, filename: str, seconds: float, chars: int, size: int):
+    event = {"format": file_format, "backend": backend, "filename": filename, "seconds": seconds, "chars": chars, "bytes": size}
+    if _forwarded_events is not None:
+        _forwarded_events.append(event)
+    else:
+        record_extraction_event(event)
+
+def forward_extraction_events():
+    """Called in worker processes: extraction events are kept for take_forwarded_events instead of counted locally."""
+    global _forwarded_events
+    _forwarded_events = []
+
+def take_forwarded_events() -> List[Dict[str, Any]]:
+    if not _forwarded_events:
+        return []
+    events = list(_forwarded_events)
+    _forwarded_events.clear()
+    return events
+
+def get_extraction_stats() -> Dict[str, Dict[str, float]]:
+    return {
+        f"{file_format}/{backend}": {**stats, "avg_ms": round(stats["seconds"] / stats["documents"] * 1000, 2) if stats["documents"] else 0.0}
+        for (file_format, backend), stats in _extraction_stats.items()
+    }
+
+
+# --- Extraction entry point ---
+def _resolve_backend(file_format: str, backend: Optional[str]) -> str:
+    backend = (backend or _CONFIGURED_BACKENDS.get(file_format) or DEFAULT_BACKENDS["other"]).lower()
+    if backend not in _EXTRACTORS.get(file_format, {}) or (file_format, backend) in _unavailable_backends:
+        return DEFAULT_BACKENDS.get(file_format, DEFAULT_BACKENDS["other"])
+    return backend
+
+def _remember_text(cache_key: Tuple[str, str], text: str):
+    if TEXT_CACHE_SIZE <= 0:
+        return
+    with _text_cache_lock:
+        _text_cache[cache_key] = text
+        _text_cache.move_to_end(cache_key)
+        while len(_text_cache) > TEXT_CACHE_SIZE:
+            _text_cache.popitem(last=False)
+
+def _cached_text(cache_key: Tuple[str, str]) -> Optional[str]:
+    with _text_cache_lock:
+        cached_text = _text_cache.get(cache_key)
+        if cached_text is not None:
+            _text_cache.move_to_end(cache_key)
+    return cached_text
+
+def _text_cache_key(content: ContentBuffer, original_filename: str, backend: Optional[str], document_hash: Optional[str]) -> Tuple[str, str]:
+    return (document_hash or content_hash(content), _resolve_backend(file_format_for(original_filename), backend))
+
+def cached_text(content: ContentBuffer, original_filename: str, backend: Optional[str] = None, document_hash: Optional[str] = None) -> Optional[str]:
+    """The text extract_text would return from this process's cache, or None on a miss."""
+    return _cached_text(_text_cache_key(content, original_filename, backend, document_hash))
+
+def remember_text(content: ContentBuffer, original_filename: str, text: str, backend: Optional[str] = None, document_hash: Optional[str] = None):
+    """Caches text extracted elsewhere (an extraction worker) for this process's extract_text calls."""
+    _remember_text(_text_cache_key(content, original_filename, backend, document_hash), text)
+
+def extract_text(content: ContentBuffer, original_filename: str, backend: Optional[str] = None, document_hash: Optional[str] = None) -> str:
+    """
+    Raw text of an uploaded document, using the backend registered for its format
+    (TEXT_EXTRACTION_BACKENDS, or `backend` to force one). Identical bytes are extracted once.
+    Falls back to a plain UTF-8 decode when the backend fails, as the parsers always have.
+    """
+    file_format = file_format_for(original_filename)
+    cache_key = _text_cache_key(content, original_filename, backend, document_hash)
+    backend = cache_key[1]
+    text_from_cache = _cached_text(cache_key)
+    if text_from_cache is not None:
+        logger.debug(f"Text cache hit for {original_filename} ({backend})")
+        return text_from_cache
+
+    try:
+        logger.info(f"Attempting to extract text from: {original_filename} (format: {file_format}, backend: {backend})")
+        started = time.perf_counter()
+        try:
+            raw_text = _EXTRACTORS[file_format][backend](content, original_filename)
+        except ImportError as e:
+            default_backend = DEFAULT_BACKENDS.get(file_format, DEFAULT_BACKENDS["other"])
+            if backend == default_backend:
+                raise
+            _unavailable_backends[(file_format, backend)] = str(e)
+            logger.warning(f"Text extraction backend '{backend}' for {file_format} is not installed ({e}); using '{default_backend}'.")
+            return extract_text(content, original_filename, default_backend, cache_key[0])
+        raw_text = raw_text.strip()
+        _record_extraction(file_format, backend, original_filename, time.perf_counter() - started, len(raw_text), len(content))
+        logger.info(f"Successfully extracted raw text (length: {len(raw_text)}) from {original_filename}")
+    except Exception as e:
+        logger.error(f"Error during text extraction for {original_filename}: {e}", exc_info=True)
+        try:
+            logger.info(f"Fallback extraction attempt for {original_filename}")
+            return str(content, 'utf-8', errors='replace').strip()
+        except Exception as e_fallback:
+            logger.error(f"Final fallback text extraction also failed for {original_filename}: {e_fallback}")
+            return ""
+
+    _remember_text(cache_key, raw_text)
+    return raw_text
+
+
+def benchmark_extractors(documents: List[Tuple[str, bytes]], backends: Optional[Dict[str, List[str]]] = None, repeat: int = 1) -> Dict[str, Any]:
+    """
+    Runs every registered (or requested) backend over the documents of its format, bypassing the text cache.
+    Reports per backend: documents, total/avg/p95 milliseconds, extracted chars, and documents with no text or errors.
+    """
+    backends = backends or available_backends()
+    report: Dict[str, Any] = {}
+    for file_format, format_backends in backends.items():
+        format_documents = [(filename, content) for filename, content in documents if file_format_for(filename) == file_format]
+        if not format_documents:
+            continue
+        for backend in format_backends:
+            timings: List[float] = []
+            texts: Dict[str, str] = {}
+            failed = set()
+            try:
+                for _ in range(max(1, repeat)):
+                    for filename, content in format_documents:
+                        started = time.perf_counter()
+                        try:
+                            texts[filename] = _EXTRACTORS[file_format][backend](content, filename).strip()
+                        except ImportError:
+                            raise
+                        except Exception:
+                            failed.add(filename)
+                        timings.append((time.perf_counter() - started) * 1000)
+            except ImportError as e:
+                report[f"{file_format}/{backend}"] = {"error": f"not installed: {e}"}
+                continue
+            chars = sum(len(text) for text in texts.values())
+            empty = sum(1 for text in texts.values() if not text)
+            timings.sort()
+            report[f"{file_format}/{backend}"] = {
+                "documents": len(format_documents),
+                "total_ms": round(sum(timings) / max(1, repeat), 2),
+                "avg_ms": round(sum(timings) / len(timings), 2),
+                "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 2),
+                "chars": chars,
+                "empty_documents": empty,
+                "failed_documents": len(failed),
+            }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark text extraction backends on a set of documents.")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("files", nargs="+")
+    args = parser.parse_args()
+
+    def _read(path: str) -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
+
+    print(json.dumps(benchmark_extractors([(os.path.basename(path), _read(path)) for path in args.files], repeat=args.repeat), indent=2))
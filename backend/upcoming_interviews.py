@@ -0,0 +1,128 @@
+# upcoming_interviews.py
+import base64
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, Tuple
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+
+from database import db_manager, logger, ScheduledInterviewDB
+
+UPCOMING_INTERVIEWS_CACHE_TTL_SECONDS = float(os.getenv("UPCOMING_INTERVIEWS_CACHE_TTL_SECONDS", "15"))
+UPCOMING_INTERVIEWS_CACHE_SIZE = int(os.getenv("UPCOMING_INTERVIEWS_CACHE_SIZE", "64")) # Distinct (cursor, limit, fields) pages
+UPCOMING_INTERVIEWS_MAX_LIMIT = 100
+
+# Fields a client may project to; _id and start_time are always returned (the cursor is built from them)
+PROJECTABLE_FIELDS = {name for name in ScheduledInterviewDB.model_fields if name != "id"}
+_ALWAYS_INCLUDED = ("_id", "start_time")
+
+
+class InvalidInterviewQuery(ValueError):
+    pass
+
+
+class UpcomingInterviewsPage:
+    __slots__ = ("body", "etag", "next_cursor", "count")
+
+    def __init__(self, body: bytes, next_cursor: Optional[str], count: int):
+        self.body = body
+        self.etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        self.next_cursor = next_cursor
+        self.count = count
+
+
+_page_cache: "OrderedDict[Tuple[Optional[str], int, Tuple[str, ...]], Tuple[float, UpcomingInterviewsPage]]" = OrderedDict()
+_cache_generation = 0
+
+
+def invalidate_upcoming_interviews_cache():
+    """Called whenever scheduled_interviews changes; in-flight reads started before it will not be cached."""
+    global _cache_generation
+    _cache_generation += 1
+    _page_cache.clear()
+
+
+# --- Cursor and projection ---
+def encode_cursor(start_time: datetime, interview_id: ObjectId) -> str:
+    raw = f"{start_time.isoformat()}|{interview_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        start_time_iso, interview_id = raw.split("|", 1)
+        return datetime.fromisoformat(start_time_iso), ObjectId(interview_id)
+    except Exception:
+        raise InvalidInterviewQuery("Invalid cursor.")
+
+def parse_fields(fields: Optional[str]) -> Tuple[str, ...]:
+    if not fields:
+        return ()
+    requested = sorted({field.strip() for field in fields.split(",") if field.strip()})
+    unknown = [field for field in requested if field not in PROJECTABLE_FIELDS]
+    if unknown:
+        raise InvalidInterviewQuery(f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(sorted(PROJECTABLE_FIELDS))}.")
+    return tuple(requested)
+
+
+# --- Query ---
+def _serialize(doc: Dict[str, Any]) -> Dict[str, Any]:
+    # Documents were validated by ScheduledInterviewDB on the way in; only make them JSON-safe here
+    doc["_id"] = str(doc["_id"])
+    doc["id"] = doc["_id"] # The scheduler page keys list items by id
+    return jsonable_encoder(doc, custom_encoder={ObjectId: str})
+
+async def _fetch_page(cursor: Optional[str], limit: int, fields: Tuple[str, ...]) -> UpcomingInterviewsPage:
+    collection = db_manager.get_collection("scheduled_interviews")
+    if collection is None:
+        raise RuntimeError("Scheduled interviews collection unavailable.")
+
+    query: Dict[str, Any] = {"start_time": {"$gte": datetime.now(timezone.utc)}}
+    if cursor:
+        after_start_time, after_id = decode_cursor(cursor)
+        # Keyset on (start_time, _id): resumes exactly after the last row, however many interviews share a start time
+        query = {"$and": [query, {"$or": [
+            {"start_time": {"$gt": after_start_time}},
+            {"start_time": after_start_time, "_id": {"$gt": after_id}},
+        ]}]}
+    projection = {field: 1 for field in (*_ALWAYS_INCLUDED, *fields)} if fields else None
+
+    docs = await collection.find(query, projection).sort([("start_time", 1), ("_id", 1)]).limit(limit).to_list(length=limit)
+    next_cursor = encode_cursor(docs[-1]["start_time"], docs[-1]["_id"]) if len(docs) == limit else None
+    body = json.dumps([_serialize(doc) for doc in docs], separators=(",", ":")).encode()
+    return UpcomingInterviewsPage(body, next_cursor, len(docs))
+
+async def get_upcoming_interviews_page(cursor: Optional[str] = None, limit: int = UPCOMING_INTERVIEWS_MAX_LIMIT, fields: Optional[str] = None) -> UpcomingInterviewsPage:
+    """One page of upcoming interviews, served from a short-lived cache while nothing has been scheduled."""
+    limit = max(1, min(limit, UPCOMING_INTERVIEWS_MAX_LIMIT))
+    field_tuple = parse_fields(fields)
+    if cursor:
+        decode_cursor(cursor) # Reject a bad cursor before it can occupy a cache slot
+    cache_key = (cursor, limit, field_tuple)
+
+    cached = _page_cache.get(cache_key)
+    if cached is not None and cached[0] > time.monotonic():
+        _page_cache.move_to_end(cache_key)
+        return cached[1]
+
+    generation = _cache_generation
+    page = await _fetch_page(cursor, limit, field_tuple)
+    if generation == _cache_generation and UPCOMING_INTERVIEWS_CACHE_TTL_SECONDS > 0:
+        _page_cache[cache_key] = (time.monotonic() + UPCOMING_INTERVIEWS_CACHE_TTL_SECONDS, page)
+        _page_cache.move_to_end(cache_key)
+        while len(_page_cache) > UPCOMING_INTERVIEWS_CACHE_SIZE:
+            _page_cache.popitem(last=False)
+    logger.debug(f"Fetched {page.count} upcoming interviews (cursor={cursor}, limit={limit}, fields={field_tuple or 'all'})")
+    return page
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
@@ -77,7 +77,7 @@ const AnalyticsDashboard = () => {
       pieChartInstance = new Chart(ctxPie, {
         type: 'pie',
         data: {
-          labels: ['Reviewed', 'In Progress', 'Skipped'], // These labels could also come from API
+          labels: dashboardData.pieLabels || ['Reviewed', 'In Progress', 'Skipped'],
           datasets: [{
             data: dashboardData.pieData,
             backgroundColor: ['#2ecc71', '#f1c40f', '#e74c3c']
@@ -97,7 +97,7 @@ const AnalyticsDashboard = () => {
       barChartInstance = new Chart(ctxBar, {
         type: 'bar',
         data: {
-          labels: ['Jan.', 'Feb.', 'Mar.', 'Apr.', 'May'], // These labels could also come from API
+          labels: dashboardData.barLabels || ['Jan.', 'Feb.', 'Mar.', 'Apr.', 'May'],
           datasets: [{
             label: 'Average CQI',
             data: dashboardData.barData,